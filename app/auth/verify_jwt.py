@@ -2,10 +2,6 @@ from datetime import datetime, timezone
 from fastapi import Security, status, HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt, JWTError
-from app.models import (
-    dev,
-    dev_n,
-)
 from dotenv import load_dotenv
 import os
 
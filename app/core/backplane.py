@@ -0,0 +1,224 @@
+from fastapi import WebSocket
+from typing import Dict
+from redis.exceptions import RedisError
+from app.core.config import settings
+from app.core.redis_config import redis_client
+from app.log.logger import get_loggers
+import asyncio
+import uuid
+
+TEXT_FRAME = b"t"
+BYTES_FRAME = b"b"
+DELIVERY_TIMEOUT = 2
+
+logger = get_loggers("backplane")
+
+
+def user_channel(user_id: int) -> str:
+    return f"chat:user:{user_id}"
+
+
+def ack_channel(node: str) -> str:
+    return f"chat:ack:{node}"
+
+
+class LocalBackplane:
+    """Delivers to sockets connected to this process only; enough for a
+    single worker.
+    """
+
+    def __init__(self):
+        self.connections: Dict[int, WebSocket] = {}
+
+    def is_local(self, user_id: int) -> bool:
+        return user_id in self.connections
+
+    async def register(self, user_id: int, web: WebSocket):
+        self.connections[user_id] = web
+
+    async def unregister(self, user_id: int, web: WebSocket | None = None):
+        if web is None or self.connections.get(user_id) is web:
+            self.connections.pop(user_id, None)
+
+    async def send_local(self, user_id: int, frame: bytes, data: bytes) -> bool:
+        web = self.connections.get(user_id)
+        if web is None:
+            return False
+        try:
+            if frame == TEXT_FRAME:
+                await web.send_text(data.decode())
+            else:
+                await web.send_bytes(data)
+            return True
+        except Exception as e:
+            logger.warning("Could not deliver to user %s: %s", user_id, e)
+            return False
+
+    async def deliver(self, user_id: int, frame: bytes, data: bytes) -> bool:
+        return await self.send_local(user_id, frame, data)
+
+    async def send_text(self, user_id: int, text: str) -> bool:
+        """Whether a connection of ``user_id`` received ``text``."""
+        return await self.deliver(user_id, TEXT_FRAME, text.encode())
+
+    async def send_bytes(self, user_id: int, data: bytes) -> bool:
+        return await self.deliver(user_id, BYTES_FRAME, data)
+
+
+class RedisBackplane(LocalBackplane):
+    """Routes messages for users connected to other workers or nodes over
+    Redis pub/sub. Each process subscribes to one channel per locally
+    connected user and hands what arrives to that user's socket.
+
+    Delivery to a remote user counts as done only once the process holding
+    their socket confirms the send on the sender's ack channel, within
+    ``DELIVERY_TIMEOUT`` seconds; otherwise the message is stored as
+    undelivered and replayed on the next connect. A sender therefore waits
+    up to one pub/sub round trip, at most ``DELIVERY_TIMEOUT``, per frame.
+
+    The listener never sends to a socket itself: frames are queued per
+    user and sent by one task per user, so a slow client holds up only its
+    own frames. A frame still queued when its sender has stopped waiting is
+    dropped and reported undelivered, since it is replayed anyway.
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self.pubsub = None
+        self.listener: asyncio.Task | None = None
+        self.node = uuid.uuid4().hex
+        self.waiting: Dict[str, asyncio.Future] = {}
+        self.acks_subscribed = False
+        self.outbox: Dict[int, asyncio.Queue] = {}
+        self.senders: set = set()
+
+    async def subscribe(self, channel: str):
+        if self.pubsub is None:
+            self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(channel)
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+    async def register(self, user_id: int, web: WebSocket):
+        await super().register(user_id, web)
+        try:
+            await self.subscribe(user_channel(user_id))
+        except RedisError as e:
+            logger.warning(
+                "Backplane unavailable, user %s is local only: %s", user_id, e
+            )
+
+    async def unregister(self, user_id: int, web: WebSocket | None = None):
+        await super().unregister(user_id, web)
+        if self.is_local(user_id) or self.pubsub is None:
+            return
+        try:
+            await self.pubsub.unsubscribe(user_channel(user_id))
+        except RedisError as e:
+            logger.warning("Could not unsubscribe user %s: %s", user_id, e)
+
+    async def deliver(self, user_id: int, frame: bytes, data: bytes) -> bool:
+        if self.is_local(user_id):
+            return await self.send_local(user_id, frame, data)
+        token = uuid.uuid4().hex
+        confirmed = asyncio.get_running_loop().create_future()
+        self.waiting[token] = confirmed
+        try:
+            if not self.acks_subscribed:
+                await self.subscribe(ack_channel(self.node))
+                self.acks_subscribed = True
+            header = f"{self.node}:{token}\n".encode()
+            receivers = await self.client.publish(
+                user_channel(user_id), frame + header + data
+            )
+            if not receivers:
+                return False
+            return await asyncio.wait_for(confirmed, DELIVERY_TIMEOUT)
+        except RedisError as e:
+            logger.warning(
+                "Backplane unavailable, not delivering to %s: %s", user_id, e
+            )
+            return False
+        except asyncio.TimeoutError:
+            logger.warning("No delivery confirmation from user %s", user_id)
+            return False
+        finally:
+            self.waiting.pop(token, None)
+
+    async def confirm(self, node: str, token: str, delivered: bool):
+        try:
+            await self.client.publish(
+                ack_channel(node), f"{token}:{int(delivered)}".encode()
+            )
+        except RedisError as e:
+            logger.warning("Could not confirm delivery %s: %s", token, e)
+
+    async def receive(self, channel: str, body: bytes):
+        if channel == ack_channel(self.node):
+            token, delivered = body.decode().split(":")
+            confirmed = self.waiting.get(token)
+            if confirmed is not None and not confirmed.done():
+                confirmed.set_result(delivered == "1")
+            return
+        user_id = int(channel.rsplit(":", 1)[1])
+        header, data = body[1:].split(b"\n", 1)
+        node, token = header.decode().split(":")
+        self.forward(user_id, (body[:1], data, node, token))
+
+    def forward(self, user_id: int, item: tuple):
+        """Queue a frame for ``user_id``'s socket, starting its sender task
+        if none is running.
+        """
+        deadline = asyncio.get_running_loop().time() + DELIVERY_TIMEOUT
+        queue = self.outbox.get(user_id)
+        if queue is None:
+            queue = self.outbox[user_id] = asyncio.Queue()
+            task = asyncio.create_task(self.drain(user_id, queue))
+            self.senders.add(task)
+            task.add_done_callback(self.senders.discard)
+        queue.put_nowait((deadline, item))
+
+    async def drain(self, user_id: int, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        try:
+            while not queue.empty():
+                deadline, (frame, data, node, token) = queue.get_nowait()
+                delivered = False
+                if loop.time() < deadline:
+                    delivered = await self.send_local(user_id, frame, data)
+                await self.confirm(node, token, delivered)
+        finally:
+            if self.outbox.get(user_id) is queue:
+                self.outbox.pop(user_id)
+
+    async def listen(self):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await asyncio.sleep(1)
+                    continue
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Backplane listener error: %s", e)
+                await asyncio.sleep(1)
+                continue
+            if not message:
+                continue
+            try:
+                await self.receive(message["channel"].decode(), message["data"])
+            except Exception as e:
+                logger.warning("Dropped malformed backplane message: %s", e)
+
+
+def make_backplane(kind: str):
+    if kind == "redis":
+        return RedisBackplane(redis_client)
+    return LocalBackplane()
+
+
+backplane = make_backplane(settings.CHAT_BACKPLANE)
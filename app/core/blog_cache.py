@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+from redis.exceptions import RedisError
+from app.core.redis_config import redis_client
+from app.log.logger import get_loggers
+import orjson
+
+BLOG_CACHE_TTL = 300
+LOCAL_CACHE_SIZE = 1024
+
+logger = get_loggers("blog_cache")
+
+
+def version_key(blog_id: int) -> str:
+    return f"blog:ver:{blog_id}"
+
+
+def detail_key(blog_id: int, version: int) -> str:
+    return f"blog:detail:{blog_id}:{version}"
+
+
+def viewers_key(blog_id: int) -> str:
+    return f"blog:viewers:{blog_id}"
+
+
+class LocalCache:
+    """A small per-process LRU in front of Redis. Entries are keyed by
+    ``(blog_id, version)``, so a version bump from any process makes the old
+    entry unreachable without having to reach every worker.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key) -> Any:
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+local_cache = LocalCache(LOCAL_CACHE_SIZE)
+
+
+async def cached_blog(blog_id: int) -> Tuple[dict | None, int | None]:
+    """Cached detail payload of a blog and the version it was read at.
+
+    The version has to be handed back to ``store_blog`` after a miss, so a
+    payload built while a writer bumped the version is stored under the old,
+    already unreachable key. Returns ``(None, None)`` when Redis is down.
+    """
+    try:
+        version = int(await redis_client.get(version_key(blog_id)) or 0)
+        payload = local_cache.get((blog_id, version))
+        if payload is not None:
+            return payload, version
+        raw = await redis_client.get(detail_key(blog_id, version))
+    except RedisError as e:
+        logger.warning("Blog cache unavailable, reading blog %s: %s", blog_id, e)
+        return None, None
+    if raw is None:
+        return None, version
+    payload = orjson.loads(raw)
+    local_cache.put((blog_id, version), payload)
+    return payload, version
+
+
+async def store_blog(blog_id: int, version: int | None, payload: dict):
+    if version is None:
+        return
+    local_cache.put((blog_id, version), payload)
+    try:
+        await redis_client.set(
+            detail_key(blog_id, version), orjson.dumps(payload), ex=BLOG_CACHE_TTL
+        )
+    except RedisError:
+        pass
+
+
+async def cached_reaction(blog_id: int, user_id: int) -> Tuple[bool, str | None]:
+    """The viewer's own reaction on a blog from the blog's viewers hash:
+    ``(True, type)``, ``(True, None)`` when they are known not to have
+    reacted, or ``(False, None)`` when it is not cached or Redis is down.
+    """
+    try:
+        value = await redis_client.hget(viewers_key(blog_id), user_id)
+    except RedisError:
+        return False, None
+    if value is None:
+        return False, None
+    return True, value.decode() or None
+
+
+async def remember_reactions(
+    user_id: int, reactions: Dict[int, str | None], overwrite: bool = True
+):
+    """Record a viewer's reaction (``None`` for none) per blog id.
+
+    Writers overwrite after their commit; readers pass ``overwrite=False``
+    so a value read from the database never replaces a newer write. Each
+    hash lives ``BLOG_CACHE_TTL`` seconds from its first field.
+    """
+    if not reactions:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for blog_id, rtype in reactions.items():
+            if overwrite:
+                pipe.hset(viewers_key(blog_id), user_id, rtype or "")
+            else:
+                pipe.hsetnx(viewers_key(blog_id), user_id, rtype or "")
+            pipe.expire(viewers_key(blog_id), BLOG_CACHE_TTL, nx=True)
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("Could not cache reactions of user %s: %s", user_id, e)
+
+
+async def invalidate_blog(*blog_ids: int):
+    try:
+        for blog_id in blog_ids:
+            await redis_client.incr(version_key(blog_id))
+    except RedisError as e:
+        logger.warning("Could not invalidate cached blogs %s: %s", blog_ids, e)
+
+
+def invalidate_blogs_sync(client, blog_ids: Iterable[int]):
+    """``invalidate_blog`` for Celery workers, given a synchronous client."""
+    pipe = client.pipeline(transaction=False)
+    for blog_id in blog_ids:
+        pipe.incr(version_key(blog_id))
+    pipe.execute()
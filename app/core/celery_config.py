@@ -27,5 +27,21 @@ celery_app.conf.update(
             "task": "app.database.scheduler.send_email",
             "schedule": 5,
         },
+        "reconcile-reaction-counters-hourly": {
+            "task": "app.task.reconcile_reactions",
+            "schedule": 3600,
+        },
+        "flush-engagement-counters-every-5-seconds": {
+            "task": "app.task.flush_counters",
+            "schedule": 5,
+        },
+        "roll-up-reaction-events-every-2-seconds": {
+            "task": "app.task.roll_up_reactions",
+            "schedule": 2,
+        },
+        "refresh-hot-scores-every-5-minutes": {
+            "task": "app.task.refresh_hot_scores",
+            "schedule": 300,
+        },
     },
 )
@@ -14,6 +14,8 @@ class SETTINGS(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     DEBUG: bool = False
+    REACTION_INGEST: str = "direct"
+    CHAT_BACKPLANE: str = "local"
     model_config = {"env_file": ".env"}
 
 
@@ -0,0 +1,228 @@
+from fastapi import HTTPException
+from sqlalchemy import select, func, tuple_, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from datetime import datetime
+from typing import Any, List, Tuple
+from redis.exceptions import RedisError
+from app.models import PaginatedResponse
+from app.core.redis_config import redis_client
+from app.log.logger import get_loggers
+import base64
+import binascii
+import hashlib
+import json
+
+COUNT_MODES = ["exact", "cached", "estimate"]
+COUNT_CACHE_TTL = 60
+
+logger = get_loggers("pagination")
+
+
+def encode_cursor(tag: str, values: List[Any]) -> str:
+    raw = json.dumps(
+        {
+            "s": tag,
+            "k": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        }
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(tag: str, cursor: str, keys: list) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+        values = decoded["k"]
+        if decoded["s"] != tag or len(values) != len(keys):
+            raise ValueError("cursor does not match this listing")
+        return [
+            (
+                datetime.fromisoformat(value)
+                if isinstance(key.type, DateTime) and value is not None
+                else value
+            )
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def fetch_rows(result, scalars: bool) -> list:
+    return result.scalars().all() if scalars else result.all()
+
+
+def key_values(row, keys: list) -> List[Any]:
+    return [getattr(row, key.key) for key in keys]
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def count_rows(db: AsyncSession, stmt) -> int:
+    return (
+        await db.execute(select(func.count()).select_from(stmt.subquery()))
+    ).scalar() or 0
+
+
+async def estimate_rows(db: AsyncSession, stmt) -> int | None:
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    plan = (await db.execute(Explain(stmt))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def generation_key(scope: str) -> str:
+    return f"total:gen:{scope}"
+
+
+async def invalidate_totals(*scopes: str):
+    try:
+        for scope in scopes:
+            await redis_client.incr(generation_key(scope))
+    except RedisError as e:
+        logger.warning("Could not invalidate cached totals %s: %s", scopes, e)
+
+
+async def cached_rows(db: AsyncSession, stmt, scope: str) -> int:
+    compiled = stmt.compile(dialect=db.get_bind().dialect)
+    digest = hashlib.sha1(
+        (str(compiled) + repr(sorted(compiled.params.items()))).encode()
+    ).hexdigest()
+    try:
+        generation = int(await redis_client.get(generation_key(scope)) or 0)
+        key = f"total:{scope}:{generation}:{digest}"
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return int(cached)
+    except RedisError as e:
+        logger.warning("Count cache unavailable, counting exactly: %s", e)
+        return await count_rows(db, stmt)
+    total = await count_rows(db, stmt)
+    try:
+        await redis_client.set(key, total, ex=COUNT_CACHE_TTL)
+    except RedisError:
+        pass
+    return total
+
+
+def wants_total(with_total: bool | None, count_mode: str | None, default: bool):
+    """Whether a listing counts its total: ``with_total`` decides when it is
+    given, asking for a ``count_mode`` requests a total, and otherwise the
+    listing's own default applies.
+    """
+    if with_total is not None:
+        return with_total
+    return count_mode is not None or default
+
+
+async def count_total(
+    db: AsyncSession, stmt, count_mode: str | None = "exact", scope: str = ""
+) -> int | None:
+    """Total number of rows ``stmt`` would return.
+
+    ``exact`` runs ``count(*)`` every time. ``cached`` keeps that count in
+    Redis under the statement's SQL and parameters for ``COUNT_CACHE_TTL``
+    seconds; writers call ``invalidate_totals(scope)`` to drop every cached
+    total of a table at once. ``estimate`` reads the planner's row estimate
+    without scanning, and gives no total where the database has no planner
+    estimate; ``has_more`` on the page still tells clients whether to go on.
+    No ``count_mode`` counts exactly.
+    """
+    if count_mode == "estimate":
+        return await estimate_rows(db, stmt)
+    if count_mode == "cached":
+        return await cached_rows(db, stmt, scope)
+    return await count_rows(db, stmt)
+
+
+async def offset_page(
+    db: AsyncSession,
+    stmt,
+    page: int,
+    limit: int,
+    with_total: bool | None = None,
+    count_mode: str | None = None,
+    scope: str = "",
+    scalars: bool = True,
+    count_by_default: bool = True,
+) -> Tuple[list, PaginatedResponse]:
+    """Page through an already ordered ``stmt``, e.g. relevance-ranked search.
+
+    The total is counted as decided by ``wants_total``; listings that should
+    skip it unless asked pass ``count_by_default=False``. Pass
+    ``scalars=False`` for column projections to get the rows as is.
+    """
+    total = None
+    if wants_total(with_total, count_mode, count_by_default):
+        total = await count_total(db, stmt, count_mode, scope)
+    rows = fetch_rows(
+        await db.execute(stmt.offset((page - 1) * limit).limit(limit + 1)), scalars
+    )
+    return rows[:limit], PaginatedResponse(
+        page=page, limit=limit, total=total, has_more=len(rows) > limit
+    )
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt,
+    keys: list,
+    page: int,
+    limit: int,
+    cursor: str | None = None,
+    with_total: bool | None = None,
+    descending: bool = True,
+    tag: str = "",
+    count_mode: str | None = None,
+    scope: str = "",
+    scalars: bool = True,
+    count_by_default: bool = True,
+) -> Tuple[list, PaginatedResponse]:
+    """Run ``stmt`` ordered by ``keys`` and return one page of rows.
+
+    With a ``cursor`` the page is found by seeking past the last key of the
+    previous page instead of skipping ``(page - 1) * limit`` rows, so deep
+    pages cost the same as the first one. ``keys`` must end with a unique
+    column and be backed by a matching index. The total is counted with
+    ``count_mode`` as decided by ``wants_total``; feeds pass
+    ``count_by_default=False`` so it is only counted when asked for.
+    Column projections must select the key columns and pass ``scalars=False``.
+    """
+    total = None
+    if wants_total(with_total, count_mode, count_by_default):
+        total = await count_total(db, stmt, count_mode, scope)
+    if cursor:
+        values = decode_cursor(tag, cursor, keys)
+        if descending:
+            stmt = stmt.where(tuple_(*keys) < tuple_(*values))
+        else:
+            stmt = stmt.where(tuple_(*keys) > tuple_(*values))
+    else:
+        stmt = stmt.offset((page - 1) * limit)
+    stmt = stmt.order_by(*[key.desc() if descending else key.asc() for key in keys])
+    rows = fetch_rows(await db.execute(stmt.limit(limit + 1)), scalars)
+    next_cursor = None
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(tag, key_values(rows[-1], keys))
+    return rows, PaginatedResponse(
+        page=page,
+        limit=limit,
+        total=total,
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
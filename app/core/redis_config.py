@@ -0,0 +1,7 @@
+import redis
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+
+redis_client = aioredis.from_url(settings.REDIS_URL)
+sync_redis = redis.Redis.from_url(settings.REDIS_URL)
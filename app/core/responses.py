@@ -0,0 +1,19 @@
+from fastapi.responses import ORJSONResponse
+from app.models import PaginatedResponse
+
+
+def fast_response(status: str, message: str, data=None) -> ORJSONResponse:
+    """Encode a ``StandardResponse``-shaped body straight to JSON bytes.
+
+    Returning a response object skips FastAPI's ``response_model`` validation
+    and serialization; routes keep ``response_model`` for the OpenAPI schema
+    only and must build ``data`` in that shape themselves.
+    """
+    body = {"status": status, "message": message}
+    if data is not None:
+        body["data"] = data
+    return ORJSONResponse(body)
+
+
+def page_data(items: list, pagination: PaginatedResponse) -> dict:
+    return {"items": items, "pagination": pagination.model_dump(exclude_none=True)}
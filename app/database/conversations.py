@@ -0,0 +1,253 @@
+from sqlalchemy import select, update, func, case, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+from datetime import datetime
+from typing import Iterable, Tuple
+from app.model_sql import Conversation, Messaging, User
+
+
+def upsert_conversations(stmt, unread: str = "add"):
+    """``ON CONFLICT`` on ``unique_conversation`` that moves the last-message
+    pointer forward only, so late or replayed writes never rewind it. The
+    incoming unread count is added, ``set`` over the stored one, or ignored
+    with ``keep``.
+    """
+    excluded = stmt.excluded
+    unread_count = {
+        "add": Conversation.unread_count + excluded.unread_count,
+        "set": excluded.unread_count,
+        "keep": Conversation.unread_count,
+    }[unread]
+    return stmt.on_conflict_do_update(
+        index_elements=[Conversation.user_id, Conversation.peer_id],
+        set_={
+            "last_message_id": func.greatest(
+                Conversation.last_message_id, excluded.last_message_id
+            ),
+            "last_message_at": func.greatest(
+                Conversation.last_message_at, excluded.last_message_at
+            ),
+            "unread_count": unread_count,
+        },
+    )
+
+
+def record_messages(messages: Iterable[Tuple[int, int, int, datetime, bool]]):
+    """One upsert for a batch of ``(sender_id, receiver_id, message_id,
+    sent_at, delivered)``. Rows are collapsed per conversation, since
+    ``ON CONFLICT`` may touch a row only once per statement, and sorted so
+    concurrent writers lock them in the same order.
+    """
+    rows = {}
+    for sender_id, receiver_id, message_id, sent_at, delivered in messages:
+        sides = [(sender_id, receiver_id, 0)]
+        if receiver_id != sender_id:
+            sides.append((receiver_id, sender_id, 0 if delivered else 1))
+        for user_id, peer_id, unread in sides:
+            row = rows.setdefault(
+                (user_id, peer_id),
+                {
+                    "user_id": user_id,
+                    "peer_id": peer_id,
+                    "last_message_id": message_id,
+                    "last_message_at": sent_at,
+                    "unread_count": 0,
+                },
+            )
+            row["last_message_id"] = max(row["last_message_id"], message_id)
+            row["last_message_at"] = max(row["last_message_at"], sent_at)
+            row["unread_count"] += unread
+    return upsert_conversations(
+        insert(Conversation).values([rows[key] for key in sorted(rows)])
+    )
+
+
+def record_message(
+    sender_id: int,
+    receiver_id: int,
+    message_id: int,
+    sent_at: datetime,
+    delivered: bool = False,
+):
+    """Point both participants' conversation rows at a new message in one
+    upsert, and count it as unread for the receiver unless it was delivered
+    live.
+    """
+    return record_messages([(sender_id, receiver_id, message_id, sent_at, delivered)])
+
+
+def undelivered(user_id: int, peer_id: int):
+    """Messages from ``peer_id`` not yet delivered to ``user_id``, a range of
+    the partial ``ix_messages_undelivered``.
+    """
+    return (
+        Messaging.receiver_id == user_id,
+        Messaging.user_id == peer_id,
+        Messaging.delivered.is_(False),
+    )
+
+
+def acknowledge(user_id: int, peer_id: int | None, ack_id: int):
+    """Mark everything ``peer_id`` sent up to ``ack_id`` as delivered, or,
+    without a peer, the user's whole backlog up to ``ack_id``.
+    """
+    if peer_id is None:
+        conditions = (Messaging.receiver_id == user_id, Messaging.delivered.is_(False))
+    else:
+        conditions = undelivered(user_id, peer_id)
+    return (
+        update(Messaging)
+        .where(*conditions, Messaging.id <= ack_id)
+        .values(delivered=True)
+    )
+
+
+def mark_read(user_id: int, peer_ids: Iterable[int]):
+    """Reset the unread counts to what is still undelivered after an ack."""
+    remaining = (
+        select(func.count())
+        .where(*undelivered(user_id, Conversation.peer_id))
+        .scalar_subquery()
+    )
+    return (
+        update(Conversation)
+        .where(Conversation.user_id == user_id, Conversation.peer_id.in_(peer_ids))
+        .values(unread_count=remaining)
+    )
+
+
+def backlog(user_id: int, after_id: int, limit: int):
+    """The next ``limit`` undelivered messages of a user in id order, from
+    the partial ``ix_messages_backlog``.
+    """
+    return (
+        select(Messaging.id, Messaging.user_id, Messaging.message, Messaging.pics)
+        .where(
+            Messaging.receiver_id == user_id,
+            Messaging.delivered.is_(False),
+            Messaging.id > after_id,
+        )
+        .order_by(Messaging.id)
+        .limit(limit)
+    )
+
+
+def chat_history(
+    user_id: int,
+    peer_id: int,
+    limit: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+):
+    """``limit`` + 1 messages between two users, seeking on ``ix_messages_pair``:
+    newest first, or older than ``before_id``, or, oldest first, newer than
+    ``after_id``.
+    """
+    low, high = sorted((user_id, peer_id))
+    stmt = select(Messaging).where(
+        func.least(Messaging.user_id, Messaging.receiver_id) == low,
+        func.greatest(Messaging.user_id, Messaging.receiver_id) == high,
+    )
+    if after_id is not None:
+        return (
+            stmt.where(Messaging.id > after_id).order_by(Messaging.id).limit(limit + 1)
+        )
+    if before_id is not None:
+        stmt = stmt.where(Messaging.id < before_id)
+    return stmt.order_by(Messaging.id.desc()).limit(limit + 1)
+
+
+def inbox(user_id: int):
+    """The user's conversations with their last message, as one range of
+    ``ix_conversations_inbox``; page it on ``last_message_at, id``.
+    """
+    peer = aliased(User)
+    return (
+        select(
+            Conversation.id,
+            Conversation.last_message_at,
+            Conversation.unread_count,
+            peer.username.label("peer"),
+            Messaging.id.label("message_id"),
+            Messaging.username,
+            Messaging.receiver,
+            Messaging.message,
+            Messaging.pics,
+            Messaging.delivered,
+            Messaging.time_of_chat,
+        )
+        .join(peer, peer.id == Conversation.peer_id)
+        .outerjoin(Messaging, Messaging.id == Conversation.last_message_id)
+        .where(Conversation.user_id == user_id)
+    )
+
+
+def backfill_receivers():
+    """Resolve ``receiver_id`` of messages stored before it existed.
+
+    Usernames are not unique, so only a username held by exactly one user
+    is resolved; messages to an ambiguous or unknown name keep a ``NULL``
+    ``receiver_id`` and are listed by ``unresolved_receivers``.
+    """
+    owners = (
+        select(User.username, func.min(User.id).label("id"))
+        .group_by(User.username)
+        .having(func.count() == 1)
+        .subquery()
+    )
+    return (
+        update(Messaging)
+        .where(Messaging.receiver_id.is_(None), owners.c.username == Messaging.receiver)
+        .values(receiver_id=owners.c.id)
+    )
+
+
+def unresolved_receivers(limit: int = 50):
+    """Receiver names of messages still without ``receiver_id``, with their
+    message counts, most messages first.
+    """
+    return (
+        select(Messaging.receiver, func.count().label("messages"))
+        .where(Messaging.receiver_id.is_(None))
+        .group_by(Messaging.receiver)
+        .order_by(func.count().desc())
+        .limit(limit)
+    )
+
+
+def backfill_conversations(side: str):
+    """Build conversation rows from the message history, one statement per
+    ``side`` ("sender" or "receiver"); safe to run again.
+    """
+    owner, peer = (
+        (Messaging.user_id, Messaging.receiver_id)
+        if side == "sender"
+        else (Messaging.receiver_id, Messaging.user_id)
+    )
+    unread = (
+        func.sum(case((Messaging.delivered.is_(False), 1), else_=0))
+        if side == "receiver"
+        else literal(0)
+    )
+    history = (
+        select(
+            owner,
+            peer,
+            func.max(Messaging.id),
+            func.max(Messaging.time_of_chat),
+            unread,
+        )
+        .where(Messaging.user_id.is_not(None), Messaging.receiver_id.is_not(None))
+        .group_by(owner, peer)
+    )
+    stmt = insert(Conversation).from_select(
+        [
+            "user_id",
+            "peer_id",
+            "last_message_id",
+            "last_message_at",
+            "unread_count",
+        ],
+        history,
+    )
+    return upsert_conversations(stmt, "set" if side == "receiver" else "keep")
@@ -0,0 +1,210 @@
+from sqlalchemy import select, update, bindparam, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from collections import defaultdict
+from typing import Dict, List
+from redis.exceptions import RedisError
+from app.core.redis_config import redis_client
+from app.model_sql import Blog, Comment, Share
+from app.database.reactions import REACTION_COUNTERS
+from app.database.ranking import rescore_blogs
+from app.log.logger import get_loggers
+
+COUNTER_DIRTY = "counters:dirty"
+COUNTER_LOCK = "locks:counter_flush"
+COUNTER_MODELS = {model.__tablename__: model for model in (Blog, Comment)}
+REACTION_FIELDS = {column: rtype.value for rtype, column in REACTION_COUNTERS.items()}
+
+logger = get_loggers("counters")
+
+
+def counter_update(model, columns: List[str]):
+    """``UPDATE ... SET x = x + :delta_x WHERE id = :target_id`` for ``columns``.
+
+    Built on the Core table so it can be executed with a list of parameter
+    dicts (one per target row) as a single executemany. Counters never drop
+    below zero.
+    """
+    table = model.__table__
+    return (
+        update(table)
+        .where(table.c.id == bindparam("target_id"))
+        .values(
+            {
+                column: func.greatest(
+                    func.coalesce(table.c[column], 0) + bindparam(f"delta_{column}"),
+                    0,
+                )
+                for column in columns
+            }
+        )
+    )
+
+
+def counter_params(deltas: Dict[int, Dict[str, int]], columns: List[str]) -> List[dict]:
+    return [
+        {
+            "target_id": target_id,
+            **{f"delta_{column}": changes.get(column, 0) for column in columns},
+        }
+        for target_id, changes in deltas.items()
+    ]
+
+
+def new_deltas() -> Dict[int, Dict[str, int]]:
+    return defaultdict(lambda: defaultdict(int))
+
+
+def buffer_key(table: str, target_id) -> str:
+    return f"counters:{table}:{target_id}"
+
+
+async def bump(db: AsyncSession, model, target_id: int, deltas: Dict[str, int]):
+    """Record counter changes of one row without touching the row.
+
+    Deltas are added with ``HINCRBY`` to a per-row hash and the row is
+    marked dirty; ``flush_counters`` later applies them to the database in
+    batches. Call it after the request's own commit. When Redis is down
+    the deltas are applied straight away with an atomic ``UPDATE``.
+    """
+    if target_id is not None:
+        await bump_many(db, model, {target_id: deltas})
+
+
+async def bump_many(db: AsyncSession, model, deltas: Dict[int, Dict[str, int]]):
+    """``bump`` for many rows of ``model`` in one Redis round trip."""
+    deltas = {
+        target_id: {column: delta for column, delta in changes.items() if delta}
+        for target_id, changes in deltas.items()
+    }
+    deltas = {target_id: changes for target_id, changes in deltas.items() if changes}
+    if not deltas:
+        return
+    table = model.__tablename__
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        for target_id, changes in deltas.items():
+            for column, delta in changes.items():
+                pipe.hincrby(buffer_key(table, target_id), column, delta)
+            pipe.sadd(COUNTER_DIRTY, f"{table}:{target_id}")
+        await pipe.execute()
+        return
+    except RedisError as e:
+        logger.warning("Counter buffer unavailable, updating %s directly: %s", table, e)
+    columns = sorted({column for changes in deltas.values() for column in changes})
+    await db.execute(counter_update(model, columns), counter_params(deltas, columns))
+    if model is Blog:
+        await db.execute(rescore_blogs(list(deltas)))
+    await db.commit()
+
+
+def engagement_counts(model) -> dict:
+    """The non-reaction counters ``bump`` maintains, counted from their source
+    rows: ``comments_count`` and ``share_count`` of blogs, ``replies_count``
+    of comments.
+    """
+    if model is Blog:
+        return {
+            "comments_count": select(func.count(Comment.id))
+            .where(Comment.blog_id == Blog.id)
+            .scalar_subquery(),
+            "share_count": select(func.count(Share.id))
+            .where(Share.blog_id == Blog.id)
+            .scalar_subquery(),
+        }
+    reply = aliased(Comment)
+    return {
+        "replies_count": select(func.count(reply.id))
+        .where(reply.parent_id == Comment.id)
+        .scalar_subquery()
+    }
+
+
+async def pending_counters(model, ids: List[int]) -> Dict[int, Dict[str, int]]:
+    if not ids:
+        return {}
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for target_id in ids:
+            pipe.hgetall(buffer_key(model.__tablename__, target_id))
+        buffered = await pipe.execute()
+    except RedisError:
+        return {}
+    return {
+        target_id: {field.decode(): int(value) for field, value in fields.items()}
+        for target_id, fields in zip(ids, buffered)
+        if fields
+    }
+
+
+async def merge_pending(model, items: List[dict], reaction_field: str):
+    """Add the not yet flushed deltas to ``items`` built by
+    ``blog_item``/``comment_item``, so reads see every counted write.
+    """
+    pending = await pending_counters(model, [item["id"] for item in items])
+    add_deltas(items, pending, reaction_field)
+
+
+def add_deltas(
+    items: List[dict], deltas: Dict[int, Dict[str, int]], reaction_field: str
+):
+    for item in items:
+        for column, delta in deltas.get(item["id"], {}).items():
+            if column in REACTION_FIELDS:
+                reactions = item[reaction_field]
+                field = REACTION_FIELDS[column]
+                reactions[field] = max(reactions.get(field, 0) + delta, 0)
+            else:
+                item[column] = max((item.get(column) or 0) + delta, 0)
+
+
+def drain_counters(
+    client, members: List[bytes]
+) -> Dict[str, Dict[int, Dict[str, int]]]:
+    """Read and clear the buffered deltas of ``members`` in one MULTI, so
+    increments that arrive meanwhile land in a fresh hash.
+    """
+    pipe = client.pipeline(transaction=True)
+    keys = []
+    for member in members:
+        table, target_id = member.decode().split(":")
+        keys.append((table, int(target_id)))
+        pipe.hgetall(buffer_key(table, target_id))
+        pipe.delete(buffer_key(table, target_id))
+    buffered = pipe.execute()[::2]
+    drained = defaultdict(dict)
+    for (table, target_id), fields in zip(keys, buffered):
+        if fields:
+            drained[table][target_id] = {
+                field.decode(): int(value) for field, value in fields.items()
+            }
+    return drained
+
+
+def drain_rows(client, table: str, ids) -> Dict[str, Dict[int, Dict[str, int]]]:
+    """``drain_counters`` for the rows ``ids`` of ``table``, dirty or not."""
+    return drain_counters(
+        client, [f"{table}:{target_id}".encode() for target_id in ids]
+    )
+
+
+def restore_counters(client, drained: Dict[str, Dict[int, Dict[str, int]]]):
+    pipe = client.pipeline(transaction=True)
+    for table, deltas in drained.items():
+        for target_id, fields in deltas.items():
+            for column, delta in fields.items():
+                pipe.hincrby(buffer_key(table, target_id), column, delta)
+            pipe.sadd(COUNTER_DIRTY, f"{table}:{target_id}")
+    pipe.execute()
+
+
+def apply_counters(db: Session, drained: Dict[str, Dict[int, Dict[str, int]]]):
+    """One executemany ``UPDATE`` per table, then a fresh ``hot_score`` for
+    the blogs whose engagement changed.
+    """
+    for table, deltas in drained.items():
+        model = COUNTER_MODELS[table]
+        columns = sorted({column for fields in deltas.values() for column in fields})
+        db.execute(counter_update(model, columns), counter_params(deltas, columns))
+        if model is Blog:
+            db.execute(rescore_blogs(list(deltas)))
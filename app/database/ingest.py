@@ -0,0 +1,155 @@
+from fastapi import HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Tuple
+from app.model_sql import Blog
+from app.models import Blogger
+from app.database.ranking import hot_score
+from app.database.timeline import post_score
+import orjson
+
+BULK_CHUNK = 500
+MAX_BULK_CHUNK = 5000
+MAX_BULK_ITEMS = 10000
+
+blogger_adapter = TypeAdapter(Blogger)
+
+
+async def ndjson_items(request: Request) -> AsyncIterator[Any]:
+    """Decode a newline-delimited JSON body line by line as it streams in.
+
+    Lines that are not valid JSON are yielded as ``ValueError`` instances so
+    the caller can report them against their position.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield decode_line(line)
+    if buffer.strip():
+        yield decode_line(buffer)
+
+
+def decode_line(line: bytes) -> Any:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return ValueError(str(e))
+
+
+def is_ndjson(request: Request) -> bool:
+    return request.headers.get("content-type", "").startswith("application/x-ndjson")
+
+
+async def request_items(request: Request) -> AsyncIterator[Any]:
+    """Items of a bulk body. A JSON array is read whole, so one longer than
+    ``MAX_BULK_ITEMS`` is rejected with 413 before anything is written; NDJSON
+    is streamed and has no item limit.
+    """
+    if is_ndjson(request):
+        async for item in ndjson_items(request):
+            yield item
+        return
+    try:
+        items = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        yield ValueError(str(e))
+        return
+    if not isinstance(items, list):
+        yield ValueError("body must be a JSON array or NDJSON")
+        return
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"at most {MAX_BULK_ITEMS} blogs per JSON array, send NDJSON",
+        )
+    for item in items:
+        yield item
+
+
+def blog_row(item: Any, user_id: int, now: datetime) -> dict:
+    """Validate one payload as ``Blogger`` and turn it into ``blogs`` values.
+
+    Raises ``ValidationError`` or ``ValueError`` for a payload that cannot be
+    stored. A ``time_of_post`` sent by the importer is kept, clamped to
+    ``now`` so future-dated posts cannot pin themselves to the top of the
+    feeds.
+    """
+    if isinstance(item, ValueError):
+        raise item
+    blog = blogger_adapter.validate_python(item)
+    time_of_post = blog.time_of_post or now
+    if time_of_post.tzinfo is None:
+        time_of_post = time_of_post.replace(tzinfo=timezone.utc)
+    time_of_post = min(time_of_post, now)
+    return {
+        "user_id": user_id,
+        "title": blog.title,
+        "content": blog.content,
+        "time_of_post": time_of_post,
+        "hot_score": hot_score(0, 0, 0, time_of_post, now),
+    }
+
+
+async def insert_blogs(
+    db: AsyncSession, rows: List[dict]
+) -> List[Tuple[int, datetime]]:
+    """Insert ``rows`` with multi-row ``INSERT ... RETURNING`` statements and
+    return ``(id, time_of_post)`` for each, in the order of ``rows``.
+    """
+    result = await db.execute(
+        insert(Blog).returning(
+            Blog.id, Blog.time_of_post, sort_by_parameter_order=True
+        ),
+        rows,
+    )
+    return [tuple(row) for row in result.all()]
+
+
+def item_error(error: Exception) -> str | list:
+    if isinstance(error, ValidationError):
+        return [
+            {"loc": list(detail["loc"]), "msg": detail["msg"]}
+            for detail in error.errors()
+        ]
+    return str(error)
+
+
+async def write_chunk(
+    db: AsyncSession, pending: List[Tuple[int, dict]]
+) -> Tuple[List[dict], List[Tuple[int, float]]]:
+    """Insert and commit one chunk of validated rows.
+
+    A chunk rejected for its data (``IntegrityError``, ``DataError``) is
+    rolled back and retried row by row, so only the rows that cannot be
+    stored fail; any other database error fails the whole chunk. Returns a
+    result per item and ``(blog_id, timeline score)`` pairs for fan-out.
+    """
+    try:
+        inserted = await insert_blogs(db, [row for _, row in pending])
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        if len(pending) > 1 and isinstance(e, (IntegrityError, DataError)):
+            results, entries = [], []
+            for item in pending:
+                item_results, item_entries = await write_chunk(db, [item])
+                results += item_results
+                entries += item_entries
+            return results, entries
+        return [
+            {"index": index, "status": "failed", "errors": str(e.__cause__ or e)}
+            for index, _ in pending
+        ], []
+    results = [
+        {"index": index, "status": "created", "id": blog_id}
+        for (index, _), (blog_id, _) in zip(pending, inserted)
+    ]
+    return results, [
+        (blog_id, post_score(time_of_post)) for blog_id, time_of_post in inserted
+    ]
@@ -0,0 +1,214 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, InterfaceError, OperationalError
+from typing import List, Tuple
+from app.core.async_config import AsyncSessionLocal
+from app.core.pagination import invalidate_totals
+from app.model_sql import Messaging
+from app.database.conversations import record_messages
+from app.log.logger import get_loggers
+import asyncio
+import contextlib
+import os
+import uuid
+
+WRITE_BATCH = 200
+WRITE_DELAY = 0.01
+WRITE_QUEUE = 10000
+CLOSE_TIMEOUT = 10
+WRITE_RETRIES = 3
+WRITE_BACKOFF = 0.1
+
+logger = get_loggers("message_writer")
+
+
+def save_image(data: bytes) -> str:
+    filename = str(uuid.uuid4())
+    with open(os.path.join("images", filename), "wb") as buffer:
+        buffer.write(data)
+    return f"/images/{filename}"
+
+
+async def store_image(data: bytes) -> str:
+    """Write an image frame under ``images/`` like ``/message/send`` does and
+    return its URL for ``Messaging.pics``, a text column.
+    """
+    return await asyncio.to_thread(save_image, data)
+
+
+def message_row(
+    user_id: int,
+    receiver_id: int,
+    username: str,
+    sent_at,
+    delivered: bool,
+    message: str | None = None,
+    pics: str | None = None,
+) -> dict:
+    return {
+        "user_id": user_id,
+        "receiver_id": receiver_id,
+        "username": username,
+        "message": message,
+        "pics": pics,
+        "time_of_chat": sent_at,
+        "delivered": delivered,
+    }
+
+
+def fail(batch: List[Tuple[dict, asyncio.Future]], error: Exception):
+    for _, saved in batch:
+        if not saved.done():
+            saved.set_exception(error)
+
+
+class MessageWriter:
+    """Write-behind persistence for chat messages.
+
+    Frames are queued with ``submit`` and a background task stores them in
+    batches of up to ``batch`` rows, waiting ``delay`` seconds for a batch
+    to fill: one multi-row ``INSERT ... RETURNING``, one conversation upsert
+    and one commit per batch instead of per message. The future returned by
+    ``submit`` resolves to the message id once its batch has committed. The
+    queue is bounded, so a writer that falls behind slows the senders down
+    instead of growing without limit.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        batch: int = WRITE_BATCH,
+        delay: float = WRITE_DELAY,
+        maxsize: int = WRITE_QUEUE,
+    ):
+        self.session_factory = session_factory
+        self.batch = batch
+        self.delay = delay
+        self.maxsize = maxsize
+        self.queue: asyncio.Queue | None = None
+        self.task: asyncio.Task | None = None
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.maxsize)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def submit(self, row: dict) -> asyncio.Future:
+        """Queue a ``messages`` row; waits only while the queue is full."""
+        self.start()
+        saved = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, saved))
+        return saved
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() < self.batch - 1:
+                await asyncio.sleep(self.delay)
+            while len(batch) < self.batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.write(batch)
+            except asyncio.CancelledError:
+                fail(batch, RuntimeError("message writer stopped"))
+                raise
+            except Exception as e:
+                logger.error("Chat message writer failed on a batch: %s", e)
+                fail(batch, e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def store(self, rows: List[dict]) -> List[int]:
+        async with self.session_factory() as db:
+            stmt = insert(Messaging).returning(
+                Messaging.id, sort_by_parameter_order=True
+            )
+            ids = (await db.execute(stmt, rows)).scalars().all()
+            await db.execute(
+                record_messages(
+                    (
+                        row["user_id"],
+                        row["receiver_id"],
+                        message_id,
+                        row["time_of_chat"],
+                        row["delivered"],
+                    )
+                    for row, message_id in zip(rows, ids)
+                )
+            )
+            await db.commit()
+        return ids
+
+    async def write(self, batch: List[Tuple[dict, asyncio.Future]], attempt: int = 0):
+        """Store a batch. If the database rejects its data, retry its rows one
+        by one so only the rows that cannot be stored are reported as failed.
+        If the database cannot be reached, retry the whole batch after a
+        backoff, ``WRITE_RETRIES`` times, then fail it; retrying row by row
+        would only multiply the failing round trips.
+        """
+        rows = [row for row, _ in batch]
+        try:
+            ids = await self.store(rows)
+        except (IntegrityError, DataError) as e:
+            if len(batch) > 1:
+                logger.warning(
+                    "Could not store %s chat messages, retrying one by one: %s",
+                    len(batch),
+                    e,
+                )
+                for item in batch:
+                    await self.write([item])
+                return
+            logger.error("Could not store chat message: %s", e)
+            fail(batch, e)
+            return
+        except (OperationalError, InterfaceError) as e:
+            if attempt < WRITE_RETRIES:
+                logger.warning(
+                    "Could not store %s chat messages, retrying the batch: %s",
+                    len(batch),
+                    e,
+                )
+                await asyncio.sleep(WRITE_BACKOFF * 2**attempt)
+                await self.write(batch, attempt + 1)
+                return
+            logger.error("Could not store %s chat messages: %s", len(batch), e)
+            fail(batch, e)
+            return
+        for (_, saved), message_id in zip(batch, ids):
+            if not saved.done():
+                saved.set_result(message_id)
+        scopes = {
+            f"conversations:{row[side]}"
+            for row in rows
+            for side in ("user_id", "receiver_id")
+        }
+        try:
+            await invalidate_totals(*scopes)
+        except Exception as e:
+            logger.warning("Could not invalidate inbox totals: %s", e)
+
+    async def close(self, timeout: float = CLOSE_TIMEOUT):
+        """Store everything still queued, waiting at most ``timeout`` seconds,
+        then stop the background task.
+        """
+        if self.task is None:
+            return
+        if not self.task.done():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.error("Stopping before all queued chat messages were saved")
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+        self.task = None
+        left = []
+        while not self.queue.empty():
+            left.append(self.queue.get_nowait())
+            self.queue.task_done()
+        fail(left, RuntimeError("message writer stopped"))
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,90 @@
+from typing import Any, Dict, List, Tuple
+from app.model_sql import Blog, Comment, Share
+from app.database.reactions import REACTION_COUNTERS, reaction_counts
+
+
+BLOG_COLUMNS = [
+    Blog.id,
+    Blog.title,
+    Blog.content,
+    Blog.comments_count,
+    Blog.reacts_count,
+    Blog.share_count,
+    Blog.time_of_post,
+    *(getattr(Blog, column) for column in REACTION_COUNTERS.values()),
+]
+COMMENT_COLUMNS = [
+    Comment.id,
+    Comment.blog_id,
+    Comment.content,
+    Comment.parent_id,
+    Comment.reacts_count,
+    Comment.depth,
+    Comment.replies_count,
+    Comment.path,
+    Comment.time_of_post,
+    *(getattr(Comment, column) for column in REACTION_COUNTERS.values()),
+]
+SHARE_COLUMNS = [
+    Share.id,
+    Share.blog_id,
+    Share.type,
+    Share.content,
+    Share.time_of_share,
+]
+
+
+def compact(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in item.items() if value is not None}
+
+
+def blog_item(row, preview: Tuple[List[dict], str | None] = (None, None)) -> dict:
+    """``Blogger`` as a plain dict, from a ``BLOG_COLUMNS`` row or a ``Blog``.
+
+    Like the routes' ``response_model_exclude_none``, unset fields are left
+    out rather than sent as ``null``.
+    """
+    comments, cursor = preview
+    return compact(
+        {
+            "id": row.id,
+            "title": row.title,
+            "content": row.content,
+            "reaction": reaction_counts(row),
+            "comments_count": row.comments_count,
+            "reacts_count": row.reacts_count,
+            "share_count": row.share_count,
+            "comments_preview": comments,
+            "comments_cursor": cursor,
+            "time_of_post": row.time_of_post,
+        }
+    )
+
+
+def comment_item(row) -> dict:
+    return compact(
+        {
+            "id": row.id,
+            "blog_id": row.blog_id,
+            "parent_id": row.parent_id,
+            "content": row.content,
+            "reacts_count": row.reacts_count,
+            "reactions": reaction_counts(row),
+            "depth": row.depth,
+            "replies_count": row.replies_count,
+            "time_of_post": row.time_of_post,
+        }
+    )
+
+
+def share_item(row, blog: dict | None) -> dict:
+    return compact(
+        {
+            "id": row.id,
+            "blog_id": row.blog_id,
+            "type": row.type.value if row.type else None,
+            "content": row.content,
+            "blog": blog,
+            "time_of_share": row.time_of_share,
+        }
+    )
@@ -0,0 +1,138 @@
+from sqlalchemy import select, delete, or_, and_
+from sqlalchemy.orm import Session, aliased
+from typing import Dict, List, Set, Tuple
+from app.model_sql import Blog, Comment, React, Share
+from app.database.reactions import REACTION_COUNTERS
+from app.database.counters import counter_update, counter_params, new_deltas
+from app.database.threads import descendants
+
+
+PURGE_CHUNK = 500
+PURGE_JOB_TTL = 86400
+REACT_COLUMNS = ["reacts_count", *REACTION_COUNTERS.values()]
+
+
+def purge_job_key(job_id: str) -> str:
+    """Redis key holding the id of the user who queued a purge job."""
+    return f"purge:owner:{job_id}"
+
+
+def blog_cascade(blog_ids: List[int]) -> List[Tuple[str, object]]:
+    """Set-based deletes that remove ``blog_ids`` and everything hanging off
+    them, children first: reactions on the blogs and on their comments, the
+    comments, the shares and finally the blogs.
+    """
+    comment_ids = select(Comment.id).where(Comment.blog_id.in_(blog_ids))
+    return [
+        (
+            "reacts",
+            delete(React).where(
+                or_(React.blog_id.in_(blog_ids), React.comment_id.in_(comment_ids))
+            ),
+        ),
+        ("comments", delete(Comment).where(Comment.blog_id.in_(blog_ids))),
+        ("shares", delete(Share).where(Share.blog_id.in_(blog_ids))),
+        ("blogs", delete(Blog).where(Blog.id.in_(blog_ids))),
+    ]
+
+
+def purge_blogs_chunk(
+    db: Session, user_id: int, chunk: int, progress: Dict, touched: Set[int]
+) -> bool:
+    blog_ids = (
+        db.execute(
+            select(Blog.id)
+            .where(Blog.user_id == user_id)
+            .order_by(Blog.id)
+            .limit(chunk)
+        )
+        .scalars()
+        .all()
+    )
+    if not blog_ids:
+        return False
+    for name, stmt in blog_cascade(blog_ids):
+        progress[name] += db.execute(stmt).rowcount or 0
+    touched.update(blog_ids)
+    return True
+
+
+def purge_activity_chunk(
+    db: Session, user_id: int, chunk: int, progress: Dict, touched: Set[int]
+) -> bool:
+    """Delete one chunk of the user's reactions, comments and shares on other
+    people's content and take them off the affected counters in batched
+    UPDATEs, one executemany per table. Replies under the user's comments go
+    with them. Ids of the blogs whose detail changed are added to ``touched``.
+    """
+    blog_deltas = new_deltas()
+    comment_deltas = new_deltas()
+    removed = 0
+    react_ids = select(React.id).where(React.user_id == user_id).limit(chunk)
+    for blog_id, comment_id, rtype in db.execute(
+        delete(React)
+        .where(React.id.in_(react_ids))
+        .returning(React.blog_id, React.comment_id, React.type)
+    ):
+        target = blog_deltas[blog_id] if blog_id else comment_deltas[comment_id]
+        target["reacts_count"] -= 1
+        target[REACTION_COUNTERS[rtype]] -= 1
+        progress["reacts"] += 1
+        removed += 1
+    comment_ids = (
+        db.execute(select(Comment.id).where(Comment.user_id == user_id).limit(chunk))
+        .scalars()
+        .all()
+    )
+    if comment_ids:
+        root = aliased(Comment)
+        replies = (
+            select(Comment.id)
+            .join(root, and_(root.blog_id == Comment.blog_id, descendants(root.path)))
+            .where(root.id.in_(comment_ids))
+        )
+        thread = set(comment_ids) | set(db.execute(replies).scalars())
+        db.execute(delete(React).where(React.comment_id.in_(thread)))
+        for blog_id, parent_id in db.execute(
+            delete(Comment)
+            .where(Comment.id.in_(thread))
+            .returning(Comment.blog_id, Comment.parent_id)
+        ):
+            blog_deltas[blog_id]["comments_count"] -= 1
+            if parent_id and parent_id not in thread:
+                comment_deltas[parent_id]["replies_count"] -= 1
+            progress["comments"] += 1
+            removed += 1
+        comment_deltas = {
+            comment_id: changes
+            for comment_id, changes in comment_deltas.items()
+            if comment_id not in thread
+        }
+    share_ids = select(Share.id).where(Share.user_id == user_id).limit(chunk)
+    for (blog_id,) in db.execute(
+        delete(Share).where(Share.id.in_(share_ids)).returning(Share.blog_id)
+    ):
+        blog_deltas[blog_id]["share_count"] -= 1
+        progress["shares"] += 1
+        removed += 1
+    blog_deltas.pop(None, None)
+    comment_deltas.pop(None, None)
+    blog_columns = ["comments_count", "share_count", *REACT_COLUMNS]
+    comment_columns = ["replies_count", *REACT_COLUMNS]
+    touched.update(blog_deltas)
+    if blog_deltas:
+        db.execute(
+            counter_update(Blog, blog_columns),
+            counter_params(blog_deltas, blog_columns),
+        )
+    if comment_deltas:
+        touched.update(
+            db.execute(
+                select(Comment.blog_id).where(Comment.id.in_(list(comment_deltas)))
+            ).scalars()
+        )
+        db.execute(
+            counter_update(Comment, comment_columns),
+            counter_params(comment_deltas, comment_columns),
+        )
+    return removed > 0
@@ -0,0 +1,86 @@
+from sqlalchemy import func, extract, update, or_
+from datetime import datetime, timezone
+from typing import List
+from app.model_sql import Blog
+
+
+COMMENT_WEIGHT = 3.0
+SHARE_WEIGHT = 4.0
+REACT_WEIGHT = 1.0
+GRAVITY = 1.8
+MIN_HOT_SCORE = 0.001
+
+
+def hot_score(
+    comments: int,
+    shares: int,
+    reacts: int,
+    time_of_post: datetime | None,
+    now: datetime | None = None,
+) -> float:
+    """Engagement divided by a power of the post's age in hours.
+
+    Fresh posts start at a small positive score so they can surface before
+    anyone interacts with them; every post sinks as it ages.
+    """
+    now = now or datetime.now(timezone.utc)
+    if time_of_post is None:
+        time_of_post = now
+    if time_of_post.tzinfo is None:
+        time_of_post = time_of_post.replace(tzinfo=timezone.utc)
+    age_hours = max((now - time_of_post).total_seconds(), 0) / 3600
+    engagement = (
+        COMMENT_WEIGHT * (comments or 0)
+        + SHARE_WEIGHT * (shares or 0)
+        + REACT_WEIGHT * (reacts or 0)
+        + 1
+    )
+    return engagement / (age_hours + 2) ** GRAVITY
+
+
+def refresh_hot_score(blog: Blog):
+    blog.hot_score = hot_score(
+        blog.comments_count, blog.share_count, blog.reacts_count, blog.time_of_post
+    )
+
+
+def decay_hot_scores():
+    """Set-based recompute of every blog whose score is still worth ranking.
+
+    Posts whose score has decayed below ``MIN_HOT_SCORE`` are left alone, so
+    each run only touches the live part of the table.
+    """
+    return (
+        update(Blog)
+        .where(Blog.hot_score >= MIN_HOT_SCORE)
+        .values(hot_score=hot_score_sql())
+    )
+
+
+def backfill_hot_scores():
+    """Score blogs stored before ``hot_score`` existed, left NULL or at the
+    column's server default of 0; a computed score is always positive. NULL
+    scores would sort first under ``DESC`` in Postgres and both escape
+    ``decay_hot_scores``.
+    """
+    return (
+        update(Blog)
+        .where(or_(Blog.hot_score.is_(None), Blog.hot_score == 0))
+        .values(hot_score=hot_score_sql())
+    )
+
+
+def hot_score_sql():
+    """``hot_score`` computed by the database from the stored counters."""
+    age_hours = extract("epoch", func.now() - Blog.time_of_post) / 3600
+    engagement = (
+        COMMENT_WEIGHT * func.coalesce(Blog.comments_count, 0)
+        + SHARE_WEIGHT * func.coalesce(Blog.share_count, 0)
+        + REACT_WEIGHT * func.coalesce(Blog.reacts_count, 0)
+        + 1
+    )
+    return engagement / func.power(age_hours + 2, GRAVITY)
+
+
+def rescore_blogs(blog_ids: List[int]):
+    return update(Blog).where(Blog.id.in_(blog_ids)).values(hot_score=hot_score_sql())
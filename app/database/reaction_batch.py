@@ -0,0 +1,226 @@
+from sqlalchemy import select, delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Dict, List, Tuple
+from app.model_sql import React, ReactionType, Blog, Comment
+from app.models import ReactionOperation
+from app.database.reactions import reaction_deltas
+from app.database.counters import new_deltas
+
+MAX_REACTION_BATCH = 500
+
+
+def operation_key(operation: ReactionOperation) -> Tuple[str, int]:
+    """``("blogs", id)`` or ``("comments", id)``; raises ``ValueError`` for an
+    operation that does not name exactly one target or a valid type.
+    """
+    if (operation.blog is None) == (operation.comment is None):
+        raise ValueError("must input one reaction")
+    if operation.op != "remove":
+        if operation.type is None:
+            raise ValueError("reaction type required")
+        ReactionType(operation.type)
+    if operation.blog is not None:
+        return Blog.__tablename__, operation.blog
+    return Comment.__tablename__, operation.comment
+
+
+def upsert_reactions(model, rows: List[dict]):
+    fk = React.blog_id if model is Blog else React.comment_id
+    stmt = insert(React).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[React.user_id, fk],
+        set_={
+            "type": stmt.excluded.type,
+            "time_of_reaction": stmt.excluded.time_of_reaction,
+        },
+    )
+
+
+def insert_reactions(model, rows: List[dict]):
+    """Insert the reactions that do not exist yet; returns the target ids of
+    the rows this statement inserted.
+    """
+    fk = React.blog_id if model is Blog else React.comment_id
+    return (
+        insert(React)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[React.user_id, fk])
+        .returning(fk)
+    )
+
+
+async def current_reactions(
+    db: AsyncSession, user_id: int, blog_ids: List[int], comment_ids: List[int]
+) -> Dict[Tuple[str, int], ReactionType]:
+    """The user's reactions on the given targets, locked ``FOR UPDATE`` so
+    they cannot change before the batch commits.
+    """
+    if not blog_ids and not comment_ids:
+        return {}
+    rows = await db.execute(
+        select(React.blog_id, React.comment_id, React.type)
+        .where(
+            React.user_id == user_id,
+            or_(React.blog_id.in_(blog_ids), React.comment_id.in_(comment_ids)),
+        )
+        .with_for_update()
+    )
+    return {
+        ("blogs", blog_id) if blog_id else ("comments", comment_id): rtype
+        for blog_id, comment_id, rtype in rows
+    }
+
+
+def change_status(previous: ReactionType | None, rtype: ReactionType) -> str:
+    if previous is None:
+        return "added"
+    return "unchanged" if previous == rtype else "updated"
+
+
+async def apply_reactions(
+    db: AsyncSession,
+    user_id: int,
+    operations: List[ReactionOperation],
+    now: datetime,
+) -> Tuple[List[dict], Dict[str, Dict[int, Dict[str, int]]], Dict[int, object]]:
+    """Apply a client's queued reaction operations in one transaction.
+
+    Operations are collapsed to the last one per target, so a replayed queue
+    lands on its final state. Targets are read in one query per table and
+    the user's current reactions in one ``FOR UPDATE`` query. Removals go
+    out as one ``DELETE ... RETURNING``, new reactions as one
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` per table and switches
+    as one multi-row upsert per table. Every delta comes from a row the
+    batch deleted, inserted or holds locked, so a concurrent tap on the same
+    target is never counted twice; a new reaction that loses the race to a
+    concurrent insert is re-read under the lock and switched instead.
+
+    Returns a result per operation, the counter deltas per table and target,
+    and the touched comments (``id``, ``blog_id``, ``parent_id``,
+    ``reacts_count``) by id. Deltas are only meant to be applied once the
+    caller has committed.
+    """
+    results = [None] * len(operations)
+    latest = {}
+    for index, operation in enumerate(operations):
+        try:
+            key = operation_key(operation)
+        except ValueError as e:
+            results[index] = {"index": index, "status": "invalid", "errors": str(e)}
+            continue
+        if key in latest:
+            results[latest[key]] = {"index": latest[key], "status": "superseded"}
+        latest[key] = index
+    blog_ids = [target_id for table, target_id in latest if table == "blogs"]
+    comment_ids = [target_id for table, target_id in latest if table == "comments"]
+    existing_blogs = set()
+    if blog_ids:
+        existing_blogs = set(
+            (await db.execute(select(Blog.id).where(Blog.id.in_(blog_ids)))).scalars()
+        )
+    comments = {}
+    if comment_ids:
+        comments = {
+            row.id: row
+            for row in await db.execute(
+                select(
+                    Comment.id, Comment.blog_id, Comment.parent_id, Comment.reacts_count
+                ).where(Comment.id.in_(comment_ids))
+            )
+        }
+    current = await current_reactions(db, user_id, blog_ids, comment_ids)
+    deltas = {"blogs": new_deltas(), "comments": new_deltas()}
+    fresh = {"blogs": [], "comments": []}
+    upserts = {"blogs": [], "comments": []}
+    removals = {"blogs": [], "comments": []}
+
+    def record(table: str, row: dict, previous: ReactionType | None) -> str:
+        """Count one applied reaction and set its operation's result."""
+        target_id = row["blog_id" if table == "blogs" else "comment_id"]
+        status = change_status(previous, row["type"])
+        if status != "unchanged":
+            changes = reaction_deltas(added=row["type"], removed=previous)
+            for column, delta in changes.items():
+                deltas[table][target_id][column] += delta
+        index = latest[(table, target_id)]
+        results[index] = {"index": index, "status": status}
+        return status
+
+    for (table, target_id), index in latest.items():
+        operation = operations[index]
+        exists = target_id in (existing_blogs if table == "blogs" else comments)
+        previous = current.get((table, target_id))
+        if operation.op == "remove":
+            if previous:
+                removals[table].append(target_id)
+            results[index] = {
+                "index": index,
+                "status": "removed" if previous else "absent",
+            }
+        elif not exists:
+            results[index] = {"index": index, "status": "not_found"}
+        else:
+            row = {
+                "user_id": user_id,
+                "blog_id" if table == "blogs" else "comment_id": target_id,
+                "type": ReactionType(operation.type),
+                "time_of_reaction": now,
+            }
+            if previous is None:
+                fresh[table].append(row)
+            elif record(table, row, previous) != "unchanged":
+                upserts[table].append(row)
+    if removals["blogs"] or removals["comments"]:
+        for blog_id, comment_id, rtype in await db.execute(
+            delete(React)
+            .where(
+                React.user_id == user_id,
+                or_(
+                    React.blog_id.in_(removals["blogs"]),
+                    React.comment_id.in_(removals["comments"]),
+                ),
+            )
+            .returning(React.blog_id, React.comment_id, React.type)
+        ):
+            table, target_id = (
+                ("blogs", blog_id) if blog_id else ("comments", comment_id)
+            )
+            for column, delta in reaction_deltas(removed=rtype).items():
+                deltas[table][target_id][column] += delta
+    raced = {"blogs": [], "comments": []}
+    for model in (Blog, Comment):
+        table = model.__tablename__
+        if not fresh[table]:
+            continue
+        fk = "blog_id" if model is Blog else "comment_id"
+        inserted = set(
+            (await db.execute(insert_reactions(model, fresh[table]))).scalars()
+        )
+        for row in fresh[table]:
+            if row[fk] in inserted:
+                record(table, row, None)
+            else:
+                raced[table].append(row)
+    if raced["blogs"] or raced["comments"]:
+        current = await current_reactions(
+            db,
+            user_id,
+            [row["blog_id"] for row in raced["blogs"]],
+            [row["comment_id"] for row in raced["comments"]],
+        )
+        for table, rows in raced.items():
+            fk = "blog_id" if table == "blogs" else "comment_id"
+            for row in rows:
+                if record(table, row, current.get((table, row[fk]))) != "unchanged":
+                    upserts[table].append(row)
+    for model in (Blog, Comment):
+        if upserts[model.__tablename__]:
+            await db.execute(upsert_reactions(model, upserts[model.__tablename__]))
+    touched = {
+        comment_id: comments[comment_id]
+        for comment_id in deltas["comments"]
+        if comment_id in comments
+    }
+    return results, deltas, touched
@@ -0,0 +1,241 @@
+from sqlalchemy import select, delete, insert, tuple_, or_, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, List, Tuple
+from app.core.config import settings
+from app.model_sql import React, ReactionEvent, ReactionType, Blog, Comment
+from app.database.reactions import reaction_deltas
+from app.database.reaction_batch import upsert_reactions
+from app.database.counters import new_deltas, add_deltas, apply_counters
+
+EVENT_INGEST = "events"
+ROLLUP_BATCH = 5000
+ROLLUP_ROUNDS = 10
+
+EventKey = Tuple[str, int, int]
+
+
+def event_ingest() -> bool:
+    return settings.REACTION_INGEST == EVENT_INGEST
+
+
+def append_event(
+    user_id: int,
+    rtype: ReactionType | None,
+    now: datetime,
+    blog_id: int | None = None,
+    comment_id: int | None = None,
+):
+    """Queue a reaction, or its removal when ``rtype`` is ``None``, as a plain
+    append to the unlogged ``reaction_events`` table. Nothing else is read
+    or locked; ``roll_up_events`` folds it in later.
+    """
+    return insert(ReactionEvent).values(
+        user_id=user_id,
+        blog_id=blog_id,
+        comment_id=comment_id,
+        type=rtype,
+        time_of_event=now,
+    )
+
+
+def latest_events(events) -> Dict[EventKey, Tuple[ReactionType | None, datetime]]:
+    """Last ``(type, time)`` per ``(table, target_id, user_id)``, for events
+    in id order.
+    """
+    latest = {}
+    for event in events:
+        table, target_id = (
+            ("blogs", event.blog_id)
+            if event.blog_id
+            else ("comments", event.comment_id)
+        )
+        latest[(table, target_id, event.user_id)] = (event.type, event.time_of_event)
+    return latest
+
+
+def reactions_of(keys: List[EventKey]):
+    """The stored reactions behind ``keys``, matched on the unique pairs."""
+    pairs = {"blogs": [], "comments": []}
+    for table, target_id, user_id in keys:
+        pairs[table].append((user_id, target_id))
+    conditions = [
+        tuple_(React.user_id, fk).in_(pairs[table])
+        for table, fk in (("blogs", React.blog_id), ("comments", React.comment_id))
+        if pairs[table]
+    ]
+    return select(React.user_id, React.blog_id, React.comment_id, React.type).where(
+        or_(*conditions)
+    )
+
+
+def stored_reactions(rows) -> Dict[EventKey, ReactionType]:
+    return {
+        (
+            ("blogs", blog_id, user_id)
+            if blog_id
+            else ("comments", comment_id, user_id)
+        ): rtype
+        for user_id, blog_id, comment_id, rtype in rows
+    }
+
+
+def event_deltas(
+    latest: Dict[EventKey, Tuple[ReactionType | None, datetime]],
+    current: Dict[EventKey, ReactionType],
+) -> Dict[str, Dict[int, Dict[str, int]]]:
+    deltas = {"blogs": new_deltas(), "comments": new_deltas()}
+    for key, (rtype, _) in latest.items():
+        previous = current.get(key)
+        if previous == rtype:
+            continue
+        table, target_id, _ = key
+        for column, delta in reaction_deltas(added=rtype, removed=previous).items():
+            deltas[table][target_id][column] += delta
+    return deltas
+
+
+def roll_up_events(db: Session, batch: int = ROLLUP_BATCH):
+    """Fold the oldest ``batch`` reaction events into ``reacts`` and the
+    counters, in the caller's transaction.
+
+    Events are claimed with ``DELETE ... RETURNING`` (skipping rows another
+    worker holds) and collapse to the last one per user and target, so a
+    hot post costs one counter ``UPDATE`` per batch instead of one per
+    reaction. Events on targets that no longer exist are dropped.
+
+    Returns the number of events claimed, the counter deltas applied per
+    table and the touched comments (``id``, ``blog_id``, ``parent_id``).
+    """
+    claimed = (
+        select(ReactionEvent.id)
+        .order_by(ReactionEvent.id)
+        .limit(batch)
+        .with_for_update(skip_locked=True)
+    )
+    events = db.execute(
+        delete(ReactionEvent)
+        .where(ReactionEvent.id.in_(claimed))
+        .returning(
+            ReactionEvent.id,
+            ReactionEvent.user_id,
+            ReactionEvent.blog_id,
+            ReactionEvent.comment_id,
+            ReactionEvent.type,
+            ReactionEvent.time_of_event,
+        )
+    ).all()
+    if not events:
+        return 0, {}, {}
+    latest = latest_events(sorted(events, key=lambda event: event.id))
+    blog_ids = {target_id for table, target_id, _ in latest if table == "blogs"}
+    comment_ids = {target_id for table, target_id, _ in latest if table == "comments"}
+    existing = {"blogs": set(), "comments": set()}
+    comments = {}
+    if blog_ids:
+        existing["blogs"] = set(
+            db.execute(select(Blog.id).where(Blog.id.in_(blog_ids))).scalars()
+        )
+    if comment_ids:
+        comments = {
+            row.id: row
+            for row in db.execute(
+                select(Comment.id, Comment.blog_id, Comment.parent_id).where(
+                    Comment.id.in_(comment_ids)
+                )
+            )
+        }
+        existing["comments"] = set(comments)
+    latest = {key: value for key, value in latest.items() if key[1] in existing[key[0]]}
+    if not latest:
+        return len(events), {}, {}
+    current = stored_reactions(db.execute(reactions_of(list(latest))))
+    deltas = event_deltas(latest, current)
+    removals = [key for key, (rtype, _) in latest.items() if rtype is None]
+    removals = [key for key in removals if key in current]
+    if removals:
+        db.execute(delete(React).where(reactions_of(removals).whereclause))
+    for model, fk in ((Blog, "blog_id"), (Comment, "comment_id")):
+        rows = [
+            {"user_id": user_id, fk: target_id, "type": rtype, "time_of_reaction": at}
+            for (table, target_id, user_id), (rtype, at) in latest.items()
+            if table == model.__tablename__
+            and rtype is not None
+            and current.get((table, target_id, user_id)) != rtype
+        ]
+        if rows:
+            db.execute(upsert_reactions(model, rows))
+    drained = {
+        table: {target_id: dict(changes) for target_id, changes in targets.items()}
+        for table, targets in deltas.items()
+        if targets
+    }
+    apply_counters(db, drained)
+    touched = {comment_id: comments[comment_id] for comment_id in deltas["comments"]}
+    return len(events), drained, touched
+
+
+def latest_event_ids(fk, target_ids: List[int], user_id: int | None = None):
+    """Id of the last queued event per user and target among ``target_ids``,
+    found on ``ix_reaction_events_blog``/``ix_reaction_events_comment``.
+    """
+    stmt = select(func.max(ReactionEvent.id).label("id")).where(fk.in_(target_ids))
+    if user_id is not None:
+        stmt = stmt.where(ReactionEvent.user_id == user_id)
+    return stmt.group_by(fk, ReactionEvent.user_id).subquery()
+
+
+async def merge_events(db: AsyncSession, model, items: List[dict], reaction_field: str):
+    """Add the reactions still waiting in ``reaction_events`` to ``items``,
+    on top of what ``merge_pending`` added, so reads in event ingest mode see
+    the unmerged tail. A no-op in direct mode.
+
+    The database folds the events: the last event per user and target is
+    compared with the stored reaction and the changes are counted per
+    target and ``(added, removed)`` pair, so a page reads a few rows per
+    item however many events are queued.
+    """
+    if not event_ingest() or not items:
+        return
+    fk = ReactionEvent.blog_id if model is Blog else ReactionEvent.comment_id
+    react_fk = React.blog_id if model is Blog else React.comment_id
+    latest = latest_event_ids(fk, [item["id"] for item in items])
+    stmt = (
+        select(
+            fk.label("target_id"),
+            ReactionEvent.type.label("added"),
+            React.type.label("removed"),
+            func.count().label("changes"),
+        )
+        .join(latest, latest.c.id == ReactionEvent.id)
+        .outerjoin(
+            React,
+            and_(React.user_id == ReactionEvent.user_id, react_fk == fk),
+        )
+        .where(ReactionEvent.type.is_distinct_from(React.type))
+        .group_by(fk, ReactionEvent.type, React.type)
+    )
+    deltas = new_deltas()
+    for target_id, added, removed, changes in await db.execute(stmt):
+        for column, delta in reaction_deltas(added=added, removed=removed).items():
+            deltas[target_id][column] += delta * changes
+    add_deltas(items, deltas, reaction_field)
+
+
+async def viewer_events(
+    db: AsyncSession, user_id: int | None, blog_ids: List[int]
+) -> Dict[int, str | None]:
+    """The viewer's latest queued reaction per blog; ``None`` for a queued
+    removal. One row per blog, picked by the database.
+    """
+    if not event_ingest() or not user_id or not blog_ids:
+        return {}
+    latest = latest_event_ids(ReactionEvent.blog_id, blog_ids, user_id)
+    stmt = select(ReactionEvent.blog_id, ReactionEvent.type).join(
+        latest, latest.c.id == ReactionEvent.id
+    )
+    return {
+        blog_id: rtype.value if rtype else None
+        for blog_id, rtype in await db.execute(stmt)
+    }
@@ -0,0 +1,148 @@
+from sqlalchemy import Row, select, update, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from app.model_sql import React, ReactionType, Blog
+from app.models import ReactionsSummary
+from typing import Dict, List, Tuple
+
+
+REACTION_COUNTERS = {rtype: f"{rtype.value}_count" for rtype in ReactionType}
+
+
+def reaction_counts(target) -> Dict[str, int]:
+    return {
+        rtype.value: getattr(target, column) or 0
+        for rtype, column in REACTION_COUNTERS.items()
+    }
+
+
+def reaction_summary(target) -> ReactionsSummary:
+    return ReactionsSummary(**reaction_counts(target))
+
+
+def reaction_deltas(
+    added: ReactionType | None = None, removed: ReactionType | None = None
+) -> Dict[str, int]:
+    """Counter deltas for adding, removing or switching one reaction."""
+    deltas = {"reacts_count": (added is not None) - (removed is not None)}
+    if removed is not None:
+        deltas[REACTION_COUNTERS[removed]] = -1
+    if added is not None:
+        deltas[REACTION_COUNTERS[added]] = deltas.get(REACTION_COUNTERS[added], 0) + 1
+    return deltas
+
+
+def recount_reactions(model, fk):
+    """Rebuild the reaction counters of ``model`` rows from ``reacts``.
+
+    ``fk`` is the ``React`` column pointing at ``model`` (``React.blog_id``
+    or ``React.comment_id``); narrow the returned UPDATE with ``.where`` to
+    repair a range of ids at a time.
+    """
+    values = {
+        column: select(func.count(React.id))
+        .where(fk == model.id, React.type == rtype)
+        .scalar_subquery()
+        for rtype, column in REACTION_COUNTERS.items()
+    }
+    values["reacts_count"] = (
+        select(func.count(React.id)).where(fk == model.id).scalar_subquery()
+    )
+    return update(model).values(**values)
+
+
+async def viewer_reactions(
+    db: AsyncSession, user_id: int | None, blog_ids: List[int]
+) -> Dict[int, str]:
+    """The viewer's reaction on each of ``blog_ids`` they reacted to, read for
+    a whole page in one lookup on ``unique_blog_react``.
+    """
+    if not user_id or not blog_ids:
+        return {}
+    stmt = select(React.blog_id, React.type).where(
+        React.user_id == user_id, React.blog_id.in_(blog_ids)
+    )
+    return {blog_id: rtype.value for blog_id, rtype in await db.execute(stmt)}
+
+
+def target_columns(model) -> list:
+    """``id``, ``blog_id``, ``parent_id`` and the stored reaction counters of
+    a blog or comment, as the reaction routes report them.
+    """
+    blog_id = model.id if model is Blog else model.blog_id
+    parent_id = literal(None) if model is Blog else model.parent_id
+    return [
+        model.id,
+        blog_id.label("blog_id"),
+        parent_id.label("parent_id"),
+        model.reacts_count,
+        *(getattr(model, column) for column in REACTION_COUNTERS.values()),
+    ]
+
+
+async def upsert_reaction(
+    db: AsyncSession,
+    model,
+    target_id: int,
+    user_id: int,
+    rtype: ReactionType,
+    now: datetime,
+) -> Tuple[Row, ReactionType | None] | None:
+    """Add or switch a user's reaction on a blog or comment.
+
+    A new reaction is one ``INSERT ... SELECT`` from the target row with
+    ``ON CONFLICT DO NOTHING`` on ``unique_blog_react``/``unique_comment_react``,
+    so a missing target inserts nothing. Only when the reaction already
+    exists is it read back with ``FOR UPDATE``, which waits for a concurrent
+    tap to commit, and switched with an ``UPDATE`` if its type differs. The
+    previous type therefore always comes from the row the write replaced,
+    never from a snapshot older than a concurrent tap.
+
+    Returns ``None`` for a missing target, else a row carrying
+    ``reaction_id`` and the target's ``id``, ``blog_id``, ``parent_id`` and
+    stored counters as read before the write, with the previous type
+    (``None`` when the reaction is new, ``rtype`` when nothing changed).
+    """
+    fk = React.blog_id if model is Blog else React.comment_id
+    target = select(*target_columns(model)).where(model.id == target_id).cte("target")
+    stmt = (
+        insert(React)
+        .from_select(
+            ["user_id", fk.key, "type", "time_of_reaction"],
+            select(
+                literal(user_id),
+                target.c.id,
+                literal(rtype, React.type.type),
+                literal(now, React.time_of_reaction.type),
+            ).where(target.c.id == target_id),
+        )
+        .on_conflict_do_nothing(index_elements=[React.user_id, fk])
+        .returning(
+            React.id.label("reaction_id"),
+            *(
+                select(column).scalar_subquery().label(column.key)
+                for column in target.c
+            ),
+        )
+    )
+    added = (await db.execute(stmt)).one_or_none()
+    if added is not None:
+        return added, None
+    existing = (
+        await db.execute(
+            select(React.id.label("reaction_id"), React.type, *target_columns(model))
+            .join(model, fk == model.id)
+            .where(React.user_id == user_id, fk == target_id)
+            .with_for_update(of=React)
+        )
+    ).one_or_none()
+    if existing is None:
+        return None
+    if existing.type != rtype:
+        await db.execute(
+            update(React)
+            .where(React.id == existing.reaction_id)
+            .values(type=rtype, time_of_reaction=now)
+        )
+    return existing, existing.type
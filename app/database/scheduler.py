@@ -1,5 +1,47 @@
 from app.core.celery_config import celery_app
 from app.core.async_config import AsyncSessionLocal
+from app.core.sync_config import SessionLocal
+from app.core.redis_config import sync_redis
+from app.model_sql import Blog, Comment, React, Follow, User
+from app.database.reactions import recount_reactions
+from app.database.ranking import decay_hot_scores, backfill_hot_scores, hot_score_sql
+from app.database.purge import purge_blogs_chunk, purge_activity_chunk, PURGE_CHUNK
+from app.core.pagination import generation_key
+from app.core.blog_cache import invalidate_blogs_sync
+from app.database.reaction_log import (
+    roll_up_events,
+    event_ingest,
+    ROLLUP_BATCH,
+    ROLLUP_ROUNDS,
+)
+from app.database.top_comments import rank_comments_sync
+from app.database.conversations import (
+    backfill_receivers,
+    backfill_conversations,
+    unresolved_receivers,
+)
+from app.database.counters import (
+    drain_counters,
+    drain_rows,
+    restore_counters,
+    apply_counters,
+    engagement_counts,
+    COUNTER_DIRTY,
+    COUNTER_LOCK,
+)
+from app.database.timeline import (
+    push_timelines,
+    post_score,
+    timeline_key,
+    CELEBRITY_FOLLOWERS,
+    FAN_OUT_CHUNK,
+    TIMELINE_BACKFILL,
+    TIMELINE_SIZE,
+)
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from redis.exceptions import RedisError
+from typing import Dict, List, Tuple
 import os
 from dotenv import load_dotenv
 import requests
@@ -11,6 +53,11 @@ SENDER = os.getenv("SENDGRID_SENDER")
 
 logger = get_loggers("celery")
 
+FLUSH_BATCH = 500
+FLUSH_ROUNDS = 20
+COUNTER_LOCK_TIMEOUT = 300
+ROLLUP_LOCK = "locks:reaction_rollup"
+
 
 @celery_app.task(name="app.task.send_email", queue="email")
 def send_email(subject: str, body: str, to_email: str):
@@ -26,3 +73,282 @@ def send_email(subject: str, body: str, to_email: str):
         print(f"respomse: {response.status_code},  body: {response.text}")
     except Exception as e:
         print(f"failure: {e}")
+
+
+@celery_app.task(name="app.task.reconcile_reactions")
+def reconcile_reactions(chunk: int = 1000):
+    """Recount every counter of blogs and comments from the source rows, so
+    deltas lost between a commit and its ``bump`` do not stay wrong, then
+    rescore the blogs.
+
+    The recount already includes every committed write, so each chunk drains
+    the buffered deltas of its ids right before its single recount
+    ``UPDATE`` and drops them instead of applying them; they are only put
+    back if the recount fails. ``flush_counters`` is held off with
+    ``COUNTER_LOCK`` meanwhile, so no drained batch is applied on top of a
+    recount. A ``bump`` landing between a chunk's drain and its recount is
+    counted twice until the next run.
+    """
+    roll_up_reactions(drain=True)
+    lock = sync_redis.lock(COUNTER_LOCK, timeout=COUNTER_LOCK_TIMEOUT)
+    with lock, SessionLocal() as db:
+        for model, fk in ((Blog, React.blog_id), (Comment, React.comment_id)):
+            table = model.__tablename__
+            last = db.execute(select(func.max(model.id))).scalar() or 0
+            for start in range(0, last, chunk):
+                in_range = (model.id > start, model.id <= start + chunk)
+                lock.reacquire()
+                drained = drain_rows(
+                    sync_redis, table, range(start + 1, start + chunk + 1)
+                )
+                try:
+                    db.execute(
+                        recount_reactions(model, fk)
+                        .values(**engagement_counts(model))
+                        .where(*in_range)
+                    )
+                    if model is Blog:
+                        db.execute(
+                            update(Blog)
+                            .where(*in_range)
+                            .values(hot_score=hot_score_sql())
+                        )
+                    db.commit()
+                except SQLAlchemyError:
+                    restore_counters(sync_redis, drained)
+                    raise
+                invalidate_blogs_sync(sync_redis, drained.get("blogs", {}))
+            logger.info("Reconciled counters of %s", table)
+
+
+@celery_app.task(name="app.task.refresh_hot_scores")
+def refresh_hot_scores():
+    with SessionLocal() as db:
+        backfilled = db.execute(backfill_hot_scores()).rowcount
+        updated = db.execute(decay_hot_scores()).rowcount
+        db.commit()
+    if backfilled:
+        logger.info("Backfilled hot_score of %s blogs", backfilled)
+    logger.info("Refreshed hot_score of %s blogs", updated)
+
+
+@celery_app.task(name="app.task.flush_counters")
+def flush_counters(batch: int = FLUSH_BATCH, rounds: int = FLUSH_ROUNDS):
+    """Apply the engagement deltas buffered in Redis by ``bump``, ``batch``
+    dirty rows per transaction. Deltas of a failed batch are put back. Skips
+    the run while ``reconcile_reactions`` holds ``COUNTER_LOCK``.
+    """
+    lock = sync_redis.lock(COUNTER_LOCK, timeout=COUNTER_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        logger.info("Counters are being reconciled, skipping this flush")
+        return
+    flushed = 0
+    try:
+        for _ in range(rounds):
+            members = sync_redis.spop(COUNTER_DIRTY, batch)
+            if not members:
+                break
+            drained = drain_counters(sync_redis, members)
+            try:
+                with SessionLocal() as db:
+                    apply_counters(db, drained)
+                    db.commit()
+            except SQLAlchemyError:
+                restore_counters(sync_redis, drained)
+                raise
+            invalidate_blogs_sync(sync_redis, drained.get("blogs", {}))
+            flushed += len(members)
+    finally:
+        lock.release()
+    if flushed:
+        logger.info("Flushed buffered counters of %s rows", flushed)
+
+
+@celery_app.task(name="app.task.backfill_inbox")
+def backfill_inbox():
+    """One-off: build the inbox rows of messages sent before conversations
+    were tracked.
+    """
+    with SessionLocal() as db:
+        resolved = db.execute(backfill_receivers()).rowcount
+        unresolved = db.execute(unresolved_receivers()).all()
+        db.execute(backfill_conversations("sender"))
+        db.execute(backfill_conversations("receiver"))
+        db.commit()
+    logger.info("Backfilled conversations, resolved %s message receivers", resolved)
+    if unresolved:
+        logger.warning(
+            "Left messages to ambiguous or unknown receivers unresolved: %s",
+            ", ".join(f"{name!r} ({count})" for name, count in unresolved),
+        )
+
+
+@celery_app.task(name="app.task.roll_up_reactions")
+def roll_up_reactions(
+    batch: int = ROLLUP_BATCH, rounds: int = ROLLUP_ROUNDS, drain: bool = False
+):
+    """Fold queued reaction events into ``reacts`` and the counters, ``batch``
+    events per transaction. Runs are serialized with a Redis lock so events
+    of one user and target are always applied in order.
+
+    Does nothing in direct ingest mode unless ``drain`` is set, which folds
+    in events left over from before a switch back to direct.
+    """
+    if not (drain or event_ingest()):
+        return
+    lock = sync_redis.lock(ROLLUP_LOCK, timeout=60, blocking=False)
+    if not lock.acquire():
+        return
+    rolled = 0
+    try:
+        for _ in range(rounds):
+            with SessionLocal() as db:
+                claimed, drained, comments = roll_up_events(db, batch)
+                db.commit()
+            if not claimed:
+                break
+            rolled += claimed
+            blog_ids = set(drained.get("blogs", {}))
+            blog_ids.update(comment.blog_id for comment in comments.values())
+            try:
+                invalidate_blogs_sync(sync_redis, blog_ids)
+                rank_comments_sync(sync_redis, comments, drained.get("comments", {}))
+            except RedisError as e:
+                logger.warning("Could not refresh caches after rollup: %s", e)
+    finally:
+        lock.release()
+    if rolled:
+        logger.info("Rolled up %s reaction events", rolled)
+
+
+def fan_out(author_id: int, entries: Dict[int, float]):
+    push_timelines(sync_redis, [author_id], entries)
+    with SessionLocal() as db:
+        followers = (
+            db.execute(
+                select(User.followers_count).where(User.id == author_id)
+            ).scalar()
+            or 0
+        )
+        if followers >= CELEBRITY_FOLLOWERS:
+            logger.info(
+                "Skipping fan-out of blogs %s: author has %s followers",
+                list(entries),
+                followers,
+            )
+            return
+        last = 0
+        while True:
+            follower_ids = (
+                db.execute(
+                    select(Follow.follower_id)
+                    .where(Follow.followee_id == author_id, Follow.follower_id > last)
+                    .order_by(Follow.follower_id)
+                    .limit(FAN_OUT_CHUNK)
+                )
+                .scalars()
+                .all()
+            )
+            if not follower_ids:
+                break
+            push_timelines(sync_redis, follower_ids, entries)
+            last = follower_ids[-1]
+    logger.info("Fanned out blogs %s of author %s", list(entries), author_id)
+
+
+@celery_app.task(name="app.task.fan_out_blog")
+def fan_out_blog(blog_id: int, author_id: int, score: float):
+    fan_out(author_id, {blog_id: score})
+
+
+@celery_app.task(name="app.task.fan_out_blogs")
+def fan_out_blogs(author_id: int, entries: List[Tuple[int, float]]):
+    """``fan_out_blog`` for a batch of one author's posts, e.g. a bulk import."""
+    fan_out(author_id, dict(entries))
+
+
+@celery_app.task(name="app.task.backfill_timeline")
+def backfill_timeline(follower_id: int, followee_id: int):
+    with SessionLocal() as db:
+        followers = (
+            db.execute(
+                select(User.followers_count).where(User.id == followee_id)
+            ).scalar()
+            or 0
+        )
+        if followers >= CELEBRITY_FOLLOWERS:
+            return
+        recent = db.execute(
+            select(Blog.id, Blog.time_of_post)
+            .where(Blog.user_id == followee_id)
+            .order_by(Blog.time_of_post.desc())
+            .limit(TIMELINE_BACKFILL)
+        ).all()
+    if recent:
+        push_timelines(
+            sync_redis,
+            [follower_id],
+            {blog_id: post_score(time_of_post) for blog_id, time_of_post in recent},
+        )
+
+
+@celery_app.task(name="app.task.prune_timeline")
+def prune_timeline(follower_id: int, followee_id: int):
+    with SessionLocal() as db:
+        blog_ids = (
+            db.execute(
+                select(Blog.id)
+                .where(Blog.user_id == followee_id)
+                .order_by(Blog.time_of_post.desc())
+                .limit(TIMELINE_SIZE)
+            )
+            .scalars()
+            .all()
+        )
+    if blog_ids:
+        sync_redis.zrem(timeline_key(follower_id), *blog_ids)
+
+
+@celery_app.task(
+    name="app.task.purge_user_content",
+    bind=True,
+    acks_late=True,
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def purge_user_content(
+    self, user_id: int, include_activity: bool = False, chunk: int = PURGE_CHUNK
+):
+    """Delete every blog of ``user_id`` with everything attached to it, and
+    with ``include_activity`` the user's reactions, comments and shares on
+    other people's posts, in chunks of ``chunk`` rows committed one at a time.
+
+    Each chunk selects what is left, so a retried or re-queued job simply
+    carries on where the previous run stopped.
+    """
+    progress = {
+        "user_id": user_id,
+        "blogs": 0,
+        "comments": 0,
+        "reacts": 0,
+        "shares": 0,
+    }
+    touched = set()
+    with SessionLocal() as db:
+        while purge_blogs_chunk(db, user_id, chunk, progress, touched):
+            db.commit()
+            self.update_state(state="PROGRESS", meta=progress)
+        while include_activity and purge_activity_chunk(
+            db, user_id, chunk, progress, touched
+        ):
+            db.commit()
+            self.update_state(state="PROGRESS", meta=progress)
+    try:
+        for scope in ("blogs", "comments", "shares"):
+            sync_redis.incr(generation_key(scope))
+        invalidate_blogs_sync(sync_redis, touched)
+    except RedisError as e:
+        logger.warning("Could not invalidate caches after purge: %s", e)
+    logger.info("Purged content of user %s: %s", user_id, progress)
+    return progress
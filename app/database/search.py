@@ -0,0 +1,154 @@
+from sqlalchemy import select, func, literal, literal_column, table, column, text
+from sqlalchemy import DDL, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.declarative import Base
+from app.model_sql import Blog, User, blog_document
+from app.database.projections import BLOG_COLUMNS
+
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blogs_fts USING fts5("
+    "title, content, content='blogs', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS blogs_fts_ai AFTER INSERT ON blogs BEGIN "
+    "INSERT INTO blogs_fts(rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blogs_fts_ad AFTER DELETE ON blogs BEGIN "
+    "INSERT INTO blogs_fts(blogs_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blogs_fts_au AFTER UPDATE OF title, content "
+    "ON blogs BEGIN "
+    "INSERT INTO blogs_fts(blogs_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO blogs_fts(rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "name, username, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, name, username) "
+    "VALUES (new.id, new.name, new.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, username) "
+    "VALUES ('delete', old.id, old.name, old.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, username "
+    "ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, username) "
+    "VALUES ('delete', old.id, old.name, old.username); "
+    "INSERT INTO users_fts(rowid, name, username) "
+    "VALUES (new.id, new.name, new.username); END",
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+
+blogs_fts = table("blogs_fts", column("rowid"), column("rank"))
+users_fts = table("users_fts", column("rowid"), column("rank"))
+
+
+def substring(column, value: str):
+    escaped = value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return column.ilike(f"%{escaped}%", escape="/")
+
+
+def fts_phrase(value: str, field: str | None = None) -> str:
+    phrase = '"' + value.replace('"', '""') + '"'
+    return f"{field} : {phrase}" if field else phrase
+
+
+class PostgresSearch:
+    """GIN-backed search: a tsvector over blog title and content, plus
+    pg_trgm indexes that serve the substring matches on titles and names.
+    Blog searches select ``BLOG_COLUMNS``, user searches whole ``User`` rows.
+    """
+
+    def blogs(self, q=None, title=None, author=None):
+        stmt = select(*BLOG_COLUMNS)
+        rank = literal(0.0)
+        if q:
+            query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), q)
+            stmt = stmt.where(blog_document.op("@@")(query))
+            rank = rank + func.ts_rank_cd(blog_document, query)
+        if title:
+            stmt = stmt.where(substring(Blog.title, title))
+            rank = rank + func.similarity(Blog.title, title)
+        if author:
+            stmt = stmt.join(User, User.id == Blog.user_id).where(
+                substring(User.name, author)
+            )
+            rank = rank + func.similarity(User.name, author)
+        return stmt.order_by(rank.desc(), Blog.id.desc())
+
+    def users(self, name):
+        rank = func.greatest(
+            func.similarity(User.name, name), func.similarity(User.username, name)
+        )
+        return (
+            select(User)
+            .where(substring(User.name, name) | substring(User.username, name))
+            .order_by(rank.desc(), User.id)
+        )
+
+
+class SQLiteSearch:
+    """FTS5 tables with the trigram tokenizer, kept in sync by triggers, so
+    the same substring semantics can be exercised against a local SQLite file.
+    Terms shorter than three characters cannot use the trigram index and fall
+    back to a plain scan.
+    """
+
+    def blogs(self, q=None, title=None, author=None):
+        stmt = select(*BLOG_COLUMNS)
+        terms = []
+        if q and len(q) >= 3:
+            terms.append(fts_phrase(q))
+        elif q:
+            stmt = stmt.where(substring(Blog.title, q) | substring(Blog.content, q))
+        if title and len(title) >= 3:
+            terms.append(fts_phrase(title, "title"))
+        elif title:
+            stmt = stmt.where(substring(Blog.title, title))
+        rank = literal(0.0)
+        if terms:
+            stmt = stmt.join(blogs_fts, blogs_fts.c.rowid == Blog.id).where(
+                text("blogs_fts MATCH :blog_terms").bindparams(
+                    blog_terms=" AND ".join(terms)
+                )
+            )
+            rank = rank + blogs_fts.c.rank
+        if author and len(author) >= 3:
+            stmt = stmt.join(users_fts, users_fts.c.rowid == Blog.user_id).where(
+                text("users_fts MATCH :author_terms").bindparams(
+                    author_terms=fts_phrase(author, "name")
+                )
+            )
+            rank = rank + users_fts.c.rank
+        elif author:
+            stmt = stmt.join(User, User.id == Blog.user_id).where(
+                substring(User.name, author)
+            )
+        return stmt.order_by(rank.asc(), Blog.id.desc())
+
+    def users(self, name):
+        if len(name) < 3:
+            return (
+                select(User)
+                .where(substring(User.name, name) | substring(User.username, name))
+                .order_by(User.id)
+            )
+        return (
+            select(User)
+            .join(users_fts, users_fts.c.rowid == User.id)
+            .where(
+                text("users_fts MATCH :user_terms").bindparams(
+                    user_terms=fts_phrase(name)
+                )
+            )
+            .order_by(users_fts.c.rank, User.id)
+        )
+
+
+def search_backend(db: AsyncSession):
+    if db.get_bind().dialect.name == "sqlite":
+        return SQLiteSearch()
+    return PostgresSearch()
@@ -0,0 +1,28 @@
+from sqlalchemy import and_
+from app.model_sql import Comment
+
+PATH_WIDTH = 10
+MAX_THREAD_DEPTH = 32
+
+
+def path_segment(comment_id: int) -> str:
+    return f"{comment_id:0{PATH_WIDTH}d}"
+
+
+def thread_path(comment) -> str:
+    """Materialized path of ``comment``: the zero-padded ids of its ancestors
+    and itself, concatenated. Sorting a thread by path gives it in reading
+    order. Comments written before threading have no stored path and are
+    treated as top-level.
+    """
+    return comment.path or path_segment(comment.id)
+
+
+def descendants(path, model=Comment):
+    """Criteria matching every comment below ``path``.
+
+    Paths only hold digits, so all descendants sort between the path itself
+    and the path followed by a letter. This is a range scan on
+    ``ix_comments_thread`` once the blog id is fixed too.
+    """
+    return and_(model.path > path, model.path < path + "z")
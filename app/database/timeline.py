@@ -0,0 +1,119 @@
+from sqlalchemy import select, column, tuple_, Float, Integer
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+from app.model_sql import Blog, Follow, User
+from app.core.redis_config import redis_client
+from app.core.pagination import encode_cursor, decode_cursor
+from app.database.projections import BLOG_COLUMNS
+
+
+TIMELINE_SIZE = 800
+TIMELINE_BACKFILL = 50
+CELEBRITY_FOLLOWERS = 10000
+FAN_OUT_CHUNK = 1000
+TIMELINE_KEYS = [column("score", Float), column("id", Integer)]
+
+
+def timeline_key(user_id: int) -> str:
+    return f"timeline:{user_id}"
+
+
+def post_score(time_of_post: datetime) -> float:
+    if time_of_post.tzinfo is None:
+        time_of_post = time_of_post.replace(tzinfo=timezone.utc)
+    return time_of_post.timestamp()
+
+
+def push_timelines(client, user_ids: List[int], entries: Dict[int, float]):
+    """Add blog ids to the home timeline of every user in ``user_ids``.
+
+    ``client`` is a synchronous Redis client; timelines are trimmed to the
+    newest ``TIMELINE_SIZE`` entries in the same pipeline.
+    """
+    pipe = client.pipeline(transaction=False)
+    for user_id in user_ids:
+        pipe.zadd(timeline_key(user_id), entries)
+        pipe.zremrangebyrank(timeline_key(user_id), 0, -TIMELINE_SIZE - 1)
+    pipe.execute()
+
+
+async def read_timeline(
+    db: AsyncSession, user_id: int, cursor: str | None, limit: int
+) -> Tuple[list, str | None]:
+    """One page of a user's home timeline, newest first.
+
+    Ids pushed on write come from the user's Redis sorted set. Posts of
+    followed accounts with ``CELEBRITY_FOLLOWERS`` or more followers are never
+    fanned out and are pulled from ``blogs`` at read time instead, then the two
+    are merged and hydrated with one batched query into ``BLOG_COLUMNS`` rows.
+
+    Entries are ordered by ``(score, id)`` and the cursor holds both, so posts
+    sharing a timestamp across a page boundary are neither skipped nor
+    repeated.
+    """
+    max_score = "+inf"
+    before = None
+    ties = 0
+    if cursor:
+        before, before_id = decode_cursor("timeline", cursor, TIMELINE_KEYS)
+        max_score = before
+        ties = await redis_client.zcount(timeline_key(user_id), before, before)
+    entries = await redis_client.zrevrangebyscore(
+        timeline_key(user_id),
+        max_score,
+        "-inf",
+        start=0,
+        num=limit + 1 + ties,
+        withscores=True,
+    )
+    if entries:
+        # Redis orders equal scores by member as a string, so the page may
+        # end inside a tie; take the whole tie at the lowest score.
+        lowest = entries[-1][1]
+        entries += await redis_client.zrangebyscore(
+            timeline_key(user_id), lowest, lowest, withscores=True
+        )
+    candidates = {
+        int(member): score
+        for member, score in entries
+        if before is None or (score, int(member)) < (before, before_id)
+    }
+    celebrities = (
+        select(Follow.followee_id)
+        .join(User, User.id == Follow.followee_id)
+        .where(
+            Follow.follower_id == user_id,
+            User.followers_count >= CELEBRITY_FOLLOWERS,
+        )
+    )
+    stmt = (
+        select(*BLOG_COLUMNS)
+        .where(Blog.user_id.in_(celebrities))
+        .order_by(Blog.time_of_post.desc(), Blog.id.desc())
+        .limit(limit + 1)
+    )
+    if before is not None:
+        stmt = stmt.where(
+            tuple_(Blog.time_of_post, Blog.id)
+            < tuple_(datetime.fromtimestamp(before, tz=timezone.utc), before_id)
+        )
+    blogs = {blog.id: blog for blog in (await db.execute(stmt)).all()}
+    for blog in blogs.values():
+        candidates.setdefault(blog.id, post_score(blog.time_of_post))
+    ranked = sorted(
+        candidates.items(), key=lambda item: (item[1], item[0]), reverse=True
+    )
+    page = ranked[:limit]
+    missing = [blog_id for blog_id, _ in page if blog_id not in blogs]
+    if missing:
+        hydrated = await db.execute(select(*BLOG_COLUMNS).where(Blog.id.in_(missing)))
+        blogs.update({blog.id: blog for blog in hydrated})
+    stale = [blog_id for blog_id in missing if blog_id not in blogs]
+    if stale:
+        await redis_client.zrem(timeline_key(user_id), *stale)
+    next_cursor = None
+    if len(ranked) > limit:
+        blog_id, score = page[-1]
+        next_cursor = encode_cursor("timeline", [score, blog_id])
+    return [blogs[blog_id] for blog_id, _ in page if blog_id in blogs], next_cursor
@@ -0,0 +1,145 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+from redis.exceptions import RedisError
+from app.core.redis_config import redis_client
+from app.model_sql import Comment
+from app.database.counters import merge_pending, pending_counters
+from app.database.projections import COMMENT_COLUMNS, comment_item
+from app.log.logger import get_loggers
+
+TOP_K = 50
+TOP_CAPACITY = 2 * TOP_K
+TOP_TTL = 3600
+
+logger = get_loggers("top_comments")
+
+
+def top_key(blog_id: int) -> str:
+    return f"top_comments:{blog_id}"
+
+
+async def track_comment(comment: Comment, delta: int):
+    """Move a top-level comment in its blog's ranking after a reaction.
+
+    Ranked comments are shifted by ``delta``. Others come in with their full
+    count, stored plus still buffered, and the set is trimmed back to
+    ``TOP_CAPACITY``. Blogs without a ranking are left for the next read to
+    rebuild.
+    """
+    if comment.parent_id is not None or not delta:
+        return
+    key = top_key(comment.blog_id)
+    try:
+        if await redis_client.zscore(key, comment.id) is not None:
+            await redis_client.zincrby(key, delta, comment.id)
+            return
+        if not await redis_client.exists(key):
+            return
+        pending = await pending_counters(Comment, [comment.id])
+        count = (comment.reacts_count or 0) + pending.get(comment.id, {}).get(
+            "reacts_count", 0
+        )
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.zadd(key, {comment.id: max(count, 0)})
+        pipe.zremrangebyrank(key, 0, -TOP_CAPACITY - 1)
+        await pipe.execute()
+    except RedisError as e:
+        logger.warning("Could not rank comment %s: %s", comment.id, e)
+
+
+def rank_comments_sync(client, comments: dict, deltas: Dict[int, Dict[str, int]]):
+    """``track_comment`` for Celery workers: shifts the top-level comments
+    already ranked and leaves the rest to the next rebuild.
+    """
+    pipe = client.pipeline(transaction=False)
+    for comment_id, comment in comments.items():
+        delta = deltas.get(comment_id, {}).get("reacts_count", 0)
+        if comment.parent_id is None and delta:
+            pipe.zadd(top_key(comment.blog_id), {comment_id: delta}, xx=True, incr=True)
+    pipe.execute()
+
+
+async def add_comment(blog_id: int, comment_id: int):
+    """Let a new comment into a ranking that still has room for it."""
+    key = top_key(blog_id)
+    try:
+        if await redis_client.exists(key) and (
+            await redis_client.zcard(key) < TOP_CAPACITY
+        ):
+            await redis_client.zadd(key, {comment_id: 0}, nx=True)
+    except RedisError as e:
+        logger.warning("Could not rank comment %s: %s", comment_id, e)
+
+
+async def drop_comments(blog_id: int, comment_ids: List[int]):
+    try:
+        await redis_client.zrem(top_key(blog_id), *comment_ids)
+    except RedisError as e:
+        logger.warning("Could not unrank comments %s: %s", comment_ids, e)
+
+
+async def rebuild_ranking(db: AsyncSession, blog_id: int) -> List[int]:
+    """Reload a blog's ranking from ``ix_comments_top_popular``.
+
+    Returns the ranked ids even when Redis is unavailable, so callers can
+    serve straight from the database.
+    """
+    rows = (
+        await db.execute(
+            select(Comment.id, Comment.reacts_count)
+            .where(Comment.blog_id == blog_id, Comment.parent_id.is_(None))
+            .order_by(Comment.reacts_count.desc(), Comment.id.desc())
+            .limit(TOP_CAPACITY)
+        )
+    ).all()
+    pending = await pending_counters(Comment, [row.id for row in rows])
+    items = [
+        {
+            "id": row.id,
+            "reacts_count": (row.reacts_count or 0)
+            + pending.get(row.id, {}).get("reacts_count", 0),
+        }
+        for row in rows
+    ]
+    if items:
+        try:
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.delete(top_key(blog_id))
+            pipe.zadd(top_key(blog_id), {i["id"]: i["reacts_count"] for i in items})
+            pipe.expire(top_key(blog_id), TOP_TTL)
+            await pipe.execute()
+        except RedisError as e:
+            logger.warning("Could not store ranking of blog %s: %s", blog_id, e)
+    items.sort(key=lambda item: (item["reacts_count"], item["id"]), reverse=True)
+    return [item["id"] for item in items]
+
+
+async def popular_comments(db: AsyncSession, blog_id: int, limit: int) -> List[dict]:
+    """The ``limit`` most reacted top-level comments of a blog.
+
+    Ids come from the blog's Redis ranking in O(K), rebuilt from the
+    database when it is missing, and are hydrated in one query.
+    """
+    ranked = None
+    try:
+        members = await redis_client.zrevrange(top_key(blog_id), 0, limit - 1)
+        if members:
+            ranked = [int(member) for member in members]
+    except RedisError as e:
+        logger.warning("Comment ranking unavailable for blog %s: %s", blog_id, e)
+    if ranked is None:
+        ranked = (await rebuild_ranking(db, blog_id))[:limit]
+    if not ranked:
+        return []
+    rows = (
+        await db.execute(select(*COMMENT_COLUMNS).where(Comment.id.in_(ranked)))
+    ).all()
+    found = {row.id: comment_item(row) for row in rows}
+    stale = [comment_id for comment_id in ranked if comment_id not in found]
+    if stale:
+        await drop_comments(blog_id, stale)
+    items = [found[comment_id] for comment_id in ranked if comment_id in found]
+    await merge_pending(Comment, items, "reactions")
+    items.sort(key=lambda item: (item.get("reacts_count", 0), item["id"]), reverse=True)
+    return items
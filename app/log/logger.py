@@ -10,7 +10,7 @@ def get_loggers(name: str):
     if not logger.handlers:
         fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
         fh = RotatingFileHandler(
-            f"logs{name}.log", maxBytes=5 * 1024 * 1024, backupCount=3
+            os.path.join("logs", f"{name}.log"), maxBytes=5 * 1024 * 1024, backupCount=3
         )
         fh.setFormatter(fmt)
         logger.addHandler(fh)
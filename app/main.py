@@ -20,6 +20,7 @@ from app.exceptions import (
     make_validation_exception_handler,
 )
 from fastapi.staticfiles import StaticFiles
+from app.database.message_writer import message_writer
 
 app = FastAPI(title="Three Dimensions", version="1.0")
 
@@ -67,6 +68,11 @@ app.add_exception_handler(Exception, make_global_exception_handler())
 app.add_exception_handler(ValidationError, make_validation_exception_handler())
 
 
+@app.on_event("shutdown")
+async def flush_messages():
+    await message_writer.close()
+
+
 @app.get("/", include_in_schema=False)
 def home_page():
     return {
@@ -1,6 +1,7 @@
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     Boolean,
     DateTime,
     String,
@@ -10,10 +11,16 @@ from sqlalchemy import (
     Enum as SQLEnum,
     Date,
     Table,
+    Index,
+    DDL,
+    event,
+    func,
+    literal_column,
 )
 from enum import Enum
 from app.core.declarative import Base
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import postgresql
 from datetime import datetime, timezone, timedelta
 
 
@@ -21,6 +28,22 @@ def current_utc_time():
     return datetime.now(timezone.utc)
 
 
+def search_document(*columns):
+    text = func.coalesce(columns[0], literal_column("''"))
+    for column in columns[1:]:
+        text = (
+            text + literal_column("' '") + func.coalesce(column, literal_column("''"))
+        )
+    return func.to_tsvector(literal_column("'simple'::regconfig"), text)
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -34,27 +57,84 @@ class User(Base):
     phone_number = Column(String)
     address = Column(String)
     profile_picture = Column(String, nullable=True)
+    followers_count = Column(Integer, default=0)
+    following_count = Column(Integer, default=0)
 
     blogs = relationship("Blog", back_populates="user")
     comments = relationship("Comment", back_populates="user")
     reacts = relationship("React", back_populates="user")
     shares = relationship("Share", back_populates="user")
-    messages = relationship("Messaging", back_populates="user")
+    messages = relationship(
+        "Messaging", back_populates="user", foreign_keys="Messaging.user_id"
+    )
     group_admins = relationship("GroupAdmin", back_populates="user")
     members = relationship("Member", back_populates="user")
 
 
+class Follow(Base):
+    __tablename__ = "follows"
+    id = Column(Integer, primary_key=True, index=True)
+    follower_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    followee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    time_of_follow = Column(DateTime(timezone=True), default=current_utc_time)
+
+    __table_args__ = (
+        UniqueConstraint("follower_id", "followee_id", name="unique_follow"),
+        Index("ix_follows_followee", "followee_id", "follower_id"),
+    )
+
+
 class Messaging(Base):
     __tablename__ = "messages"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    receiver_id = Column(Integer, ForeignKey("users.id"))
     receiver = Column(String)
     username = Column(String)
     message = Column(String, nullable=True)
     pics = Column(String, nullable=True)
     delivered = Column(Boolean, default=False)
     time_of_chat = Column(DateTime(timezone=True), default=current_utc_time)
-    user = relationship("User", back_populates="messages")
+    user = relationship("User", back_populates="messages", foreign_keys=[user_id])
+    __table_args__ = (
+        Index(
+            "ix_messages_undelivered",
+            "receiver_id",
+            "user_id",
+            "id",
+            postgresql_where=delivered.is_(False),
+            sqlite_where=delivered.is_(False),
+        ),
+        Index(
+            "ix_messages_backlog",
+            "receiver_id",
+            "id",
+            postgresql_where=delivered.is_(False),
+            sqlite_where=delivered.is_(False),
+        ),
+    )
+
+
+Index(
+    "ix_messages_pair",
+    func.least(Messaging.user_id, Messaging.receiver_id),
+    func.greatest(Messaging.user_id, Messaging.receiver_id),
+    Messaging.id,
+).ddl_if(dialect="postgresql")
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    peer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_message_id = Column(Integer, ForeignKey("messages.id"))
+    last_message_at = Column(DateTime(timezone=True))
+    unread_count = Column(Integer, default=0)
+    __table_args__ = (
+        UniqueConstraint("user_id", "peer_id", name="unique_conversation"),
+        Index("ix_conversations_inbox", "user_id", "last_message_at", "id"),
+    )
 
 
 class GroupAdmin(Base):
@@ -86,9 +166,6 @@ class Member(Base):
 
     user = relationship("User", back_populates="members")
     group = relationship("Group", back_populates="members")
-    group_tasks = relationship(
-        "GroupTask", secondary=group_task_members, back_populates="members"
-    )
 
 
 class Group(Base):
@@ -96,10 +173,8 @@ class Group(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
 
-    contributions = relationship("Contribute", back_populates="group")
     admins = relationship("GroupAdmin", back_populates="group")
     members = relationship("Member", back_populates="group")
-    group_tasks = relationship("GroupTask", back_populates="group")
 
 
 class Blog(Base):
@@ -110,15 +185,55 @@ class Blog(Base):
     comments_count = Column(Integer, default=0)
     share_count = Column(Integer, default=0)
     reacts_count = Column(Integer, default=0)
+    like_count = Column(Integer, default=0)
+    love_count = Column(Integer, default=0)
+    angry_count = Column(Integer, default=0)
+    laugh_count = Column(Integer, default=0)
+    wow_count = Column(Integer, default=0)
+    sad_count = Column(Integer, default=0)
+    hot_score = Column(Float, default=0.0, server_default="0", nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     time_of_post = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
 
+    __table_args__ = (
+        Index("ix_blogs_recent", "time_of_post", "id"),
+        Index("ix_blogs_hot", "hot_score", "id"),
+        Index("ix_blogs_author_recent", "user_id", "time_of_post"),
+        Index(
+            "ix_blogs_document",
+            search_document(title, content),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     comments = relationship("Comment", back_populates="blog")
     user = relationship("User", back_populates="blogs")
     react = relationship("React", back_populates="blog")
     shares = relationship("Share", back_populates="blog")
 
 
+blog_document = search_document(Blog.title, Blog.content)
+
+Index(
+    "ix_blogs_title_trgm",
+    Blog.title,
+    postgresql_using="gin",
+    postgresql_ops={"title": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_users_name_trgm",
+    User.name,
+    postgresql_using="gin",
+    postgresql_ops={"name": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_users_username_trgm",
+    User.username,
+    postgresql_using="gin",
+    postgresql_ops={"username": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+
 class Comment(Base):
     __tablename__ = "comments"
     id = Column(Integer, primary_key=True, index=True)
@@ -127,7 +242,41 @@ class Comment(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     blog_id = Column(Integer, ForeignKey("blogs.id"))
     reacts_count = Column(Integer, default=0)
+    like_count = Column(Integer, default=0)
+    love_count = Column(Integer, default=0)
+    angry_count = Column(Integer, default=0)
+    laugh_count = Column(Integer, default=0)
+    wow_count = Column(Integer, default=0)
+    sad_count = Column(Integer, default=0)
     time_of_post = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    path = Column(String().with_variant(String(collation="C"), "postgresql"))
+    depth = Column(Integer, default=0)
+    replies_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ix_comments_thread", "blog_id", "path"),
+        Index("ix_comments_blog_recent", "blog_id", "time_of_post", "id"),
+        Index("ix_comments_recent", "time_of_post", "id"),
+        Index("ix_comments_popular", "reacts_count", "id"),
+        Index(
+            "ix_comments_top_level",
+            "blog_id",
+            "time_of_post",
+            "id",
+            postgresql_where=parent_id.is_(None),
+            sqlite_where=parent_id.is_(None),
+        ),
+        Index(
+            "ix_comments_top_popular",
+            "blog_id",
+            "reacts_count",
+            "id",
+            postgresql_where=parent_id.is_(None),
+            sqlite_where=parent_id.is_(None),
+        ),
+    )
+
     blog = relationship("Blog", back_populates="comments")
     user = relationship("User", back_populates="comments")
     react = relationship("React", back_populates="comment")
@@ -159,6 +308,28 @@ class React(Base):
     user = relationship("User", back_populates="reacts")
 
 
+class ReactionEvent(Base):
+    __tablename__ = "reaction_events"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    blog_id = Column(Integer)
+    comment_id = Column(Integer)
+    type = Column(SQLEnum(ReactionType), nullable=True)
+    time_of_event = Column(DateTime(timezone=True), default=current_utc_time)
+
+    __table_args__ = (
+        Index("ix_reaction_events_blog", "blog_id", "user_id", "id"),
+        Index("ix_reaction_events_comment", "comment_id", "user_id", "id"),
+    )
+
+
+event.listen(
+    ReactionEvent.__table__,
+    "after_create",
+    DDL("ALTER TABLE reaction_events SET UNLOGGED").execute_if(dialect="postgresql"),
+)
+
+
 class ShareType(str, Enum):
     love = "love"
     angry = "angry"
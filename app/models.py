@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field, computed_field
-from typing import Optional, List, Generic, TypeVar
+from typing import Optional, List, Generic, Literal, TypeVar
 from datetime import datetime, timezone, date
 from enum import Enum
 
@@ -48,7 +48,9 @@ class UserRes(BaseModel):
 class PaginatedResponse(BaseModel):
     page: int
     limit: int
-    total: int
+    total: int | None = None
+    next_cursor: str | None = None
+    has_more: bool | None = None
 
 
 class PaginatedMetadata(BaseModel, Generic[T]):
@@ -71,12 +73,22 @@ class ReactionsSummary(BaseModel):
     sad: int = 0
 
 
+class ReactionOperation(BaseModel):
+    op: Literal["add", "change", "remove"] = "add"
+    type: str | None = None
+    blog: int | None = None
+    comment: int | None = None
+
+
 class Commenter(BaseModel):
     id: Optional[int] = None
     blog_id: int
+    parent_id: int | None = None
     content: str = Field(..., max_length=180)
     reacts_count: int | None = None
     reactions: ReactionsSummary = Field(default_factory=list)
+    depth: int | None = None
+    replies_count: int | None = None
     time_of_post: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -90,7 +102,9 @@ class Blogger(BaseModel):
     comments_count: int | None = None
     reacts_count: int | None = None
     share_count: int | None = None
-    comments: List[Commenter] = Field(default_factory=list)
+    comments_preview: List[Commenter] | None = None
+    comments_cursor: str | None = None
+    my_reaction: str | None = None
     time_of_post: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -15,8 +15,9 @@ from datetime import timedelta
 from fastapi import Form, File, UploadFile
 import shutil, uuid, os
 from app.log.logger import get_loggers
-from app.database.scheduler import send_email_name
+from app.database.scheduler import send_email
 from app.models import LoginResponse
+from app.core.pagination import invalidate_totals
 from email_validator import validate_email, EmailNotValidError
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -81,7 +82,8 @@ async def register(
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
-    send_email_name.delay(
+    await invalidate_totals("users")
+    send_email.delay(
         subject="Registerd Successfully",
         body="welcome to Beaut Citi, hope you enjoy your experience, customer support is always available if you need anything, thanks for being a partner",
         to_email=new_user.email,
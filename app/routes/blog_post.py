@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy import select, func
 from app.models import (
     Blogger,
@@ -12,40 +13,86 @@ from app.model_sql import Blog, User, React, Comment
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db_session import get_db
 from datetime import datetime, timezone
+from typing import AsyncIterator, List
 from app.auth.verify_jwt import verify_token
 from app.log.logger import get_loggers
-from app.models import ReactionsSummary
-from app.routes.comment_stars import react_summary
-from sqlalchemy.orm import selectinload
+from app.database.projections import BLOG_COLUMNS, blog_item
+from app.core.responses import fast_response, page_data
+from app.database.ranking import refresh_hot_score
+from app.database.counters import merge_pending
+from app.database.reactions import viewer_reactions
+from app.database.reaction_log import merge_events, viewer_events
+from app.routes.comment_stars import comment_previews
+from app.core.pagination import (
+    paginate,
+    offset_page,
+    invalidate_totals,
+    COUNT_MODES,
+)
+from app.database.search import search_backend
+from app.database.timeline import read_timeline, post_score, TIMELINE_SIZE
+from app.database.scheduler import fan_out_blog, fan_out_blogs, purge_user_content
+from app.database.ingest import (
+    is_ndjson,
+    request_items,
+    blog_row,
+    write_chunk,
+    item_error,
+    BULK_CHUNK,
+    MAX_BULK_CHUNK,
+)
+from app.database.purge import blog_cascade, purge_job_key, PURGE_JOB_TTL
+from app.core.redis_config import redis_client
+from app.core.celery_config import celery_app
+from app.core.blog_cache import (
+    cached_blog,
+    store_blog,
+    invalidate_blog,
+    cached_reaction,
+    remember_reactions,
+)
+import heapq
+import orjson
+import uuid
 
 router = APIRouter(prefix="/Blogs", tags=["Expressions"])
 logger = get_loggers("blogs")
 
 
-async def reactions(db: AsyncSession, blog_id: int) -> ReactionsSummary:
-    counts = (
-        (
-            await db.execute(
-                select(React.type, func.count(React.id))
-                .where(React.blog_id == blog_id)
-                .group_by(React.type)
-                .order_by(React.type),
-            )
-        )
-    ).all()
+async def blog_items(
+    db: AsyncSession, rows: list, viewer_id: int | None = None
+) -> List[dict]:
+    previews = await comment_previews(db, [row.id for row in rows])
+    items = [blog_item(row, previews[row.id]) for row in rows]
+    await merge_pending(Blog, items, "reaction")
+    await merge_events(db, Blog, items, "reaction")
+    await mark_reactions(db, viewer_id, items)
+    return items
 
-    summary = {
-        rtype.name if hasattr(rtype, "name") else rtype: count
-        for rtype, count in counts
-    }
-    return ReactionsSummary(
-        like=summary.get("like", 0),
-        love=summary.get("love", 0),
-        laugh=summary.get("laugh", 0),
-        wow=summary.get("wow", 0),
-        angry=summary.get("angry", 0),
-        sad=summary.get("sad", 0),
-    )
+
+async def mark_reactions(db: AsyncSession, viewer_id: int | None, items: List[dict]):
+    """Set ``my_reaction`` on the items the viewer has reacted to."""
+    blog_ids = [item["id"] for item in items]
+    mine = await viewer_reactions(db, viewer_id, blog_ids)
+    mine.update(await viewer_events(db, viewer_id, blog_ids))
+    for item in items:
+        if mine.get(item["id"]):
+            item["my_reaction"] = mine[item["id"]]
+
+
+async def mark_own_reaction(db: AsyncSession, viewer_id: int | None, item: dict):
+    """``mark_reactions`` for a single blog, served from the blog's viewers
+    hash; the database is only asked once per viewer and cache lifetime.
+    """
+    if not viewer_id:
+        return
+    known, mine = await cached_reaction(item["id"], viewer_id)
+    if not known:
+        await mark_reactions(db, viewer_id, [item])
+        mine = item.get("my_reaction")
+        await remember_reactions(viewer_id, {item["id"]: mine}, overwrite=False)
+    if mine:
+        item["my_reaction"] = mine
 
 
 async def patch_comment(db: AsyncSession, blog_id: int) -> Commenter:
@@ -96,13 +143,135 @@ async def express(
         content=blog.content,
         time_of_post=datetime.now(timezone.utc),
     )
+    refresh_hot_score(blogs)
     db.add(blogs)
     await db.commit()
     await db.refresh(blogs)
+    await invalidate_totals("blogs")
+    fan_out_blog.delay(blogs.id, user_id, post_score(blogs.time_of_post))
     logger.info("Blog post successfully created by: %s", username)
     return {"message": "post successful"}
 
 
+BULK_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "array",
+                    "items": {"$ref": "#/components/schemas/Blogger"},
+                }
+            },
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+async def import_blogs(
+    db: AsyncSession, request: Request, user_id: int, chunk_size: int, totals: dict
+) -> AsyncIterator[dict]:
+    """Write the blogs of a bulk body ``chunk_size`` at a time and yield each
+    item's result once it is known, invalid items right away and the rest as
+    their chunk commits. Only the newest ``TIMELINE_SIZE`` blogs are kept for
+    the timeline fan-out. ``totals`` counts the items read and blogs created.
+    """
+    now = datetime.now(timezone.utc)
+    pending = []
+    newest = []
+
+    async def write(pending):
+        nonlocal newest
+        results, entries = await write_chunk(db, pending)
+        totals["created"] += len(entries)
+        newest = heapq.nlargest(
+            TIMELINE_SIZE, newest + entries, key=lambda entry: entry[1]
+        )
+        return results
+
+    async for item in request_items(request):
+        index = totals["items"]
+        totals["items"] += 1
+        try:
+            pending.append((index, blog_row(item, user_id, now)))
+        except (ValidationError, ValueError) as e:
+            yield {"index": index, "status": "invalid", "errors": item_error(e)}
+        if len(pending) >= chunk_size:
+            for result in await write(pending):
+                yield result
+            pending = []
+    if pending:
+        for result in await write(pending):
+            yield result
+    if newest:
+        await invalidate_totals("blogs")
+        fan_out_blogs.delay(user_id, newest)
+
+
+def bulk_summary(totals: dict) -> dict:
+    created, items = totals["created"], totals["items"]
+    return {
+        "status": "success" if created == items else "partial",
+        "message": f"{created} of {items} blogs created",
+        "created": created,
+        "failed": items - created,
+    }
+
+
+async def ndjson_results(
+    results: AsyncIterator[dict], totals: dict, username: str
+) -> AsyncIterator[bytes]:
+    async for result in results:
+        yield orjson.dumps(result) + b"\n"
+    summary = bulk_summary(totals)
+    logger.info("Bulk import by %s: %s", username, summary["message"])
+    yield orjson.dumps(summary) + b"\n"
+
+
+@router.post("/bulk", response_model=StandardResponse, openapi_extra=BULK_BODY)
+async def bulk_express(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK, ge=1, le=MAX_BULK_CHUNK),
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    """Create many blogs from a JSON array of ``Blogger`` payloads, or from an
+    ``application/x-ndjson`` body that is read as it streams in. Rows are
+    written ``chunk_size`` at a time and every item gets its own result.
+
+    A JSON array gets one response with every result. An NDJSON body gets an
+    NDJSON response instead: a result line per item as its chunk is written,
+    not in input order, then a summary line, so memory does not grow with
+    the size of the import.
+    """
+    username = payload.get("sub")
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=403, detail="forbidden entry")
+    totals = {"items": 0, "created": 0}
+    results = import_blogs(db, request, user_id, chunk_size, totals)
+    if is_ndjson(request):
+        return StreamingResponse(
+            ndjson_results(results, totals, username),
+            media_type="application/x-ndjson",
+        )
+    results = sorted(
+        [result async for result in results], key=lambda result: result["index"]
+    )
+    summary = bulk_summary(totals)
+    logger.info("Bulk import by %s: %s", username, summary["message"])
+    return fast_response(
+        summary["status"],
+        summary["message"],
+        {
+            "created": summary["created"],
+            "failed": summary["failed"],
+            "results": results,
+        },
+    )
+
+
 @router.get(
     "/view_blogs",
     response_model=StandardResponse[PaginatedMetadata[Blogger]],
@@ -111,37 +280,37 @@ async def express(
 async def view(
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    cursor: str | None = None,
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=403, detail="unauthorized access")
-    offset = (page - 1) * limit
-    stmt = (
-        select(Blog)
-        .options(selectinload(Blog.comments))
-        .order_by(Blog.time_of_post.asc())
+    stmt = select(*BLOG_COLUMNS)
+    result, pagination = await paginate(
+        db,
+        stmt,
+        [Blog.time_of_post, Blog.id],
+        page,
+        limit,
+        cursor=cursor,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="blogs",
+        scalars=False,
+        count_by_default=False,
+        descending=False,
+        tag="view",
     )
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
-    logger.info("Total blogs found for '%s': %d", username, total)
-    result = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
+    logger.info("Total blogs found for '%s': %s", username, pagination.total)
     logger.info("Number of blogs retrieved on this page: %d", len(result))
-    items = []
-    for blog in result:
-        blog_data = Blogger.model_validate(blog)
-        blog_data.reaction = await reactions(db, blog.id)
-        items.append(blog_data)
-    data = PaginatedMetadata[Blogger](
-        items=items,
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
-    )
+    items = await blog_items(db, result, payload.get("user_id"))
+    data = page_data(items, pagination)
     logger.info("Paginated data prepared successfully for '%s'", username)
-    return StandardResponse(
-        status="success", message="below lies all your expressions", data=data
-    )
+    return fast_response("success", "below lies all your expressions", data)
 
 
 @router.get(
@@ -150,40 +319,54 @@ async def view(
     response_model_exclude_none=True,
 )
 async def filter(
+    q: str | None = None,
     author: str | None = None,
     title: str | None = None,
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    cursor: str | None = None,
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=403, detail="unauthorized access")
-    offset = (page - 1) * limit
-    stmt = select(Blog).options(selectinload(Blog.comments))
-    if author:
-        stmt = stmt.where(Blog.user.has(User.name.ilike(f"%{author}%")))
-    if title:
-        stmt = stmt.where(Blog.title.ilike(f"%{title}%"))
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
-    logger.info("Total filtered blogs: %d", total)
-    results = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
+    if q or author or title:
+        stmt = search_backend(db).blogs(q=q, title=title, author=author)
+        results, pagination = await offset_page(
+            db,
+            stmt,
+            page,
+            limit,
+            with_total=with_total,
+            count_mode=count_mode,
+            scope="blogs",
+            scalars=False,
+            count_by_default=False,
+        )
+    else:
+        stmt = select(*BLOG_COLUMNS)
+        results, pagination = await paginate(
+            db,
+            stmt,
+            [Blog.time_of_post, Blog.id],
+            page,
+            limit,
+            cursor=cursor,
+            with_total=with_total,
+            count_mode=count_mode,
+            scope="blogs",
+            scalars=False,
+            count_by_default=False,
+            tag="search",
+        )
+    logger.info("Total filtered blogs: %s", pagination.total)
     logger.info("Number of blogs retrieved on this page: %d", len(results))
-    items = []
-    for blog in results:
-        blog_data = Blogger.model_validate(blog)
-        blog_data.reaction = await reactions(db, blog.id)
-        items.append(blog_data)
-    data = PaginatedMetadata[Blogger](
-        items=items,
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
-    )
-    return StandardResponse(
-        status="success", message="below lies all your expressions", data=data
-    )
+    items = await blog_items(db, results, payload.get("user_id"))
+    data = page_data(items, pagination)
+    return fast_response("success", "below lies all your expressions", data)
 
 
 @router.get(
@@ -195,42 +378,69 @@ async def view_trending(
     sorting: str = Query("recent", enum=["popular", "recent"]),
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    cursor: str | None = None,
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=403, detail="unauthorized access")
-    offset = (page - 1) * limit
-    stmt = select(Blog).options(selectinload(Blog.comments))
-    if sorting == "recent":
-        stmt = stmt.order_by(Blog.time_of_post.desc())
+    stmt = select(*BLOG_COLUMNS)
+    keys = [Blog.time_of_post, Blog.id]
     if sorting == "popular":
-        stmt = stmt.order_by(
-            Blog.comments_count.desc(),
-            Blog.share_count.desc(),
-            Blog.reacts_count.desc(),
-        )
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
-    logger.info("Total blogs for '%s': %d", username, total)
-    stmt = stmt.offset(offset).limit(limit)
-    result = (await db.execute(stmt)).scalars().all()
-    logger.info("Number of recent blogs retrieved: %d", len(result))
-    items = []
-    for blog in result:
-        blog_data = Blogger.model_validate(blog)
-        blog_data.reaction = await reactions(db, blog.id)
-        items.append(blog_data)
-    data = PaginatedMetadata[Blogger](
-        items=items,
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
+        stmt = stmt.add_columns(Blog.hot_score)
+        keys = [Blog.hot_score, Blog.id]
+    result, pagination = await paginate(
+        db,
+        stmt,
+        keys,
+        page,
+        limit,
+        cursor=cursor,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="blogs",
+        scalars=False,
+        count_by_default=False,
+        tag=sorting,
     )
+    logger.info("Total blogs for '%s': %s", username, pagination.total)
+    logger.info("Number of recent blogs retrieved: %d", len(result))
+    items = await blog_items(db, result, payload.get("user_id"))
+    data = page_data(items, pagination)
     logger.info("Recent paginated data prepared successfully for '%s'", username)
-    return StandardResponse(
-        status="success", message="below lies all the recent expressions", data=data
+    return fast_response("success", "below lies all the recent expressions", data)
+
+
+@router.get(
+    "/timeline",
+    response_model=StandardResponse[PaginatedMetadata[Blogger]],
+    response_model_exclude_none=True,
+)
+async def home_timeline(
+    cursor: str | None = None,
+    limit: int = Query(10, le=100),
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=403, detail="unauthorized access")
+    result, next_cursor = await read_timeline(db, user_id, cursor, limit)
+    logger.info("Timeline blogs retrieved for user %s: %d", user_id, len(result))
+    items = await blog_items(db, result, user_id)
+    data = page_data(
+        items,
+        PaginatedResponse(
+            page=1,
+            limit=limit,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None,
+        ),
     )
+    return fast_response("success", "below lies your home timeline", data)
 
 
 @router.get(
@@ -246,15 +456,23 @@ async def fetch_some(
     username = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=403, detail="unauthorized access")
-    stmt = select(Blog).where(Blog.id == bl_id).options(selectinload(Blog.comments))
-    result = (await db.execute(stmt)).scalar_one_or_none()
+    cached, version = await cached_blog(bl_id)
+    if cached is not None:
+        logger.info(f"Served blog with id {bl_id} from cache")
+        data = {**cached}
+        await mark_own_reaction(db, payload.get("user_id"), data)
+        return fast_response("success", "requested data", data)
+    stmt = select(*BLOG_COLUMNS).where(Blog.id == bl_id)
+    result = (await db.execute(stmt)).one_or_none()
     if not result:
         logger.warning(f"No blog found with id {bl_id} for {username}")
         return StandardResponse(status="failure", message="invalid id")
-    data = Blogger.model_validate(result)
-    data.reaction = await reactions(db, result.id)
+    (data,) = await blog_items(db, [result])
+    await store_blog(bl_id, version, data)
     logger.info(f"Successfully retrieved blog with id {bl_id}: {data}")
-    return StandardResponse(status="success", message="requested data", data=data)
+    data = {**data}
+    await mark_own_reaction(db, payload.get("user_id"), data)
+    return fast_response("success", "requested data", data)
 
 
 @router.put("/edit", response_model=StandardResponse)
@@ -279,6 +497,7 @@ async def change(
     data.time_of_post = datetime.now(timezone.utc)
     await db.commit()
     await db.refresh(data)
+    await invalidate_blog(bl_id)
     stm = select(User).where(User.username == username)
     re = (await db.execute(stm)).scalar_one_or_none()
     logger.info(f"Updating time_of_post for blog id {bl_id} to {data.time_of_post}")
@@ -311,8 +530,11 @@ async def delete_one(
             f"No blog found to delete with id {blog_id} for author {username}"
         )
         return {"status": "no data", "message": "invalid field"}
-    await db.delete(data)
+    for _, cascade in blog_cascade([blog_id]):
+        await db.execute(cascade)
     await db.commit()
+    await invalidate_totals("blogs", "comments", "shares")
+    await invalidate_blog(blog_id)
     logger.info(f"Successfully deleted blog with id {blog_id}")
     return {
         "status": "success",
@@ -327,17 +549,29 @@ async def delete_one(
 
 @router.delete("/clear_all")
 async def clear(
-    db: AsyncSession = Depends(get_db), payload: dict = Depends(verify_token)
+    include_activity: bool = False,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
 ):
     username = payload.get("sub")
     user_id = payload.get("user_id")
-    stmt = select(Blog).where(Blog.user_id == user_id)
-    data = (await db.execute(stmt)).scalars().all()
-    if not data:
+    stmt = select(Blog.id).where(Blog.user_id == user_id).limit(1)
+    data = (await db.execute(stmt)).scalar()
+    if not data and not include_activity:
         logger.warning(f"No blogs found to clear for {username}")
         return {"message:": "no available data"}
-    for item in data:
-        await db.delete(item)
-    await db.commit()
-    logger.info(f"All blogs successfully deleted for {username}")
-    return {"message": "data wiped"}
+    job_id = str(uuid.uuid4())
+    await redis_client.set(purge_job_key(job_id), user_id, ex=PURGE_JOB_TTL)
+    purge_user_content.apply_async((user_id, include_activity), task_id=job_id)
+    logger.info(f"Queued clean-up job {job_id} for {username}")
+    return {"message": "clean-up started", "job_id": job_id}
+
+
+@router.get("/clear_all/status")
+async def clear_status(job_id: str, payload: dict = Depends(verify_token)):
+    owner = await redis_client.get(purge_job_key(job_id))
+    if owner is None or int(owner) != payload.get("user_id"):
+        raise HTTPException(status_code=404, detail="job not found")
+    job = celery_app.AsyncResult(job_id)
+    progress = job.info if isinstance(job.info, dict) else None
+    return {"job_id": job_id, "state": job.state, "progress": progress}
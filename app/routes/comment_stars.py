@@ -1,18 +1,43 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from app.models import (
     StandardResponse,
-    PaginatedResponse,
     PaginatedMetadata,
     Commenter,
-    ReactionsSummary,
 )
 from app.model_sql import Comment, Blog, User, React
+from app.database.threads import (
+    path_segment,
+    thread_path,
+    descendants,
+    MAX_THREAD_DEPTH,
+)
+from app.database.reactions import reaction_summary
+from app.database.projections import COMMENT_COLUMNS, comment_item
+from app.core.responses import fast_response, page_data
+from app.database.counters import bump, merge_pending
+from app.database.reaction_log import merge_events
+from app.core.blog_cache import invalidate_blog
+from app.database.top_comments import (
+    popular_comments,
+    add_comment,
+    drop_comments,
+    TOP_K,
+)
+from app.core.pagination import (
+    offset_page,
+    paginate,
+    encode_cursor,
+    invalidate_totals,
+    COUNT_MODES,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db_session import get_db
 from datetime import datetime, timezone
 from app.auth.verify_jwt import verify_token
-from sqlalchemy import select, func
+from sqlalchemy import select, func, delete
+from sqlalchemy.orm import aliased
 from app.log.logger import get_loggers
+from typing import Dict, List, Tuple
 import tracemalloc
 
 tracemalloc.start()
@@ -20,28 +45,55 @@ tracemalloc.start()
 router = APIRouter(prefix="/Comments", tags=["Counter_Expressions"])
 logger = get_loggers("comments")
 
+COMMENT_PREVIEW_SIZE = 3
+
 
-async def react_summary(db: AsyncSession, comment_id) -> ReactionsSummary:
-    counts = (
-        await db.execute(
-            select(React.type, func.count(React.id))
-            .where(React.comment_id == comment_id)
-            .group_by(React.type)
-            .order_by(React.type)
+async def comment_previews(
+    db: AsyncSession, blog_ids: List[int], size: int = COMMENT_PREVIEW_SIZE
+) -> Dict[int, Tuple[List[dict], str | None]]:
+    """Newest ``size`` top-level comments of every blog on a page, in one query.
+
+    Each blog also gets the cursor that continues its comments on
+    ``/Comments/blog_comments``, or ``None`` when the preview holds them all.
+    Comments come back as plain ``Commenter``-shaped dicts.
+    """
+    if not blog_ids:
+        return {}
+    position = (
+        func.row_number()
+        .over(
+            partition_by=Comment.blog_id,
+            order_by=(Comment.time_of_post.desc(), Comment.id.desc()),
         )
-    ).all()
-    summary = {
-        rtype.name if hasattr(rtype, "name") else rtype: count
-        for rtype, count in counts
-    }
-    return ReactionsSummary(
-        like=summary.get("like", 0),
-        love=summary.get("love", 0),
-        laugh=summary.get("laugh", 0),
-        angry=summary.get("angry", 0),
-        wow=summary.get("wow", 0),
-        sad=summary.get("sad", 0),
+        .label("position")
+    )
+    ranked = (
+        select(*COMMENT_COLUMNS, position)
+        .where(Comment.blog_id.in_(blog_ids), Comment.parent_id.is_(None))
+        .subquery()
+    )
+    stmt = (
+        select(ranked)
+        .where(ranked.c.position <= size + 1)
+        .order_by(ranked.c.blog_id, ranked.c.position)
     )
+    rows = (await db.execute(stmt)).all()
+    grouped = {blog_id: [] for blog_id in blog_ids}
+    for comment in rows:
+        grouped[comment.blog_id].append(comment)
+    previews = {}
+    for blog_id, comments in grouped.items():
+        cursor = None
+        if len(comments) > size:
+            comments = comments[:size]
+            cursor = encode_cursor(
+                "blog_comments", [comments[-1].time_of_post, comments[-1].id]
+            )
+        previews[blog_id] = ([comment_item(comment) for comment in comments], cursor)
+    items = [item for items, _ in previews.values() for item in items]
+    await merge_pending(Comment, items, "reactions")
+    await merge_events(db, Comment, items, "reactions")
+    return previews
 
 
 @router.get("/security_zone")
@@ -69,16 +121,36 @@ async def c_express(
     if not target:
         logger.warning(f"No blog found with ID: {comment.blog_id}")
         return StandardResponse(status="failure", message="no such blog exists")
-    target.comments_count = (target.comments_count or 0) + 1
+    parent = None
+    if comment.parent_id:
+        parent = await db.get(Comment, comment.parent_id)
+        if not parent or parent.blog_id != comment.blog_id:
+            logger.warning(f"No comment {comment.parent_id} on blog {comment.blog_id}")
+            return StandardResponse(status="failure", message="no such comment exists")
+        if (parent.depth or 0) >= MAX_THREAD_DEPTH:
+            raise HTTPException(status_code=400, detail="thread too deep")
     comments = Comment(
         user_id=user_id,
         content=comment.content,
         blog_id=comment.blog_id,
+        parent_id=comment.parent_id,
+        depth=(parent.depth or 0) + 1 if parent else 0,
         time_of_post=datetime.now(timezone.utc),
     )
     db.add(comments)
+    await db.flush()
+    comments.path = path_segment(comments.id)
+    if parent:
+        parent.path = thread_path(parent)
+        comments.path = parent.path + comments.path
     await db.commit()
     await db.refresh(comments)
+    await bump(db, Blog, comment.blog_id, {"comments_count": 1})
+    await bump(db, Comment, comment.parent_id, {"replies_count": 1})
+    if not parent:
+        await add_comment(comment.blog_id, comments.id)
+    await invalidate_totals("comments")
+    await invalidate_blog(comment.blog_id)
     logger.info(
         f"Comment successfully committed to database by {username} with ID: {comments.id if hasattr(comments, 'id') else 'unknown'}"
     )
@@ -92,8 +164,12 @@ async def c_express(
     response_model_exclude_none=True,
 )
 async def view(
+    blog_id: int | None = None,
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    cursor: str | None = None,
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
@@ -101,25 +177,27 @@ async def view(
     if username is None:
         logger.warning("Unauthorized access attempt — missing 'sub' in token payload.")
         raise HTTPException(status_code=403, detail="Unauthorized access.")
-    offset = (page - 1) * limit
-    stmt = select(Comment)
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
-    result = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
-    items = []
-    for comment in result:
-        comment_data = Commenter.model_validate(comment)
-        comment_data.reactions = await react_summary(db, comment.id)
-        items.append(comment_data)
-    data = PaginatedMetadata[Commenter](
-        items=items,
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
+    stmt = select(*COMMENT_COLUMNS)
+    if blog_id is not None:
+        stmt = stmt.where(Comment.blog_id == blog_id)
+    result, pagination = await paginate(
+        db,
+        stmt,
+        [Comment.time_of_post, Comment.id],
+        page,
+        limit,
+        cursor=cursor,
+        with_total=with_total,
+        tag="view_comments",
+        count_mode=count_mode,
+        scope="comments",
+        scalars=False,
     )
+    items = [comment_item(comment) for comment in result]
+    await merge_pending(Comment, items, "reactions")
+    data = page_data(items, pagination)
     logger.info(f"Fetched {len(result)} comments for user={username} (page={page}).")
-    return StandardResponse(
-        status="success", message="below lies all your counters", data=data
-    )
+    return fast_response("success", "below lies all your counters", data)
 
 
 router.get(
@@ -133,6 +211,8 @@ async def filter(
     username: str,
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
@@ -142,28 +222,154 @@ async def filter(
             "Unauthorized access attempt — missing 'user_id' in token payload."
         )
         raise HTTPException(status_code=403, detail="Unauthorized access.")
-    offset = (page - 1) * limit
-    stmt = select(Comment)
+    stmt = select(*COMMENT_COLUMNS)
     stmt = stmt.where(Comment.user.has(User.username.ilike(f"%{username}%")))
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
-    results = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
-    items = []
-    for comment in results:
-        comment_data = Commenter.model_validate(comment)
-        comment_data.reactions = await react_summary(db, comment.id)
-        items.append(comment_data)
-    data = PaginatedMetadata[Commenter](
-        items=items,
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
+    results, pagination = await offset_page(
+        db,
+        stmt,
+        page,
+        limit,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="comments",
+        scalars=False,
     )
+    items = [comment_item(comment) for comment in results]
+    await merge_pending(Comment, items, "reactions")
+    data = page_data(items, pagination)
     logger.info(
         f"Fetched {len(results)} comments matching username='{username}' (page={page}, limit={limit})."
     )
-    return StandardResponse(
-        status="success", message="below lies all your counters", data=data
+    return fast_response("success", "below lies all your counters", data)
+
+
+@router.get(
+    "/blog_comments",
+    response_model=StandardResponse[PaginatedMetadata[Commenter]],
+    response_model_exclude_none=True,
+)
+async def blog_comments(
+    blog_id: int,
+    sorting: str = Query("recent", enum=["recent", "popular"]),
+    cursor: str | None = None,
+    limit: int = Query(10, le=100),
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    """Top-level comments of one blog, newest or most reacted first. Both
+    orders seek on a partial index led by ``blog_id``, so only that blog's
+    rows are read.
+    """
+    username = payload.get("sub")
+    if username is None:
+        logger.warning("Unauthorized access attempt — missing 'sub' in token payload.")
+        raise HTTPException(status_code=403, detail="Unauthorized access.")
+    stmt = select(*COMMENT_COLUMNS).where(
+        Comment.blog_id == blog_id, Comment.parent_id.is_(None)
+    )
+    keys = [Comment.time_of_post, Comment.id]
+    tag = "blog_comments"
+    if sorting == "popular":
+        keys = [Comment.reacts_count, Comment.id]
+        tag = "blog_comments_popular"
+    result, pagination = await paginate(
+        db,
+        stmt,
+        keys,
+        1,
+        limit,
+        cursor=cursor,
+        with_total=with_total,
+        tag=tag,
+        count_mode=count_mode,
+        scope="comments",
+        scalars=False,
     )
+    items = [comment_item(comment) for comment in result]
+    await merge_pending(Comment, items, "reactions")
+    await merge_events(db, Comment, items, "reactions")
+    data = page_data(items, pagination)
+    logger.info(f"Fetched {len(result)} comments of blog_id={blog_id} for {username}")
+    return fast_response("success", "below lies the blog's counters", data)
+
+
+@router.get(
+    "/replies",
+    response_model=StandardResponse[PaginatedMetadata[Commenter]],
+    response_model_exclude_none=True,
+)
+async def replies(
+    comment_id: int,
+    depth: int = Query(1, ge=1, le=MAX_THREAD_DEPTH),
+    cursor: str | None = None,
+    limit: int = Query(10, le=100),
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    """Expand the thread under a comment, ``depth`` levels deep, in reading
+    order. Items with ``replies_count`` left unexpanded can be opened with
+    another call on their own id.
+    """
+    username = payload.get("sub")
+    if username is None:
+        logger.warning("Unauthorized access attempt — missing 'sub' in token payload.")
+        raise HTTPException(status_code=403, detail="Unauthorized access.")
+    root = aliased(Comment)
+    stmt = (
+        select(*COMMENT_COLUMNS)
+        .join(root, root.id == comment_id)
+        .where(
+            Comment.blog_id == root.blog_id,
+            descendants(root.path),
+            Comment.depth <= root.depth + depth,
+        )
+    )
+    result, pagination = await paginate(
+        db,
+        stmt,
+        [Comment.path],
+        1,
+        limit,
+        cursor=cursor,
+        with_total=with_total,
+        descending=False,
+        tag="replies",
+        count_mode=count_mode,
+        scope="comments",
+        scalars=False,
+    )
+    items = [comment_item(comment) for comment in result]
+    await merge_pending(Comment, items, "reactions")
+    data = page_data(items, pagination)
+    logger.info(f"Fetched {len(result)} replies under comment_id={comment_id}")
+    return fast_response("success", "below lies the thread", data)
+
+
+@router.get(
+    "/popular",
+    response_model=StandardResponse[List[Commenter]],
+    response_model_exclude_none=True,
+)
+async def popular(
+    blog_id: int,
+    limit: int = Query(10, ge=1, le=TOP_K),
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    """The most reacted top-level comments of a blog, served from its
+    top-K ranking in Redis and rebuilt from the database when missing.
+    """
+    username = payload.get("sub")
+    if username is None:
+        logger.warning("Unauthorized access attempt — missing 'sub' in token payload.")
+        raise HTTPException(status_code=403, detail="Unauthorized access.")
+    items = await popular_comments(db, blog_id, limit)
+    logger.info(f"Fetched {len(items)} popular comments of blog_id={blog_id}")
+    return fast_response("success", "below lies the blog's top counters", items)
 
 
 @router.get(
@@ -186,7 +392,7 @@ async def fetch_some(
         logger.info(f"No comment found for com_id={com_id}")
         return StandardResponse(status="failure", message="invalid id")
     data = Commenter.model_validate(result)
-    data.reactions = await react_summary(db, result.id)
+    data.reactions = reaction_summary(result)
     logger.info(f"Successfully fetched comment com_id={com_id} for user={username}")
     return StandardResponse(status="success", message="requested data", data=data)
 
@@ -200,6 +406,8 @@ async def trending(
     sorting=Query("recent", enum=["popular", "recent"]),
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
@@ -208,31 +416,28 @@ async def trending(
     if username is None:
         logger.warning("Unauthorized access attempt — missing 'sub' in token payload.")
         raise HTTPException(status_code=403, detail="Unauthorized access.")
-    offset = (page - 1) * limit
-    stmt = select(Comment)
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
+    stmt = select(*COMMENT_COLUMNS)
     if sorting == "recent":
         stmt = stmt.order_by(Comment.time_of_post.desc())
     if sorting == "popular":
-        stmt = stmt.order_by(Comment.reacts_count.asc())
-    result = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
-    items = []
-    for comment in result:
-        comment_data = Commenter.model_validate(comment)
-        comment_data.reactions = await react_summary(db, comment.id)
-        items.append(comment_data)
-    data = PaginatedMetadata[Commenter](
-        items=items,
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
+        stmt = stmt.order_by(Comment.reacts_count.desc(), Comment.id.desc())
+    result, pagination = await offset_page(
+        db,
+        stmt,
+        page,
+        limit,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="comments",
+        scalars=False,
     )
+    items = [comment_item(comment) for comment in result]
+    await merge_pending(Comment, items, "reactions")
+    data = page_data(items, pagination)
     logger.info(
         f"Fetched {len(result)} recent comments for user={username} (page={page})"
     )
-    return StandardResponse(
-        status="success", message="below lies all the recent counters", data=data
-    )
+    return fast_response("success", "below lies all the recent counters", data)
 
 
 @router.put("/edit", response_model=StandardResponse)
@@ -262,6 +467,7 @@ async def change(
     data.time_of_post = datetime.now(timezone.utc)
     await db.commit()
     await db.refresh(data)
+    await invalidate_blog(data.blog_id)
     logger.info(
         f"Successfully edited blog_id={data.id} by user={username} (ID={user_id})"
     )
@@ -296,10 +502,21 @@ async def delete_one(
             f"No comment found for comment_id={comment_id} and user_id={user_id}."
         )
         return {"status": "no data", "message": "invalid field"}
-    target = await db.get(Blog, data.blog_id)
-    target.comments_count = max((target.comments_count or 1) - 1, 0)
-    await db.delete(data)
+    thread = [data.id]
+    if data.path:
+        stmt = select(Comment.id).where(
+            Comment.blog_id == data.blog_id, descendants(data.path)
+        )
+        thread += (await db.execute(stmt)).scalars().all()
+    await db.execute(delete(React).where(React.comment_id.in_(thread)))
+    await db.execute(delete(Comment).where(Comment.id.in_(thread)))
     await db.commit()
+    await bump(db, Blog, data.blog_id, {"comments_count": -len(thread)})
+    await bump(db, Comment, data.parent_id, {"replies_count": -1})
+    if data.parent_id is None:
+        await drop_comments(data.blog_id, [data.id])
+    await invalidate_totals("comments")
+    await invalidate_blog(data.blog_id)
     logger.info(
         f"Comment deleted successfully — blog_id={data.id}, user={username} (ID={user_id})"
     )
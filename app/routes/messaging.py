@@ -1,16 +1,23 @@
 from app.models import (
     Chat,
     StandardResponse,
-    PaginatedResponse,
 )
-from app.model_sql import Messaging, User
+from app.model_sql import Messaging, User, Conversation
 from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile
 from datetime import timezone, datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db_session import get_db
 from app.auth.verify_jwt import verify_token
 from app.log.logger import get_loggers
-from sqlalchemy import select, or_, func
+from app.core.pagination import paginate, invalidate_totals, COUNT_MODES
+from app.database.conversations import (
+    record_message,
+    acknowledge,
+    mark_read,
+    chat_history,
+    inbox,
+)
+from sqlalchemy import select
 import os, shutil, uuid
 from werkzeug.utils import secure_filename
 
@@ -51,6 +58,7 @@ async def text_him(
     sender = username
     new_message = Messaging(
         user_id=user_id,
+        receiver_id=receive.id,
         receiver=receiver,
         pics=pics,
         username=sender,
@@ -58,8 +66,12 @@ async def text_him(
         time_of_chat=datetime.now(timezone.utc),
     )
     db.add(new_message)
+    await db.flush()
+    await db.execute(
+        record_message(user_id, receive.id, new_message.id, new_message.time_of_chat)
+    )
     await db.commit()
-    await db.refresh(new_message)
+    await invalidate_totals(f"conversations:{user_id}", f"conversations:{receive.id}")
     return {"success": f"message successfully sent to {receiver}"}
 
 
@@ -71,45 +83,62 @@ async def text_him(
 async def view_messages(
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    cursor: str | None = None,
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
+    """The inbox: one entry per conversation, most recent first, with its
+    last message and the number of messages the user has not read.
+    """
+    user_id = payload.get("user_id")
     username = payload.get("sub")
-    if not username:
+    if not username or not user_id:
         raise HTTPException(status_code=403, detail="not a valid user")
-    offset = (page - 1) * limit
-    conversation_key = func.concat(
-        func.least(Messaging.username, Messaging.receiver),
-        ":",
-        func.greatest(Messaging.username, Messaging.receiver),
-    )
-    sub = (
-        select(conversation_key.label("conversation_id"))
-        .where(or_(Messaging.username == username, Messaging.receiver == username))
-        .distinct()
-        .order_by(conversation_key)
+    rows, pagination = await paginate(
+        db,
+        inbox(user_id),
+        [Conversation.last_message_at, Conversation.id],
+        page,
+        limit,
+        cursor=cursor,
+        with_total=with_total,
+        tag="inbox",
+        count_mode=count_mode,
+        scope=f"conversations:{user_id}",
+        scalars=False,
     )
-    total = (
-        await db.execute(select(func.count()).select_from(sub.subquery()))
-    ).scalar()
-    ids = (await db.execute(sub.offset(offset).limit(limit))).scalars().all()
-    stmt = (
-        select(Messaging, conversation_key.label("conversation_id"))
-        .where(conversation_key.in_(ids))
-        .order_by(Messaging.time_of_chat.desc())
-    )
-    view = (await db.execute(stmt)).all()
-    conversations = {}
-    for msg, conv_id in view:
-        conversations.setdefault(conv_id, []).append(Chat.model_validate(msg))
-    data = {
-        "conversations": conversations,
-        "pagination": PaginatedResponse(page=page, limit=limit, total=total),
-    }
-
+    conversations = [
+        {
+            "conversation_id": ":".join(sorted((username, row.peer))),
+            "peer": row.peer,
+            "unread": row.unread_count or 0,
+            "last_message": Chat(
+                id=row.message_id,
+                receiver=row.receiver,
+                username=row.username,
+                message=row.message,
+                delivered=bool(row.delivered),
+                pics=row.pics,
+                time_of_chat=row.time_of_chat,
+            ),
+        }
+        for row in rows
+    ]
+    data = {"conversations": conversations, "pagination": pagination}
     return StandardResponse(status="success", message="your messages", data=data)
 
 
+async def peer_id_of(db: AsyncSession, username: str | None) -> int:
+    peer_id = (
+        await db.execute(select(User.id).where(User.username == username))
+    ).scalar_one_or_none()
+    if peer_id is None:
+        raise HTTPException(status_code=404, detail="user not found")
+    return peer_id
+
+
 @router.get(
     "/view_one",
     response_model=StandardResponse,
@@ -117,44 +146,63 @@ async def view_messages(
 )
 async def view_messages(
     receiver: str | None = None,
-    page: int = Query(5, ge=1),
-    limit: int = Query(1, le=100),
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int = Query(30, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
+    """One chat, newest first. Scroll back with ``before_id`` set to the
+    page's ``before_id``, or fetch what arrived since with ``after_id``; each
+    page costs ``limit`` index entries. Messages shown to the receiver are
+    acknowledged up to the newest one on the page.
+    """
+    user_id = payload.get("user_id")
     username = payload.get("sub")
-    if not username:
+    if not username or not user_id:
         raise HTTPException(status_code=403, detail="not a valid user")
-    offset = (page - 1) * limit
-    conversation_key = func.concat(
-        func.least(Messaging.username, Messaging.receiver),
-        ":",
-        func.greatest(Messaging.username, Messaging.receiver),
-    )
-    stmt = (
-        select(Messaging, conversation_key.label("conversation_id"))
-        .where(
-            or_(
-                ((Messaging.username == username) & (Messaging.receiver == receiver)),
-                ((Messaging.username == receiver) & (Messaging.receiver == username)),
-            )
+    if before_id is not None and after_id is not None:
+        raise HTTPException(
+            status_code=400, detail="use either before_id or after_id, not both"
         )
-        .order_by(Messaging.time_of_chat.desc())
-    )
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar()
-    view = (await db.execute(stmt.offset(offset).limit(limit))).all()
-    for msg, _ in view:
-        if msg.receiver == username:
-            msg.delivered = True
-    await db.commit()
-    conversations = {}
-    for msg, conv_id in view:
-        conversations.setdefault(conv_id, []).append(Chat.model_validate(msg))
+    peer_id = await peer_id_of(db, receiver)
+    stmt = chat_history(user_id, peer_id, limit, before_id, after_id)
+    messages = (await db.execute(stmt)).scalars().all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if after_id is not None:
+        messages.reverse()
+    if messages:
+        await db.execute(acknowledge(user_id, peer_id, messages[0].id))
+        await db.execute(mark_read(user_id, [peer_id]))
+        await db.commit()
     data = {
-        "conversations": conversations,
-        "pagination": PaginatedResponse(page=page, limit=limit, total=total),
+        "conversation_id": ":".join(sorted((username, receiver))),
+        "messages": [Chat.model_validate(msg) for msg in messages],
+        "before_id": messages[-1].id if messages else before_id,
+        "after_id": messages[0].id if messages else after_id,
+        "has_more": has_more,
     }
-
     return StandardResponse(status="success", message="your messages", data=data)
+
+
+@router.post("/ack", response_model=StandardResponse)
+async def acknowledge_messages(
+    receiver: str,
+    ack_id: int,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    """Mark everything ``receiver`` sent up to ``ack_id`` as delivered."""
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=403, detail="not a valid user")
+    peer_id = await peer_id_of(db, receiver)
+    acked = (await db.execute(acknowledge(user_id, peer_id, ack_id))).rowcount
+    await db.execute(mark_read(user_id, [peer_id]))
+    await db.commit()
+    return StandardResponse(
+        status="success",
+        message=f"{acked} messages acknowledged",
+        data={"acked": acked},
+    )
@@ -3,6 +3,7 @@ from app.model_sql import (
     User,
     Comment,
     Share,
+    Follow,
 )
 from app.models import (
     Blogger,
@@ -26,12 +27,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db_session import get_db
 from app.auth.verify_jwt import verify_token
 from app.models import PaginatedMetadata, PaginatedResponse, UserRes
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, or_, update, delete
+from sqlalchemy.exc import IntegrityError
 from app.log.logger import get_loggers
+from app.database.search import search_backend
+from app.routes.comment_stars import comment_previews
+from app.routes.share import shared_blogs
+from app.database.projections import blog_item
+from app.database.scheduler import backfill_timeline, prune_timeline
+from typing import List
+from app.core.pagination import (
+    offset_page,
+    count_total,
+    invalidate_totals,
+    wants_total,
+    COUNT_MODES,
+)
 import redis
 import json, os
 from werkzeug.utils import secure_filename
-from sqlalchemy.orm import selectinload
 import tracemalloc
 
 tracemalloc.start()
@@ -53,18 +67,35 @@ def cached(key: str, value: dict, ttl=6):
     redis_client.set(key, json.dumps(value), ex=ttl)
 
 
+async def previewed_blogs(db: AsyncSession, blogs: List[Blog]) -> List[Blogger]:
+    previews = await comment_previews(db, [blog.id for blog in blogs])
+    return [
+        Blogger.model_validate(blog_item(blog, previews[blog.id])) for blog in blogs
+    ]
+
+
 async def helper_f(
-    db: AsyncSession, model, schema, user_id: int, page: int, limit: int
+    db: AsyncSession,
+    model,
+    schema,
+    user_id: int,
+    page: int,
+    limit: int,
+    count_mode: str | None = None,
+    with_total: bool | None = None,
 ):
-    offset = (page - 1) * limit
-    total_s = select(func.count()).select_from(model).where(model.user_id == user_id)
-    total = (await db.execute(total_s)).scalar() or 0
-    stmt = select(model).where(model.user_id == user_id).offset(offset).limit(limit)
-    result = (await db.execute(stmt)).scalars().all()
-    items = [schema.model_validate(item) for item in result]
-    return PaginatedMetadata[schema](
-        items=items, pagination=PaginatedResponse(page=page, limit=limit, total=total)
+    stmt = select(model).where(model.user_id == user_id)
+    result, pagination = await offset_page(
+        db,
+        stmt,
+        page,
+        limit,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope=model.__tablename__,
     )
+    items = [schema.model_validate(item) for item in result]
+    return PaginatedMetadata[schema](items=items, pagination=pagination)
 
 
 @router.get(
@@ -73,6 +104,8 @@ async def helper_f(
 async def view(
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
@@ -81,7 +114,8 @@ async def view(
     if not user_id:
         logger.warning("User ID missing in token payload")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    cache_key = f"profile:{user_id}:{page}:{limit}"
+    counted = wants_total(with_total, count_mode, True)
+    cache_key = f"profile:{user_id}:{page}:{limit}:{counted}:{count_mode or 'exact'}"
     cache_d = caching(cache_key)
     if cache_d:
         return {"source": "cached", "data": cache_d}
@@ -89,30 +123,47 @@ async def view(
     user = (await db.execute(stmt)).scalar_one_or_none()
     logger.debug("Fetched user records: %s", user)
     users = UserResponse.model_validate(user)
-    counter = await helper_f(db, Comment, Commenter, user_id, page, limit)
-    offset = (page - 1) * limit
-    stmt = select(Blog).options(selectinload(Blog.comments))
-
-    result = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
+    counter = await helper_f(
+        db,
+        Comment,
+        Commenter,
+        user_id,
+        page,
+        limit,
+        count_mode=count_mode,
+        with_total=with_total,
+    )
+    stmt = select(Blog)
+    result, pagination = await offset_page(
+        db,
+        stmt,
+        page,
+        limit,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="blogs",
+    )
     if not result:
         return {"No blogs found"}
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar() or 0
     blogs = PaginatedMetadata[Blogger](
-        items=[Blogger.model_validate(item) for item in result],
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
+        items=await previewed_blogs(db, result),
+        pagination=pagination,
+    )
+    stmt = select(Share)
+    result, pagination = await offset_page(
+        db,
+        stmt,
+        page,
+        limit,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="shares",
     )
-    stmt = select(Share).options(selectinload(Share.blog).selectinload(Blog.comments))
-    result = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
     if not result:
         return {"No shares found"}
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar() or 0
     shar = PaginatedMetadata[Sharer](
-        items=[Sharer.model_validate(item) for item in result],
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
+        items=[Sharer.model_validate(item) for item in await shared_blogs(db, result)],
+        pagination=pagination,
     )
     logger.debug("Returning user response: %s", users)
     response = {
@@ -132,6 +183,7 @@ async def other_users(
     name: str,
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
@@ -145,12 +197,8 @@ async def other_users(
     if cache_d:
         return {"source": "cache", "data": cache_d}
     if name is not None:
-        stmt = select(User).where(
-            or_(User.name.ilike(f"%{name}%"), User.username.ilike(f"%{name}%"))
-        )
-        total = (
-            await db.execute(select(func.count()).select_from(stmt.subquery()))
-        ).scalar() or 0
+        stmt = search_backend(db).users(name)
+        total = await count_total(db, stmt, count_mode, "users")
         search = (await db.execute(stmt.offset(offset).limit(limit))).scalars().all()
         if not search:
             raise HTTPException(status_code=404, detail="user not found")
@@ -162,18 +210,15 @@ async def other_users(
 
         stmt = (
             select(User, Blog)
-            .options(selectinload(Blog.comments))
             .join(Blog, User.id == Blog.user_id)
             .where(User.username == username, User.is_active == True)
         )
-        total = (
-            await db.execute(select(func.count()).select_from(stmt.subquery()))
-        ).scalar() or 0
+        total = await count_total(db, stmt, count_mode, "blogs")
         logger.info("Blogs found for user %s: %s", username, total)
         stmt = stmt.order_by(Blog.time_of_post.desc())
         blog = (await db.execute(stmt.offset(offset).limit(limit))).all()
         blog_data = PaginatedMetadata[Blogger](
-            items=[Blogger.model_validate(item) for _, item in blog],
+            items=await previewed_blogs(db, [item for _, item in blog]),
             pagination=PaginatedResponse(page=page, limit=limit, total=total),
         )
     else:
@@ -183,9 +228,7 @@ async def other_users(
         .join(Comment, User.id == Comment.user_id)
         .where(User.username == username)
     )
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar() or 0
+    total = await count_total(db, stmt, count_mode, "comments")
     logger.info("Comments found for user %s: %s", username, total)
     stmt = stmt.order_by(Comment.time_of_post.desc())
     com = (await db.execute(stmt.offset(offset).limit(limit))).all()
@@ -198,9 +241,7 @@ async def other_users(
         .join(Share, User.id == Share.user_id)
         .where(User.id == username)
     )
-    total = (
-        await db.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar() or 0
+    total = await count_total(db, stmt, count_mode, "shares")
     logger.info("Shares found for user %s: %s", username, total)
     share_d = (await db.execute(stmt.offset(offset).limit(limit))).all()
     share_data = PaginatedMetadata[Sharer](
@@ -257,4 +298,79 @@ async def profile(
         user.phone_number = phone_number
     await db.commit()
     await db.refresh(user)
+    await invalidate_totals("users")
     return {"message": "profile updated successfully"}
+
+
+@router.post("/follow")
+async def follow(
+    username: str,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=403, detail="Forbidden access")
+    target = (
+        await db.execute(select(User).where(User.username == username))
+    ).scalar_one_or_none()
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
+    if target.id == user_id:
+        raise HTTPException(status_code=400, detail="you can not follow yourself")
+    db.add(Follow(follower_id=user_id, followee_id=target.id))
+    await db.execute(
+        update(User)
+        .where(User.id == target.id)
+        .values(followers_count=func.coalesce(User.followers_count, 0) + 1)
+    )
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(following_count=func.coalesce(User.following_count, 0) + 1)
+    )
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return {"message": f"you already follow {username}"}
+    backfill_timeline.delay(user_id, target.id)
+    logger.info("User %s followed %s", user_id, target.id)
+    return {"message": f"you now follow {username}"}
+
+
+@router.delete("/unfollow")
+async def unfollow(
+    username: str,
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=403, detail="Forbidden access")
+    target = (
+        await db.execute(select(User).where(User.username == username))
+    ).scalar_one_or_none()
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
+    removed = await db.execute(
+        delete(Follow).where(
+            Follow.follower_id == user_id, Follow.followee_id == target.id
+        )
+    )
+    if not removed.rowcount:
+        return {"message": f"you do not follow {username}"}
+    await db.execute(
+        update(User)
+        .where(User.id == target.id)
+        .values(followers_count=func.greatest(User.followers_count - 1, 0))
+    )
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(following_count=func.greatest(User.following_count - 1, 0))
+    )
+    await db.commit()
+    prune_timeline.delay(user_id, target.id)
+    logger.info("User %s unfollowed %s", user_id, target.id)
+    return {"message": f"you unfollowed {username}"}
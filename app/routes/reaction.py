@@ -2,11 +2,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.model_sql import React, Blog, Comment, ReactionType
 from app.log.logger import get_loggers
 from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
 from datetime import timezone, datetime
 from app.core.db_session import get_db
 from app.auth.verify_jwt import verify_token
 from sqlalchemy import select
-from app.models import StandardResponse
+from app.models import StandardResponse, ReactionOperation
+from app.database.reactions import reaction_deltas, reaction_counts, upsert_reaction
+from app.database.counters import bump, bump_many, merge_pending
+from app.database.reaction_batch import apply_reactions, MAX_REACTION_BATCH
+from app.core.blog_cache import invalidate_blog, remember_reactions
+from app.database.top_comments import track_comment
+from app.core.responses import fast_response
+from app.database.reaction_log import append_event, event_ingest
 
 router = APIRouter(prefix="/react", tags=["Reactions"])
 logger = get_loggers("react")
@@ -15,11 +23,15 @@ logger = get_loggers("react")
 @router.post("/react")
 async def react_type(
     reaction_type: str,
-    blog: str | None = None,
-    comment: str | None = None,
+    blog: int | None = None,
+    comment: int | None = None,
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
+    """Add or switch a reaction; repeating a reaction is a no-op. Counters
+    are bumped by what the write actually replaced, so concurrent taps are
+    counted once. Returns the target's reaction summary after the change.
+    """
     user_id = payload.get("user_id")
     if not user_id:
         logger.warning("Unauthorized reaction attempt")
@@ -33,72 +45,172 @@ async def react_type(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="must input one reaction"
         )
-    if blog:
-        target = await db.get(Blog, blog)
-        if not target:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="must react on existing blog(s)",
-            )
-    if comment:
-        target = await db.get(Comment, comment)
-        if not target:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="must react on existing comment(s)",
+    if event_ingest():
+        await db.execute(
+            append_event(
+                user_id, reaction_enum, datetime.now(timezone.utc), blog, comment
             )
-    stmt = select(React).where(React.user_id == user_id)
-    if blog:
-        stmt = stmt.where(React.blog_id == blog)
-    if comment:
-        stmt = stmt.where(React.comment_id == comment)
-    existing = (await db.execute(stmt)).scalar_one_or_none()
-    if existing:
-        existing.type = reaction_enum
-        existing.time_of_reaction = datetime.now(timezone.utc)
+        )
         await db.commit()
-        await db.refresh(existing)
-        logger.info(f"User {user_id} updated reaction {existing.id}")
-        return {"message": "Reaction updated", "reaction": existing.type}
-
-    new_react = React(
-        user_id=user_id,
-        type=reaction_enum,
-        blog_id=blog,
-        comment_id=comment,
-        time_of_reaction=datetime.now(timezone.utc),
+        if blog:
+            await remember_reactions(user_id, {blog: reaction_enum.value})
+        logger.info(f"User {user_id} queued a reaction")
+        return {"message": "Reaction accepted", "type": reaction_enum}
+    model = Blog if blog else Comment
+    written = await upsert_reaction(
+        db, model, blog or comment, user_id, reaction_enum, datetime.now(timezone.utc)
     )
+    await db.commit()
+    if written is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"must react on existing {model.__tablename__}",
+        )
+    target, previous = written
     if blog:
-        target.reacts_count = (target.reacts_count or 0) + 1
-    if comment:
-        target.reacts_count = (target.reacts_count or 0) + 1
-    db.add(new_react)
+        await remember_reactions(user_id, {blog: reaction_enum.value})
+    if previous != reaction_enum:
+        deltas = reaction_deltas(added=reaction_enum, removed=previous)
+        await bump(db, model, target.id, deltas)
+        if comment:
+            await track_comment(target, deltas["reacts_count"])
+        await invalidate_blog(target.blog_id)
+    summary = {
+        "id": target.id,
+        "reacts_count": target.reacts_count or 0,
+        "reactions": reaction_counts(target),
+    }
+    await merge_pending(model, [summary], "reactions")
+    if previous is None:
+        logger.info(f"User {user_id} added new reaction {target.reaction_id}")
+        message = "Reaction added"
+    elif previous == reaction_enum:
+        message = "Reaction unchanged"
+    else:
+        logger.info(f"User {user_id} updated reaction {target.reaction_id}")
+        message = "Reaction updated"
+    return {
+        "message": message,
+        "reaction": target.reaction_id,
+        "type": reaction_enum,
+        "summary": summary,
+    }
+
+
+@router.post("/batch", response_model=StandardResponse)
+async def react_batch(
+    operations: List[ReactionOperation],
+    db: AsyncSession = Depends(get_db),
+    payload: dict = Depends(verify_token),
+):
+    """Replay a queue of reaction operations (add, change or remove on blogs
+    and comments) in one transaction, with counters bumped once per target.
+    Every operation gets its own result.
+    """
+    user_id = payload.get("user_id")
+    if not user_id:
+        logger.warning("Unauthorized reaction attempt")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    if len(operations) > MAX_REACTION_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"at most {MAX_REACTION_BATCH} reactions per batch",
+        )
+    results, deltas, comments = await apply_reactions(
+        db, user_id, operations, datetime.now(timezone.utc)
+    )
     await db.commit()
-    await db.refresh(new_react)
-    logger.info(f"User {user_id} added new reaction {new_react.id}")
-    return {"message": "Reaction added", "reaction": new_react.id}
+    await remember_reactions(
+        user_id,
+        {
+            operation.blog: None if operation.op == "remove" else operation.type
+            for operation, result in zip(operations, results)
+            if operation.blog is not None
+            and result["status"]
+            in ("added", "updated", "unchanged", "removed", "absent")
+        },
+    )
+    await bump_many(db, Blog, deltas["blogs"])
+    await bump_many(db, Comment, deltas["comments"])
+    for comment in comments.values():
+        await track_comment(comment, deltas["comments"][comment.id]["reacts_count"])
+    touched = set(deltas["blogs"]) | {comment.blog_id for comment in comments.values()}
+    if touched:
+        await invalidate_blog(*touched)
+    failed = sum(result["status"] in ("invalid", "not_found") for result in results)
+    logger.info(
+        f"User {user_id} replayed {len(operations)} reactions, {failed} rejected"
+    )
+    return fast_response(
+        "success" if not failed else "partial",
+        f"{len(operations) - failed} of {len(operations)} reactions applied",
+        {"results": results},
+    )
 
 
 @router.delete("/erase", response_model=StandardResponse)
 async def delete_one(
-    react_id: int,
+    react_id: int | None = None,
+    blog: int | None = None,
+    comment: int | None = None,
     db: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
+    """Remove a reaction by its id, or by the blog or comment it is on. In
+    event ingest mode the removal is queued behind the user's earlier
+    events, so a reaction that has not been rolled up yet is removed too.
+    """
     user_id = payload.get("user_id")
     username = payload.get("sub")
     if not user_id:
         logger.warning("Unauthorized delete attempt detected (no user_id in payload)")
         raise HTTPException(status_code=403, detail="Unauthorized access.")
-    stmt = select(React).where(React.user_id == user_id, React.id == react_id)
+    if react_id is None and (blog is None) == (comment is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="must input one reaction"
+        )
+    stmt = select(React).where(React.user_id == user_id)
+    if react_id is not None:
+        stmt = stmt.where(React.id == react_id)
+    elif blog is not None:
+        stmt = stmt.where(React.blog_id == blog)
+    else:
+        stmt = stmt.where(React.comment_id == comment)
+    if event_ingest():
+        if react_id is not None:
+            target = (
+                await db.execute(
+                    stmt.with_only_columns(React.blog_id, React.comment_id)
+                )
+            ).one_or_none()
+            if target is None:
+                return {"status": "no data", "message": "invalid field"}
+            blog, comment = target
+        await db.execute(
+            append_event(user_id, None, datetime.now(timezone.utc), blog, comment)
+        )
+        await db.commit()
+        if blog:
+            await remember_reactions(user_id, {blog: None})
+        logger.info(f"User {user_id} queued a reaction removal")
+        return {"status": "success", "message": "react removal accepted"}
     data = (await db.execute(stmt)).scalar_one_or_none()
     if not data:
         return {"status": "no data", "message": "invalid field"}
-    react = await db.get(Blog, data.blog_id)
+    if data.blog_id:
+        react = await db.get(Blog, data.blog_id)
+    else:
+        react = await db.get(Comment, data.comment_id)
     if not react:
         return "invalid"
-    react.reacts_count = max((react.reacts_count or 1) - 1, 0)
+    blog_id = data.blog_id or react.blog_id
     await db.delete(data)
     await db.commit()
+    if data.blog_id:
+        await remember_reactions(user_id, {data.blog_id: None})
+    await bump(db, type(react), react.id, reaction_deltas(removed=data.type))
+    if data.comment_id:
+        await track_comment(react, -1)
+    await invalidate_blog(blog_id)
     logger.info("delete_one endpoint completed successfully")
     return {"status": "success", "message": "react successfully deleted"}
@@ -6,13 +6,35 @@ from datetime import timezone, datetime
 from app.core.db_session import get_db
 from app.auth.verify_jwt import verify_token
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from app.models import PaginatedResponse, Sharer, StandardResponse, PaginatedMetadata
+from app.models import Sharer, StandardResponse, PaginatedMetadata
+from app.core.pagination import offset_page, invalidate_totals, COUNT_MODES
+from app.database.counters import bump, merge_pending
+from app.core.blog_cache import invalidate_blog
+from app.routes.comment_stars import comment_previews
+from app.database.projections import BLOG_COLUMNS, SHARE_COLUMNS, blog_item, share_item
+from app.core.responses import fast_response, page_data
+from typing import List
 
 router = APIRouter(prefix="/sharing", tags=["Share"])
 logger = get_loggers("share")
 
 
+async def shared_blogs(db: AsyncSession, shares: list) -> List[dict]:
+    """``Sharer``-shaped dicts for ``shares``, which may be ``Share`` objects
+    or ``SHARE_COLUMNS`` rows; the shared blogs are loaded in one query.
+    """
+    blog_ids = list({share.blog_id for share in shares})
+    blogs = {}
+    if blog_ids:
+        rows = (
+            await db.execute(select(*BLOG_COLUMNS).where(Blog.id.in_(blog_ids)))
+        ).all()
+        previews = await comment_previews(db, [row.id for row in rows])
+        blogs = {row.id: blog_item(row, previews[row.id]) for row in rows}
+        await merge_pending(Blog, list(blogs.values()), "reaction")
+    return [share_item(share, blogs.get(share.blog_id)) for share in shares]
+
+
 @router.post("/share")
 async def sharing(
     blog_id: int,
@@ -46,10 +68,12 @@ async def sharing(
         blog_id=blog_id,
         time_of_share=datetime.now(timezone.utc),
     )
-    blog.share_count = (blog.share_count or 0) + 1
     db.add(new_share)
     await db.commit()
     await db.refresh(new_share)
+    await bump(db, Blog, blog_id, {"share_count": 1})
+    await invalidate_totals("shares")
+    await invalidate_blog(blog_id)
     logger.info("New share created. share_id: %s, user_id: %s", new_share.id, user_id)
     return "blog shared"
 
@@ -62,26 +86,29 @@ async def sharing(
 async def views(
     page: int = Query(1, ge=1),
     limit: int = Query(10, le=100),
+    with_total: bool | None = None,
+    count_mode: str | None = Query(None, enum=COUNT_MODES),
     session: AsyncSession = Depends(get_db),
     payload: dict = Depends(verify_token),
 ):
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    offset = (page - 1) * limit
-    stmt = select(Share).options(selectinload(Share.blog).selectinload(Blog.comments))
-
-    result = (await session.execute(stmt.offset(offset).limit(limit))).scalars().all()
+    stmt = select(*SHARE_COLUMNS)
+    result, pagination = await offset_page(
+        session,
+        stmt,
+        page,
+        limit,
+        with_total=with_total,
+        count_mode=count_mode,
+        scope="shares",
+        scalars=False,
+    )
     if not result:
         return StandardResponse(status="success", message="No shares found")
-    total = (
-        await session.execute(select(func.count()).select_from(stmt.subquery()))
-    ).scalar() or 0
-    data = PaginatedMetadata[Sharer](
-        items=[Sharer.model_validate(item) for item in result],
-        pagination=PaginatedResponse(page=page, limit=limit, total=total),
-    )
-    return StandardResponse(status="success", message="your shared blogs", data=data)
+    data = page_data(await shared_blogs(session, result), pagination)
+    return fast_response("success", "your shared blogs", data)
 
 
 @router.get("/view_a_particular_share", response_model=StandardResponse)
@@ -93,16 +120,12 @@ async def view(
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    stmt = (
-        select(Share)
-        .where(Share.id == share_id)
-        .options(selectinload(Share.blog).selectinload(Blog.comments))
-    )
-    result = (await session.execute(stmt)).scalar_one_or_none()
+    stmt = select(*SHARE_COLUMNS).where(Share.id == share_id)
+    result = (await session.execute(stmt)).one_or_none()
     if not result:
         return StandardResponse(status="error", message="invalid share_id")
-    data = Sharer.model_validate(result)
-    return StandardResponse(status="success", message="your shared blogs", data=data)
+    (data,) = await shared_blogs(session, [result])
+    return fast_response("success", "your shared blogs", data)
 
 
 @router.delete("/erase", response_model=StandardResponse)
@@ -120,10 +143,12 @@ async def delete_one(
     data = (await db.execute(stmt)).scalar_one_or_none()
     if not data:
         return {"status": "no data", "message": "invalid field"}
-    sharer = await db.get(Blog, data.blog_id)
-    sharer.share_count = max((sharer.share_count or 1) - 1, 0)
+    blog_id = data.blog_id
     await db.delete(data)
     await db.commit()
+    await bump(db, Blog, blog_id, {"share_count": -1})
+    await invalidate_totals("shares")
+    await invalidate_blog(blog_id)
     logger.info("delete_one endpoint completed successfully")
     return {
         "status": "success",
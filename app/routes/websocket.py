@@ -8,42 +8,123 @@ from fastapi import (
 )
 from app.core.db_session import get_db
 from sqlalchemy import select
-from typing import Dict
-from app.model_sql import Messaging, User
+from app.model_sql import User
 from app.log.logger import get_loggers
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone, timedelta
-from app.database.scheduler import send_email_name
+from app.database.scheduler import send_email
 from jose import jwt, JWTError
 from app.core.config import settings
+from app.core.pagination import invalidate_totals
+from app.database.conversations import (
+    acknowledge,
+    mark_read,
+    backlog,
+)
+from app.core.backplane import backplane
+from app.database.message_writer import message_writer, message_row, store_image
+import asyncio
+import contextlib
+import re
 
 
 router = APIRouter(prefix="/Chatbox", tags=["instantmessaging"])
 logger = get_loggers("ichat")
 
-active_connections: Dict[int, WebSocket] = {}
+
+REPLAY_CHUNK = 100
+REPLAY_ACK_TIMEOUT = 15
+ACK_FRAME = re.compile(r"ack:(\d+)")
+
+
+def ack_id(message: dict) -> int | None:
+    """The id of an ``ack:<id>`` frame. Only a connection that asked for
+    acks and is still replaying treats it as one; otherwise it is chat.
+    """
+    match = ACK_FRAME.fullmatch(message.get("text") or "")
+    return int(match[1]) if match else None
+
+
+async def wait_for_ack(acks: asyncio.Queue, last_id: int):
+    """Wait for the client's ``ack:<last id>``, routed here by the chat loop."""
+    while await acks.get() != last_id:
+        pass
+
+
+async def replay_pending(
+    user_id: int, web: WebSocket, db: AsyncSession, acks: asyncio.Queue | None
+):
+    """Send the user's undelivered messages in chunks of ``REPLAY_CHUNK``.
+
+    Runs as its own task beside the chat loop, so live chat is never held
+    up by a replay. Each chunk is read with a keyset seek past the last
+    replayed id, and marked delivered with one ``UPDATE`` and committed
+    before the next one is read, so memory and transaction length do not
+    grow with the backlog.
+
+    A client that connected with ``acks`` gets ``replay:<last id>`` after
+    each chunk, and the chunk counts as delivered only once it answers
+    ``ack:<last id>``; without an ack in ``REPLAY_ACK_TIMEOUT`` seconds the
+    replay stops and the rest waits for the next connect. For any other
+    client a chunk counts as delivered once it was sent, as live messages
+    do.
+    """
+    last_id = 0
+    try:
+        while True:
+            chunk = (await db.execute(backlog(user_id, last_id, REPLAY_CHUNK))).all()
+            if not chunk:
+                break
+            for msg in chunk:
+                if msg.message:
+                    await web.send_text(f"{msg.user_id}: {msg.message}")
+                if msg.pics:
+                    await web.send_text(f"{msg.user_id}: {msg.pics}")
+            last_id = chunk[-1].id
+            if acks is not None:
+                await web.send_text(f"replay:{last_id}")
+                try:
+                    await asyncio.wait_for(
+                        wait_for_ack(acks, last_id), REPLAY_ACK_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    logger.info(f"Replay for {user_id} stopped at {last_id}, no ack")
+                    break
+            await db.execute(acknowledge(user_id, None, last_id))
+            await db.execute(mark_read(user_id, {msg.user_id for msg in chunk}))
+            await db.commit()
+            await invalidate_totals(f"conversations:{user_id}")
+            if len(chunk) < REPLAY_CHUNK:
+                break
+    except Exception as e:
+        logger.warning(f"Replay for {user_id} stopped at {last_id}: {e}")
 
 
-async def connect(user_id: int, web: WebSocket, db: AsyncSession):
+async def connect(
+    user_id: int, web: WebSocket, db: AsyncSession, acks: asyncio.Queue | None
+) -> asyncio.Task:
     await web.accept()
-    active_connections[user_id] = web
-    stmt = select(Messaging).where(
-        Messaging.receiver_id == user_id, Messaging.delivered.is_(False)
-    )
-    pending = (await db.execute(stmt)).scalars().all()
-    for msg in pending:
-        if msg.message:
-            await web.send_text(f"{msg.user_id}: {msg.message}")
-        if msg.pics:
-            await web.send_bytes(msg.pics)
-        msg.delivered = True
-        db.add(msg)
-        await db.commit()
-
-
-async def disconnect(user_id: int):
-    if user_id in active_connections:
-        del active_connections[user_id]
+    await backplane.register(user_id, web)
+    return asyncio.create_task(replay_pending(user_id, web, db, acks))
+
+
+async def confirm_saved(web: WebSocket, sequence: int, saved: asyncio.Future):
+    """Tell the sender ``saved:<n>:<id>`` once their ``n``-th frame of the
+    connection is stored, or ``failed:<n>`` if its batch could not be.
+    """
+    try:
+        reply = f"saved:{sequence}:{await saved}"
+    except Exception as e:
+        logger.error(f"Message {sequence} was not stored: {e}")
+        reply = f"failed:{sequence}"
+    try:
+        await web.send_text(reply)
+    except Exception:
+        pass
+
+
+async def disconnect(user_id: int, web: WebSocket):
+    await backplane.unregister(user_id, web)
 
 
 @router.websocket("/chat/{username}")
@@ -52,6 +133,7 @@ async def chatterbox(
     username: str,
     talk_id: int = Query(...),
     token: str = Query(...),
+    acks: bool = Query(False),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -74,70 +156,62 @@ async def chatterbox(
     tap = (await db.execute(stmt)).scalar_one_or_none()
     if not tap:
         raise HTTPException(status_code=404, detail="user not found")
-    await connect(user_id, web, db)
-    logger.info(f"{username} ({user_id}) connected to chat with {talk_id}")
+    replay = None
     try:
+        replay_acks = asyncio.Queue() if acks else None
+        replay = await connect(user_id, web, db, replay_acks)
+        sequence = 0
+        confirmations = set()
+        logger.info(f"{username} ({user_id}) connected to chat with {talk_id}")
         while True:
             message = await web.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if replay_acks is not None and not replay.done():
+                acked = ack_id(message)
+                if acked is not None:
+                    replay_acks.put_nowait(acked)
+                    continue
             if "text" in message:
                 data = message["text"]
-                delivered = False
                 logger.debug(f"Processing text message from {username} to {talk_id}")
-                if talk_id in active_connections:
-                    try:
-                        await active_connections[talk_id].send_text(
-                            f"{username}:{data}"
-                        )
-                        delivered = True
-                        logger.info(
-                            f"Delivered message from {username} -> {talk_id}: {data}"
-                        )
-                    except Exception:
-                        pass
-                messages = Messaging(
-                    user_id=user_id,
-                    receiver_id=talk_id,
-                    username=username_from_token,
+                delivered = await backplane.send_text(talk_id, f"{username}:{data}")
+                if delivered:
+                    logger.info(
+                        f"Delivered message from {username} -> {talk_id}: {data}"
+                    )
+                row = message_row(
+                    user_id,
+                    talk_id,
+                    username_from_token,
+                    datetime.now(timezone.utc),
+                    delivered,
                     message=data,
-                    time_of_chat=datetime.now(timezone.utc),
-                    delivered=delivered,
-                )
-                db.add(messages)
-                await db.commit()
-                await db.refresh(messages)
-                logger.debug(
-                    f"Stored message in DB (ID: {messages.id}) from {username} -> {talk_id}"
                 )
-
-            if "bytes" in message:
+            elif "bytes" in message:
                 mata = message["bytes"]
-                delivered = False
                 logger.debug(f"Processing binary data from {username} to {talk_id}")
-                if talk_id in active_connections:
-                    try:
-                        await active_connections[talk_id].send_bytes(mata)
-                        delivered = True
-                        logger.info(f"Delivered image from {username} -> {talk_id}")
-                    except Exception:
-                        pass
-                pictures = Messaging(
-                    user_id=user_id,
-                    receiver_id=talk_id,
-                    username=username_from_token,
-                    pics=mata,
-                    time_of_chat=datetime.now(timezone.utc),
-                    delivered=delivered,
-                )
-                db.add(pictures)
-                await db.commit()
-                await db.refresh(pictures)
-                logger.debug(
-                    f"Stored image in DB (ID: {pictures.id}) from {username} -> {talk_id}"
+                delivered = await backplane.send_bytes(talk_id, mata)
+                if delivered:
+                    logger.info(f"Delivered image from {username} -> {talk_id}")
+                row = message_row(
+                    user_id,
+                    talk_id,
+                    username_from_token,
+                    datetime.now(timezone.utc),
+                    delivered,
+                    pics=await store_image(mata),
                 )
+            else:
+                continue
+            sequence += 1
+            saved = await message_writer.submit(row)
+            task = asyncio.create_task(confirm_saved(web, sequence, saved))
+            confirmations.add(task)
+            task.add_done_callback(confirmations.discard)
     except WebSocketDisconnect:
-        await disconnect(user_id)
         logger.info(f"{username} disconnected")
-        send_email_name.apply_async(
+        send_email.apply_async(
             kwargs={
                 "subject": "missed chat",
                 "body": f"you have unread chat from {username}",
@@ -146,6 +220,11 @@ async def chatterbox(
             countdown=600,
         )
     finally:
+        if replay is not None:
+            replay.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await replay
+        await disconnect(user_id, web)
         await web.close()
         await db.close()
         logger.info(f"WebSocket and DB closed for {username} ({user_id})")
@@ -0,0 +1,131 @@
+"""Compare the cost of building one 100-item ``/Blogs/view_blogs`` page.
+
+``before`` loads ``Blog`` entities, validates each into ``Blogger`` inside a
+``StandardResponse`` and then goes through ``response_model`` validation and
+serialization the way FastAPI does it. ``after`` loads ``BLOG_COLUMNS`` rows,
+builds plain dicts and renders them with ``ORJSONResponse``.
+
+Both sides read from the same in-memory SQLite database and attach three
+comment previews per blog. Run from the repository root with the app's
+environment variables set:
+
+    python -m benchmarks.list_serialization
+"""
+
+from datetime import datetime, timedelta, timezone
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app.core.declarative import Base
+from app.core.responses import page_data
+from app.database.projections import (
+    BLOG_COLUMNS,
+    COMMENT_COLUMNS,
+    blog_item,
+    comment_item,
+)
+from app.database.reactions import reaction_summary
+from app.model_sql import Blog, Comment
+from app.models import (
+    Blogger,
+    Commenter,
+    PaginatedMetadata,
+    PaginatedResponse,
+    StandardResponse,
+)
+import orjson
+import timeit
+
+PAGE_SIZE = 100
+PREVIEW_SIZE = 3
+ROUNDS = 200
+
+PageModel = StandardResponse[PaginatedMetadata[Blogger]]
+page_adapter = TypeAdapter(PageModel)
+pagination = PaginatedResponse(page=1, limit=PAGE_SIZE, total=PAGE_SIZE)
+
+
+def seed(db: Session):
+    now = datetime.now(timezone.utc)
+    for blog_id in range(1, PAGE_SIZE + 1):
+        db.add(
+            Blog(
+                id=blog_id,
+                title=f"title {blog_id}",
+                content="lorem ipsum " * 40,
+                comments_count=PREVIEW_SIZE,
+                reacts_count=blog_id,
+                share_count=blog_id % 7,
+                like_count=blog_id,
+                time_of_post=now - timedelta(minutes=blog_id),
+            )
+        )
+        for position in range(PREVIEW_SIZE):
+            db.add(
+                Comment(
+                    blog_id=blog_id,
+                    content="nice post " * 5,
+                    reacts_count=position,
+                    time_of_post=now - timedelta(seconds=position),
+                )
+            )
+    db.commit()
+
+
+def before(db: Session) -> bytes:
+    db.expunge_all()
+    blogs = db.execute(select(Blog).limit(PAGE_SIZE)).scalars().all()
+    comments = db.execute(select(Comment)).scalars().all()
+    previews = {}
+    for comment in comments:
+        comment_data = Commenter.model_validate(comment)
+        comment_data.reactions = reaction_summary(comment)
+        previews.setdefault(comment.blog_id, []).append(comment_data)
+    items = []
+    for blog in blogs:
+        blog_data = Blogger.model_validate(blog)
+        blog_data.reaction = reaction_summary(blog)
+        blog_data.comments_preview = previews.get(blog.id, [])
+        items.append(blog_data)
+    response = StandardResponse(
+        status="success",
+        message="below lies all your expressions",
+        data=PaginatedMetadata[Blogger](items=items, pagination=pagination),
+    )
+    validated = page_adapter.validate_python(response.model_dump())
+    content = page_adapter.dump_python(validated, mode="json", exclude_none=True)
+    return JSONResponse(content).body
+
+
+def after(db: Session) -> bytes:
+    rows = db.execute(select(*BLOG_COLUMNS).limit(PAGE_SIZE)).all()
+    previews = {}
+    for comment in db.execute(select(*COMMENT_COLUMNS)).all():
+        previews.setdefault(comment.blog_id, []).append(comment_item(comment))
+    items = [blog_item(row, (previews.get(row.id, []), None)) for row in rows]
+    body = {
+        "status": "success",
+        "message": "below lies all your expressions",
+        "data": page_data(items, pagination),
+    }
+    return ORJSONResponse(body).body
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        seed(db)
+        assert len(orjson.loads(before(db))["data"]["items"]) == PAGE_SIZE
+        assert len(orjson.loads(after(db))["data"]["items"]) == PAGE_SIZE
+        results = {}
+        for name, build in (("before", before), ("after", after)):
+            best = min(timeit.repeat(lambda: build(db), number=ROUNDS, repeat=5))
+            results[name] = best / ROUNDS * 1000
+            print(f"{name:>6}: {results[name]:.3f} ms per {PAGE_SIZE}-item page")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+
+for key, value in {
+    "DATABASE_URL": "sqlite+aiosqlite:///:memory:",
+    "SYNC_DATABASE_URL": "sqlite://",
+    "REDIS_URL": "redis://localhost:6379/0",
+    "SENDGRID_API_KEY": "test",
+    "SENDGRID_SENDER": "test@example.com",
+    "SECRET_KEY": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+}.items():
+    os.environ.setdefault(key, value)
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import app.core.redis_config as redis_config
+
+# Swapped in before any other app module binds ``redis_client``.
+redis_server = fakeredis.FakeServer()
+redis_config.redis_client = fakeredis.FakeAsyncRedis(server=redis_server)
+redis_config.sync_redis = fakeredis.FakeRedis(server=redis_server)
+
+from app.core.blog_cache import local_cache
+from app.core.declarative import Base
+import app.model_sql  # noqa: F401
+
+
+@pytest.fixture(autouse=True)
+def redis():
+    redis_config.sync_redis.flushall()
+    local_cache.entries.clear()
+    yield redis_config.redis_client
+
+
+def sqlite_functions(dbapi_connection, _):
+    """The PostgreSQL functions the counter queries use."""
+    dbapi_connection.create_function("greatest", -1, max)
+    dbapi_connection.create_function("least", -1, min)
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    event.listen(engine.sync_engine, "connect", sqlite_functions)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    )
+
+
+@pytest.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def sync_sessions(tmp_path):
+    """A ``SessionLocal`` for Celery tasks, on its own SQLite file."""
+    sync_engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    event.listen(sync_engine, "connect", sqlite_functions)
+    Base.metadata.create_all(sync_engine)
+    yield sessionmaker(bind=sync_engine, expire_on_commit=False, autoflush=False)
+    sync_engine.dispose()
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app.core.backplane import LocalBackplane, RedisBackplane, user_channel
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.sent = []
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def send_bytes(self, data: bytes):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+
+@pytest.fixture
+async def nodes(redis):
+    nodes = [RedisBackplane(redis), RedisBackplane(redis)]
+    yield nodes
+    for node in nodes:
+        if node.listener is not None:
+            node.listener.cancel()
+        for task in list(node.senders):
+            task.cancel()
+        if node.pubsub is not None:
+            await node.pubsub.aclose()
+
+
+async def until(condition, timeout: float = 3):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_local_delivery_only_reaches_registered_users():
+    backplane = LocalBackplane()
+    web = FakeSocket()
+    await backplane.register(1, web)
+    assert await backplane.send_text(1, "hi")
+    assert not await backplane.send_text(2, "hi")
+    await backplane.unregister(1, FakeSocket())
+    assert backplane.is_local(1)
+    await backplane.unregister(1, web)
+    assert not backplane.is_local(1)
+    assert web.sent == ["hi"]
+
+
+async def test_remote_delivery_is_confirmed(nodes):
+    sender, holder = nodes
+    web = FakeSocket()
+    await holder.register(2, web)
+    await until(lambda: holder.pubsub.subscribed)
+    assert await sender.send_text(2, "hello")
+    assert await sender.send_bytes(2, b"\x89PNG")
+    assert web.sent == ["hello", b"\x89PNG"]
+    assert not await sender.send_text(3, "nobody")
+
+
+async def test_listener_survives_malformed_frames(nodes, redis):
+    sender, holder = nodes
+    web = FakeSocket()
+    await holder.register(2, web)
+    await until(lambda: holder.pubsub.subscribed)
+    await redis.publish(user_channel(2), b"garbage without a header")
+    assert await sender.send_text(2, "still here")
+    assert not holder.listener.done()
+    assert web.sent == ["still here"]
+
+
+async def test_slow_socket_does_not_hold_up_other_users(nodes):
+    sender, holder = nodes
+    slow, fast = FakeSocket(delay=1.5), FakeSocket()
+    await holder.register(2, slow)
+    await holder.register(3, fast)
+    await until(lambda: holder.pubsub.subscribed)
+    slow_send = asyncio.create_task(sender.send_text(2, "slow"))
+    await until(lambda: holder.outbox.get(2) is not None or slow.sent)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await sender.send_text(3, "fast")
+    assert loop.time() - started < 1
+    assert await slow_send
+    assert fast.sent == ["fast"] and slow.sent == ["slow"]
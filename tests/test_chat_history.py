@@ -0,0 +1,50 @@
+from sqlalchemy import select
+from app.database.conversations import acknowledge, chat_history, mark_read
+from app.model_sql import Conversation, Messaging, User
+
+
+async def seed(db):
+    db.add_all(
+        User(id=i, username=name, email=f"{name}@x", password="x")
+        for i, name in [(1, "ann"), (2, "bob"), (3, "cy")]
+    )
+    pairs = [(1, 2), (2, 1), (1, 3), (2, 1), (1, 2), (2, 1), (3, 1)]
+    db.add_all(
+        Messaging(id=i, user_id=sender, receiver_id=receiver, message=f"m{i}")
+        for i, (sender, receiver) in enumerate(pairs, start=1)
+    )
+    db.add_all(
+        [
+            Conversation(user_id=1, peer_id=2, unread_count=3),
+            Conversation(user_id=1, peer_id=3, unread_count=1),
+        ]
+    )
+    await db.commit()
+
+
+async def ids(db, stmt) -> list:
+    return [message.id for message in (await db.scalars(stmt)).all()]
+
+
+async def test_history_seeks_both_directions_of_a_pair(db):
+    await seed(db)
+    assert await ids(db, chat_history(1, 2, 2)) == [6, 5, 4]
+    assert await ids(db, chat_history(2, 1, 2, before_id=4)) == [2, 1]
+    assert await ids(db, chat_history(1, 2, 2, after_id=2)) == [4, 5, 6]
+    assert await ids(db, chat_history(1, 3, 5)) == [7, 3]
+
+
+async def test_acknowledge_marks_delivered_up_to_the_ack(db):
+    await seed(db)
+    await db.execute(acknowledge(1, 2, 4))
+    await db.execute(mark_read(1, [2, 3]))
+    await db.commit()
+    delivered = (
+        select(Messaging.id).where(Messaging.delivered.is_(True)).order_by(Messaging.id)
+    )
+    assert (await db.scalars(delivered)).all() == [2, 4]
+    unread = select(Conversation.peer_id, Conversation.unread_count)
+    assert sorted((await db.execute(unread)).all()) == [(2, 1), (3, 1)]
+    await db.execute(acknowledge(1, None, 7))
+    await db.commit()
+    assert (await db.scalars(delivered)).all() == [2, 4, 6, 7]
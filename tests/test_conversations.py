@@ -0,0 +1,34 @@
+import logging
+from sqlalchemy import select
+from app.database import scheduler
+from app.model_sql import Conversation, Messaging, User
+
+
+def test_backfill_resolves_only_unique_usernames(sync_sessions, monkeypatch, caplog):
+    monkeypatch.setattr(scheduler, "SessionLocal", sync_sessions)
+    with sync_sessions() as db:
+        db.add_all(
+            [
+                User(id=1, username="ann", name="a", email="a@x", password="x"),
+                User(id=2, username="bob", name="b", email="b@x", password="x"),
+                User(id=3, username="twin", name="t", email="t@x", password="x"),
+                User(id=4, username="twin", name="t", email="u@x", password="x"),
+            ]
+        )
+        db.add_all(
+            Messaging(id=i, user_id=1, receiver=name, username="ann", message="hi")
+            for i, name in enumerate(["bob", "twin", "ghost", "bob"], start=1)
+        )
+        db.commit()
+    with caplog.at_level(logging.WARNING, logger="celery"):
+        scheduler.backfill_inbox()
+    with sync_sessions() as db:
+        receivers = db.execute(
+            select(Messaging.id, Messaging.receiver_id).order_by(Messaging.id)
+        ).all()
+        conversations = db.execute(
+            select(Conversation.user_id, Conversation.peer_id)
+        ).all()
+    assert receivers == [(1, 2), (2, None), (3, None), (4, 2)]
+    assert sorted(conversations) == [(1, 2), (2, 1)]
+    assert "'twin' (1)" in caplog.text and "'ghost' (1)" in caplog.text
@@ -0,0 +1,60 @@
+from sqlalchemy import select
+import pytest
+from app.core.redis_config import sync_redis
+from app.database import scheduler
+from app.database.counters import COUNTER_DIRTY, COUNTER_LOCK, bump_many, buffer_key
+from app.model_sql import Comment, React, ReactionType
+
+
+@pytest.fixture
+def tasks(sync_sessions, monkeypatch):
+    monkeypatch.setattr(scheduler, "SessionLocal", sync_sessions)
+    with sync_sessions() as session:
+        session.add(Comment(id=1, blog_id=1, user_id=1, content="c"))
+        session.add(Comment(id=2, blog_id=1, user_id=1, content="r", parent_id=1))
+        session.commit()
+    return sync_sessions
+
+
+def counts(sessions, comment_id=1):
+    with sessions() as session:
+        return session.execute(
+            select(
+                Comment.reacts_count, Comment.like_count, Comment.replies_count
+            ).where(Comment.id == comment_id)
+        ).one()
+
+
+async def test_flush_applies_buffered_deltas(tasks, db):
+    await bump_many(db, Comment, {1: {"reacts_count": 2, "like_count": 2}})
+    await bump_many(db, Comment, {1: {"like_count": -1, "reacts_count": -1}})
+    scheduler.flush_counters()
+    assert counts(tasks) == (1, 1, 0)
+    assert not sync_redis.exists(buffer_key("comments", 1))
+    assert not sync_redis.scard(COUNTER_DIRTY)
+
+
+async def test_reconcile_drops_deltas_the_recount_includes(tasks, db):
+    with tasks() as session:
+        session.add_all(
+            React(user_id=user_id, comment_id=1, type=ReactionType.like)
+            for user_id in (1, 2)
+        )
+        session.commit()
+    await bump_many(db, Comment, {1: {"reacts_count": 2, "like_count": 2}})
+    await bump_many(db, Comment, {1: {"replies_count": 1}})
+    scheduler.reconcile_reactions(chunk=1)
+    assert counts(tasks) == (2, 2, 1)
+    scheduler.flush_counters()
+    assert counts(tasks) == (2, 2, 1)
+
+
+async def test_flush_waits_for_reconcile(tasks, db):
+    await bump_many(db, Comment, {1: {"reacts_count": 1}})
+    lock = sync_redis.lock(COUNTER_LOCK, timeout=10)
+    assert lock.acquire(blocking=False)
+    scheduler.flush_counters()
+    assert counts(tasks) == (0, 0, 0)
+    lock.release()
+    scheduler.flush_counters()
+    assert counts(tasks) == (1, 0, 0)
@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from sqlalchemy import select, text
+import orjson
+import pytest
+from app.database import ingest
+from app.database.ingest import ndjson_items, request_items, write_chunk
+from app.model_sql import Blog, User
+from app.routes import blog_post
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class StreamedRequest:
+    def __init__(self, chunks, content_type="application/x-ndjson"):
+        self.chunks = chunks
+        self.headers = {"content-type": content_type}
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def body(self):
+        return b"".join(self.chunks)
+
+
+async def collect(items):
+    return [item async for item in items]
+
+
+async def test_ndjson_lines_split_across_chunks():
+    request = StreamedRequest(
+        [b'{"title": "a', b'"}\n{"title"', b': "b"}\n\n  \n{"ti', b'tle": "c"}']
+    )
+    assert await collect(ndjson_items(request)) == [
+        {"title": "a"},
+        {"title": "b"},
+        {"title": "c"},
+    ]
+
+
+async def test_ndjson_reports_broken_lines_in_place():
+    request = StreamedRequest([b'{"title": "a"}\nnot json\n', b'{"title": "b"}\n'])
+    items = await collect(ndjson_items(request))
+    assert items[0] == {"title": "a"} and items[2] == {"title": "b"}
+    assert isinstance(items[1], ValueError)
+
+
+async def test_json_array_over_the_limit_is_rejected(monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_BULK_ITEMS", 2)
+    request = StreamedRequest([b"[{}, {}, {}]"], content_type="application/json")
+    with pytest.raises(HTTPException) as error:
+        await collect(request_items(request))
+    assert error.value.status_code == 413
+
+
+def row(blog_id, title="t"):
+    return {"id": blog_id, "user_id": 1, "title": title, "content": "c"}
+
+
+async def test_write_chunk_retries_a_rejected_chunk_row_by_row(db):
+    db.add(Blog(id=2, user_id=1, title="taken", content="c"))
+    await db.commit()
+    results, entries = await write_chunk(
+        db, [(0, row(1)), (1, row(2)), (2, row(3, "x"))]
+    )
+    assert [result["status"] for result in results] == ["created", "failed", "created"]
+    assert [blog_id for blog_id, _ in entries] == [1, 3]
+    titles = (await db.execute(select(Blog.title).order_by(Blog.id))).scalars()
+    assert list(titles) == ["t", "taken", "x"]
+
+
+async def test_write_chunk_fails_whole_chunk_on_other_errors(db, monkeypatch):
+    calls = []
+    insert_blogs = ingest.insert_blogs
+
+    async def counted(db, rows):
+        calls.append(len(rows))
+        return await insert_blogs(db, rows)
+
+    monkeypatch.setattr(ingest, "insert_blogs", counted)
+    await db.execute(text("DROP TABLE blogs"))
+    results, entries = await write_chunk(db, [(0, row(1)), (1, row(2))])
+    assert [result["status"] for result in results] == ["failed", "failed"]
+    assert entries == [] and calls == [2]
+
+
+class FanOut:
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, *args):
+        self.calls.append(args)
+
+
+async def test_import_blogs_streams_results_per_chunk(db, monkeypatch):
+    fan_out = FanOut()
+    monkeypatch.setattr(blog_post, "fan_out_blogs", fan_out)
+    db.add(User(id=1, username="u", name="u", email="u@x", password="x"))
+    await db.commit()
+    lines = [{"title": f"t{i}", "content": "c"} for i in range(5)]
+    lines.insert(2, {"title": 1})
+    body = b"\n".join(orjson.dumps(line) for line in lines)
+    totals = {"items": 0, "created": 0}
+    results = await collect(
+        blog_post.import_blogs(db, StreamedRequest([body]), 1, 2, totals)
+    )
+    assert sorted(result["index"] for result in results) == list(range(6))
+    assert [result["status"] for result in results if result["index"] == 2] == [
+        "invalid"
+    ]
+    assert totals == {"items": 6, "created": 5}
+    assert blog_post.bulk_summary(totals)["status"] == "partial"
+    ((user_id, newest),) = fan_out.calls
+    assert user_id == 1 and len(newest) == 5
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.database import message_writer as module
+from app.database.message_writer import MessageWriter, message_row
+from app.model_sql import Conversation, Messaging
+
+
+def row(text: str, receiver_id: int = 2) -> dict:
+    return message_row(
+        1, receiver_id, "ann", datetime.now(timezone.utc), False, message=text
+    )
+
+
+@pytest.fixture
+def writer(session_factory, monkeypatch):
+    monkeypatch.setattr(module, "WRITE_BACKOFF", 0)
+    writer = MessageWriter(session_factory, batch=3, delay=0)
+    writer.calls = []
+    store = writer.store
+
+    async def spy(rows):
+        writer.calls.append([row["message"] for row in rows])
+        return await store(rows)
+
+    writer.store = spy
+    return writer
+
+
+async def submit_all(writer, *rows) -> list:
+    return [await writer.submit(row) for row in rows]
+
+
+async def test_rows_are_stored_in_batches(writer, session_factory):
+    saved = await submit_all(writer, *(row(f"m{i}") for i in range(5)))
+    ids = await asyncio.gather(*saved)
+    await writer.close()
+    assert writer.calls == [["m0", "m1", "m2"], ["m3", "m4"]]
+    async with session_factory() as db:
+        stored = (await db.scalars(select(Messaging.id).order_by(Messaging.id))).all()
+        conversation = (
+            await db.execute(
+                select(Conversation).where(
+                    Conversation.user_id == 2, Conversation.peer_id == 1
+                )
+            )
+        ).scalar_one()
+    assert ids == stored
+    assert (conversation.last_message_id, conversation.unread_count) == (ids[-1], 5)
+
+
+async def test_rejected_rows_fail_alone(writer):
+    store = writer.store
+
+    async def reject_bad(rows):
+        if any(row["message"] == "bad" for row in rows):
+            writer.calls.append([row["message"] for row in rows])
+            raise IntegrityError("INSERT", {}, Exception("rejected"))
+        return await store(rows)
+
+    writer.store = reject_bad
+    saved = await submit_all(writer, row("a"), row("bad"), row("b"))
+    results = await asyncio.gather(*saved, return_exceptions=True)
+    await writer.close()
+    assert isinstance(results[1], IntegrityError)
+    assert all(isinstance(result, int) for result in results[::2])
+    assert writer.calls == [["a", "bad", "b"], ["a"], ["bad"], ["b"]]
+
+
+async def test_unreachable_database_retries_the_whole_batch(writer):
+    store = writer.store
+    outages = [OperationalError("INSERT", {}, Exception("down"))]
+
+    async def flaky(rows):
+        if outages:
+            writer.calls.append([row["message"] for row in rows])
+            raise outages.pop()
+        return await store(rows)
+
+    writer.store = flaky
+    saved = await submit_all(writer, row("a"), row("b"))
+    assert all(isinstance(result, int) for result in await asyncio.gather(*saved))
+    await writer.close()
+    assert writer.calls == [["a", "b"], ["a", "b"]]
+
+
+async def test_batch_fails_as_a_unit_when_the_database_stays_down(writer):
+    async def down(rows):
+        writer.calls.append([row["message"] for row in rows])
+        raise OperationalError("INSERT", {}, Exception("down"))
+
+    writer.store = down
+    saved = await submit_all(writer, row("a"), row("b"))
+    results = await asyncio.gather(*saved, return_exceptions=True)
+    await writer.close()
+    assert all(isinstance(result, OperationalError) for result in results)
+    assert writer.calls == [["a", "b"]] * (module.WRITE_RETRIES + 1)
+
+
+async def test_close_stores_what_is_queued(writer, session_factory):
+    saved = await submit_all(writer, *(row(f"m{i}") for i in range(4)))
+    await writer.close()
+    assert all(future.done() and not future.exception() for future in saved)
+    assert writer.task is None
+    async with session_factory() as db:
+        assert len((await db.scalars(select(Messaging.id))).all()) == 4
+
+
+async def test_close_fails_what_it_could_not_store(writer):
+    async def stuck(rows):
+        await asyncio.sleep(10)
+
+    writer.store = stuck
+    saved = await submit_all(writer, *(row(f"m{i}") for i in range(4)))
+    await writer.close(timeout=0.05)
+    errors = [future.exception() for future in saved]
+    assert all(isinstance(error, RuntimeError) for error in errors)
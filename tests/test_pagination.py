@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import select
+import pytest
+from app.core.pagination import (
+    decode_cursor,
+    encode_cursor,
+    offset_page,
+    paginate,
+    wants_total,
+)
+from app.model_sql import Blog, User
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+KEYS = [Blog.time_of_post, Blog.id]
+
+
+async def add_blogs(db, count=7):
+    """Blogs posted in pairs, so every second blog ties on ``time_of_post``."""
+    db.add(User(id=1, username="author", name="a", email="a@x", password="x"))
+    db.add_all(
+        Blog(
+            id=i,
+            user_id=1,
+            title=f"t{i}",
+            content="c",
+            time_of_post=START + timedelta(minutes=i // 2),
+        )
+        for i in range(1, count + 1)
+    )
+    await db.commit()
+
+
+async def walk(db, limit, descending):
+    ids, cursor = [], None
+    while True:
+        rows, pagination = await paginate(
+            db,
+            select(Blog.id, Blog.time_of_post),
+            KEYS,
+            1,
+            limit,
+            cursor=cursor,
+            descending=descending,
+            tag="view",
+            scalars=False,
+        )
+        ids += [row.id for row in rows]
+        if not pagination.has_more:
+            assert pagination.next_cursor is None
+            return ids
+        cursor = pagination.next_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("view", [START, 42])
+    assert decode_cursor("view", cursor, KEYS) == [START, 42]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        encode_cursor("search", [START.isoformat(), 1]),
+        encode_cursor("view", [1]),
+        "not a cursor",
+        "",
+    ],
+)
+def test_cursor_rejects_foreign_or_broken_cursors(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("view", cursor, KEYS)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("limit", [1, 2, 3])
+async def test_paginate_visits_tied_rows_once(db, limit, descending):
+    await add_blogs(db)
+    expected = [7, 6, 5, 4, 3, 2, 1]
+    assert await walk(db, limit, descending) == (
+        expected if descending else expected[::-1]
+    )
+
+
+async def test_paginate_first_page_matches_offset_page(db):
+    await add_blogs(db)
+    keyset, _ = await paginate(db, select(Blog), KEYS, 2, 3, tag="view")
+    ordered = select(Blog).order_by(Blog.time_of_post.desc(), Blog.id.desc())
+    offset, _ = await offset_page(db, ordered, 2, 3)
+    assert [blog.id for blog in keyset] == [blog.id for blog in offset] == [4, 3, 2]
+
+
+def test_wants_total():
+    assert wants_total(None, None, True)
+    assert not wants_total(None, None, False)
+    assert wants_total(None, "cached", False)
+    assert not wants_total(False, "exact", True)
+    assert wants_total(True, None, False)
+
+
+async def test_feeds_skip_the_total_unless_asked(db):
+    await add_blogs(db)
+    stmt = select(Blog)
+    _, pagination = await paginate(
+        db, stmt, KEYS, 1, 2, tag="view", count_by_default=False
+    )
+    assert pagination.total is None and pagination.has_more
+    _, pagination = await paginate(
+        db, stmt, KEYS, 1, 2, tag="view", count_mode="exact", count_by_default=False
+    )
+    assert pagination.total == 7
+    _, pagination = await offset_page(db, stmt, 1, 2)
+    assert pagination.total == 7
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from sqlalchemy import select
+import pytest
+from app.database import reaction_batch
+from app.database.reaction_batch import apply_reactions
+from app.model_sql import Blog, Comment, React, ReactionType
+from app.models import ReactionOperation as Op
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def targets(db):
+    db.add_all(
+        [
+            Blog(id=1, user_id=1, title="t", content="c"),
+            Blog(id=2, user_id=1, title="t", content="c"),
+            Comment(id=5, blog_id=1, user_id=1, content="c"),
+            React(user_id=7, blog_id=2, type=ReactionType.like),
+            React(user_id=7, comment_id=5, type=ReactionType.sad),
+        ]
+    )
+    await db.commit()
+
+
+async def reactions(db):
+    rows = await db.execute(
+        select(React.blog_id, React.comment_id, React.type).where(React.user_id == 7)
+    )
+    return sorted(rows.all(), key=lambda row: (row.blog_id or 0, row.comment_id or 0))
+
+
+def statuses(results):
+    return [result["status"] for result in results]
+
+
+async def test_operations_on_one_target_collapse_to_the_last(db, targets):
+    operations = [
+        Op(type="like", blog=1),
+        Op(op="change", type="love", blog=1),
+        Op(op="remove", blog=1),
+        Op(type="wow", blog=1),
+    ]
+    results, deltas, _ = await apply_reactions(db, 7, operations, NOW)
+    await db.commit()
+    assert statuses(results) == ["superseded"] * 3 + ["added"]
+    assert deltas["blogs"] == {1: {"reacts_count": 1, "wow_count": 1}}
+    assert (1, None, ReactionType.wow) in await reactions(db)
+
+
+async def test_each_operation_gets_its_own_result(db, targets):
+    operations = [
+        Op(type="love", blog=2),
+        Op(type="sad", comment=5),
+        Op(op="remove", blog=1),
+        Op(type="like", blog=99),
+        Op(type="nope", blog=1),
+        Op(type="like", blog=1, comment=5),
+    ]
+    results, deltas, touched = await apply_reactions(db, 7, operations, NOW)
+    await db.commit()
+    assert statuses(results) == [
+        "updated",
+        "unchanged",
+        "absent",
+        "not_found",
+        "invalid",
+        "invalid",
+    ]
+    assert deltas["blogs"] == {
+        2: {"reacts_count": 0, "like_count": -1, "love_count": 1}
+    }
+    assert deltas["comments"] == {} and touched == {}
+    assert await reactions(db) == [
+        (None, 5, ReactionType.sad),
+        (2, None, ReactionType.love),
+    ]
+
+
+async def test_removals_count_what_was_deleted(db, targets):
+    operations = [Op(op="remove", blog=2), Op(op="remove", comment=5)]
+    results, deltas, touched = await apply_reactions(db, 7, operations, NOW)
+    await db.commit()
+    assert statuses(results) == ["removed", "removed"]
+    assert deltas["blogs"] == {2: {"reacts_count": -1, "like_count": -1}}
+    assert deltas["comments"] == {5: {"reacts_count": -1, "sad_count": -1}}
+    assert list(touched) == [5]
+    assert await reactions(db) == []
+
+
+async def test_reaction_inserted_concurrently_is_switched(db, targets, monkeypatch):
+    """A tap that commits after the batch read the user's reactions makes the
+    batch's insert a no-op; the batch must count a switch, not an add.
+    """
+    current_reactions = reaction_batch.current_reactions
+    calls = []
+
+    async def stale_first_read(*args):
+        calls.append(args)
+        found = await current_reactions(*args)
+        return {} if len(calls) == 1 else found
+
+    monkeypatch.setattr(reaction_batch, "current_reactions", stale_first_read)
+    results, deltas, _ = await apply_reactions(
+        db, 7, [Op(type="love", blog=2), Op(type="like", blog=1)], NOW
+    )
+    await db.commit()
+    assert statuses(results) == ["updated", "added"]
+    assert deltas["blogs"] == {
+        2: {"reacts_count": 0, "like_count": -1, "love_count": 1},
+        1: {"reacts_count": 1, "like_count": 1},
+    }
+    assert len(calls) == 2
+    assert await reactions(db) == [
+        (None, 5, ReactionType.sad),
+        (1, None, ReactionType.like),
+        (2, None, ReactionType.love),
+    ]
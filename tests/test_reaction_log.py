@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+import pytest
+from app.core.config import settings
+from app.database.reaction_log import append_event, merge_events, viewer_events
+from app.model_sql import Blog, Comment, React, ReactionType
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+like, love, wow, sad = (
+    ReactionType.like,
+    ReactionType.love,
+    ReactionType.wow,
+    ReactionType.sad,
+)
+
+
+@pytest.fixture(autouse=True)
+def event_mode(monkeypatch):
+    monkeypatch.setattr(settings, "REACTION_INGEST", "events")
+
+
+@pytest.fixture
+async def queued(db):
+    db.add_all(
+        [
+            Blog(id=1, user_id=1, title="t", content="c"),
+            Blog(id=2, user_id=1, title="t", content="c"),
+            Comment(id=5, blog_id=1, user_id=1, content="c"),
+            React(user_id=7, comment_id=5, type=like),
+            React(user_id=10, comment_id=5, type=like),
+        ]
+    )
+    for user_id, rtype, blog_id, comment_id in [
+        (7, love, None, 5),
+        (7, like, None, 5),
+        (8, wow, None, 5),
+        (9, None, None, 5),
+        (10, None, None, 5),
+        (11, sad, None, 5),
+        (11, wow, None, 5),
+        (7, love, 1, None),
+        (7, None, 1, None),
+        (7, sad, 2, None),
+        (8, like, 1, None),
+    ]:
+        await db.execute(append_event(user_id, rtype, NOW, blog_id, comment_id))
+    await db.commit()
+
+
+def comment_item(reacts_count, likes):
+    return {
+        "id": 5,
+        "reacts_count": reacts_count,
+        "reactions": {"like": likes, "love": 0, "wow": 0, "sad": 0},
+    }
+
+
+async def test_merge_events_folds_the_last_event_per_user(db, queued):
+    items = [comment_item(2, 2)]
+    await merge_events(db, Comment, items, "reactions")
+    # 7 ends where it started, 8 and 11 add wow, 9 removes nothing, 10 unlikes.
+    assert items == [
+        {
+            "id": 5,
+            "reacts_count": 3,
+            "reactions": {"like": 1, "love": 0, "wow": 2, "sad": 0},
+        }
+    ]
+
+
+async def test_merge_events_ignores_other_targets(db, queued):
+    items = [{"id": 2, "reacts_count": 0, "reaction": {}}]
+    await merge_events(db, Blog, items, "reaction")
+    assert items == [{"id": 2, "reacts_count": 1, "reaction": {"sad": 1}}]
+
+
+async def test_viewer_events_reports_the_latest_per_blog(db, queued):
+    assert await viewer_events(db, 7, [1, 2, 3]) == {1: None, 2: "sad"}
+    assert await viewer_events(db, 8, [1, 2]) == {1: "like"}
+    assert await viewer_events(db, None, [1, 2]) == {}
+
+
+async def test_direct_mode_reads_nothing(db, queued, monkeypatch):
+    monkeypatch.setattr(settings, "REACTION_INGEST", "direct")
+    items = [comment_item(2, 2)]
+    await merge_events(db, Comment, items, "reactions")
+    assert items == [comment_item(2, 2)]
+    assert await viewer_events(db, 7, [1, 2]) == {}
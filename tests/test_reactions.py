@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from sqlalchemy import select
+import pytest
+from app.database.counters import pending_counters
+from app.database.reactions import reaction_deltas, upsert_reaction
+from app.model_sql import Blog, Comment, React, ReactionType
+from app.routes.reaction import react_type
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def targets(db):
+    db.add(Blog(id=1, user_id=1, title="t", content="c", like_count=3, reacts_count=3))
+    db.add(Comment(id=5, blog_id=1, user_id=1, content="c", parent_id=None))
+    await db.commit()
+
+
+async def reactions(db):
+    return (
+        await db.execute(
+            select(React.user_id, React.blog_id, React.comment_id, React.type)
+        )
+    ).all()
+
+
+def test_reaction_deltas():
+    assert reaction_deltas(added=ReactionType.like) == {
+        "reacts_count": 1,
+        "like_count": 1,
+    }
+    assert reaction_deltas(added=ReactionType.love, removed=ReactionType.like) == {
+        "reacts_count": 0,
+        "like_count": -1,
+        "love_count": 1,
+    }
+    assert reaction_deltas(removed=ReactionType.sad) == {
+        "reacts_count": -1,
+        "sad_count": -1,
+    }
+
+
+async def test_upsert_reports_what_it_replaced(db, targets):
+    target, previous = await upsert_reaction(db, Blog, 1, 7, ReactionType.like, NOW)
+    assert previous is None
+    assert (target.id, target.blog_id, target.parent_id) == (1, 1, None)
+    assert (target.reacts_count, target.like_count) == (3, 3)
+    reaction_id = target.reaction_id
+
+    target, previous = await upsert_reaction(db, Blog, 1, 7, ReactionType.like, NOW)
+    assert previous == ReactionType.like and target.reaction_id == reaction_id
+
+    target, previous = await upsert_reaction(db, Blog, 1, 7, ReactionType.wow, NOW)
+    assert previous == ReactionType.like and target.reaction_id == reaction_id
+    assert (target.id, target.blog_id, target.like_count) == (1, 1, 3)
+    await db.commit()
+    assert await reactions(db) == [(7, 1, None, ReactionType.wow)]
+
+
+async def test_upsert_on_comments_and_missing_targets(db, targets):
+    target, previous = await upsert_reaction(db, Comment, 5, 7, ReactionType.sad, NOW)
+    assert previous is None and (target.id, target.blog_id) == (5, 1)
+    assert await upsert_reaction(db, Comment, 99, 7, ReactionType.sad, NOW) is None
+    assert await upsert_reaction(db, Blog, 99, 7, ReactionType.sad, NOW) is None
+    await db.commit()
+    assert await reactions(db) == [(7, None, 5, ReactionType.sad)]
+
+
+async def test_react_type_bumps_counters_once_per_change(db, targets):
+    payload = {"user_id": 7}
+    messages = [
+        (await react_type(reaction, blog=1, db=db, payload=payload))["message"]
+        for reaction in ("like", "like", "love", "love")
+    ]
+    assert messages == [
+        "Reaction added",
+        "Reaction unchanged",
+        "Reaction updated",
+        "Reaction unchanged",
+    ]
+    assert await pending_counters(Blog, [1]) == {
+        1: {"reacts_count": 1, "like_count": 0, "love_count": 1}
+    }
+    with pytest.raises(HTTPException) as error:
+        await react_type("like", blog=99, db=db, payload=payload)
+    assert error.value.status_code == 404
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from jose import jwt
+from sqlalchemy import select
+from app.core.backplane import LocalBackplane
+from app.core.config import settings
+from app.database.message_writer import MessageWriter
+from app.model_sql import Messaging, User
+from app.routes import websocket
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.inbox = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+    async def receive(self) -> dict:
+        return await self.inbox.get()
+
+    def say(self, text: str):
+        self.inbox.put_nowait({"type": "websocket.receive", "text": text})
+
+
+@pytest.fixture
+async def backlog(db):
+    db.add_all(
+        [
+            User(id=1, username="ann", email="a@x", password="x"),
+            User(id=2, username="bob", email="b@x", password="x"),
+        ]
+    )
+    db.add_all(
+        Messaging(id=i, user_id=2, receiver_id=1, username="bob", message=f"m{i}")
+        for i in range(1, 4)
+    )
+    await db.commit()
+
+
+async def delivered(db) -> list:
+    db.expire_all()
+    stmt = select(Messaging.id).where(Messaging.delivered.is_(True))
+    return (await db.execute(stmt.order_by(Messaging.id))).scalars().all()
+
+
+async def until(condition, timeout: float = 3):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_ack_frames():
+    assert websocket.ack_id({"text": "ack:12"}) == 12
+    assert websocket.ack_id({"text": "ack:12 thanks"}) is None
+    assert websocket.ack_id({"text": "replay:3"}) is None
+    assert websocket.ack_id({"bytes": b"ack:1"}) is None
+
+
+async def test_replay_without_acks_counts_sent_chunks(db, backlog, monkeypatch):
+    monkeypatch.setattr(websocket, "REPLAY_CHUNK", 2)
+    web = FakeSocket()
+    await websocket.replay_pending(1, web, db, None)
+    assert web.sent == ["2: m1", "2: m2", "2: m3"]
+    assert await delivered(db) == [1, 2, 3]
+
+
+async def test_replay_waits_for_each_ack(db, backlog, monkeypatch):
+    monkeypatch.setattr(websocket, "REPLAY_CHUNK", 2)
+    web, acks = FakeSocket(), asyncio.Queue()
+    replay = asyncio.create_task(websocket.replay_pending(1, web, db, acks))
+    await until(lambda: "replay:2" in web.sent)
+    assert await delivered(db) == []
+    acks.put_nowait(1)
+    acks.put_nowait(2)
+    await until(lambda: "replay:3" in web.sent)
+    assert await delivered(db) == [1, 2]
+    acks.put_nowait(3)
+    await replay
+    assert web.sent == ["2: m1", "2: m2", "replay:2", "2: m3", "replay:3"]
+    assert await delivered(db) == [1, 2, 3]
+
+
+async def test_replay_stops_without_an_ack(db, backlog, monkeypatch):
+    monkeypatch.setattr(websocket, "REPLAY_ACK_TIMEOUT", 0.05)
+    web = FakeSocket()
+    await websocket.replay_pending(1, web, db, asyncio.Queue())
+    assert web.sent[-1] == "replay:3"
+    assert await delivered(db) == []
+
+
+@pytest.mark.parametrize("acks", [True, False])
+async def test_chat_loop_routes_acks_only_during_a_replay(
+    db, backlog, session_factory, monkeypatch, acks
+):
+    writer = MessageWriter(session_factory, delay=0)
+    monkeypatch.setattr(websocket, "message_writer", writer)
+    monkeypatch.setattr(websocket, "backplane", LocalBackplane())
+    monkeypatch.setattr(websocket.send_email, "apply_async", lambda **kwargs: None)
+    token = jwt.encode(
+        {"sub": "ann", "user_id": 1}, settings.SECRET_KEY, settings.ALGORITHM
+    )
+    web = FakeSocket()
+    chat = asyncio.create_task(
+        websocket.chatterbox(web, "ann", talk_id=2, token=token, acks=acks, db=db)
+    )
+    if acks:
+        await until(lambda: "replay:3" in web.sent)
+        web.say("live while replaying")
+        web.say("ack:3")
+    async with session_factory() as check:
+        async with asyncio.timeout(3):
+            while await delivered(check) != [1, 2, 3]:
+                await asyncio.sleep(0.01)
+    web.say("ack:3")
+    web.say("replay:1")
+    web.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await chat
+    await writer.close()
+    async with session_factory() as check:
+        stmt = select(Messaging.message).where(Messaging.user_id == 1)
+        stored = (await check.scalars(stmt.order_by(Messaging.id))).all()
+    expected = ["ack:3", "replay:1"]
+    if acks:
+        expected.insert(0, "live while replaying")
+    assert stored == expected
+    assert not websocket.backplane.is_local(1)
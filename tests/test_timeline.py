@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.database.timeline import (
+    CELEBRITY_FOLLOWERS,
+    post_score,
+    read_timeline,
+    timeline_key,
+)
+from app.model_sql import Blog, Follow, User
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def setup_timeline(db, redis):
+    """User 1 follows user 2, whose posts are fanned out, and user 3, a
+    celebrity read at request time. Posts come in pairs sharing a timestamp,
+    and the pairs mix both authors.
+    """
+    db.add_all(
+        [
+            User(id=1, username="reader", name="r", email="r@x", password="x"),
+            User(id=2, username="friend", name="f", email="f@x", password="x"),
+            User(
+                id=3,
+                username="star",
+                name="s",
+                email="s@x",
+                password="x",
+                followers_count=CELEBRITY_FOLLOWERS,
+            ),
+            Follow(follower_id=1, followee_id=2),
+            Follow(follower_id=1, followee_id=3),
+        ]
+    )
+    blogs = [
+        Blog(
+            id=i,
+            user_id=3 if i % 3 == 0 else 2,
+            title=f"t{i}",
+            content="c",
+            time_of_post=START + timedelta(minutes=i // 2),
+        )
+        for i in range(1, 12)
+    ]
+    db.add_all(blogs)
+    await db.commit()
+    await redis.zadd(
+        timeline_key(1),
+        {
+            str(blog.id): post_score(blog.time_of_post)
+            for blog in blogs
+            if blog.user_id == 2
+        },
+    )
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4])
+async def test_timeline_pages_cover_ties_once(db, redis, limit):
+    await setup_timeline(db, redis)
+    ids, cursor = [], None
+    while True:
+        rows, cursor = await read_timeline(db, 1, cursor, limit)
+        assert len(rows) <= limit
+        ids += [row.id for row in rows]
+        if cursor is None:
+            break
+    assert ids == list(range(11, 0, -1))
+
+
+async def test_timeline_drops_deleted_posts(db, redis):
+    await setup_timeline(db, redis)
+    await redis.zadd(timeline_key(1), {"99": post_score(START + timedelta(hours=1))})
+    rows, _ = await read_timeline(db, 1, None, 3)
+    assert [row.id for row in rows] == [11, 10]
+    assert await redis.zscore(timeline_key(1), "99") is None
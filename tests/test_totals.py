@@ -0,0 +1,34 @@
+from sqlalchemy import select
+from app.core.pagination import count_total, invalidate_totals
+from app.model_sql import User
+
+
+async def add_users(db, *ids):
+    db.add_all(
+        User(id=i, username=f"u{i}", name="u", email=f"{i}@x", password="x")
+        for i in ids
+    )
+    await db.commit()
+
+
+async def test_cached_total_holds_until_invalidated(db):
+    await add_users(db, 1, 2)
+    stmt = select(User)
+    assert await count_total(db, stmt, "cached", "users") == 2
+    await add_users(db, 3)
+    assert await count_total(db, stmt, "cached", "users") == 2
+    assert await count_total(db, stmt, "exact", "users") == 3
+    await invalidate_totals("users")
+    assert await count_total(db, stmt, "cached", "users") == 3
+
+
+async def test_cached_totals_are_keyed_by_parameters(db):
+    await add_users(db, 1, 2, 3)
+    assert await count_total(db, select(User).where(User.id > 1), "cached") == 2
+    assert await count_total(db, select(User).where(User.id > 2), "cached") == 1
+
+
+async def test_estimate_without_a_planner_gives_no_total(db):
+    await add_users(db, 1)
+    assert await count_total(db, select(User), "estimate") is None
+    assert await count_total(db, select(User), None) == 1
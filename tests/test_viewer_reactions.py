@@ -0,0 +1,47 @@
+import orjson
+import pytest
+from app.core.blog_cache import cached_reaction
+from app.model_sql import Blog, React, ReactionType
+from app.routes.blog_post import fetch_some
+from app.routes.reaction import delete_one, react_type
+
+
+class NoQueries:
+    """A session for paths that must be served without the database."""
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("unexpected query")
+
+
+@pytest.fixture
+async def blog(db):
+    db.add(Blog(id=1, user_id=1, title="t", content="c"))
+    db.add(React(user_id=7, blog_id=1, type=ReactionType.like))
+    await db.commit()
+
+
+async def fetch(db, user_id=None):
+    response = await fetch_some(1, db=db, payload={"sub": "u", "user_id": user_id})
+    return orjson.loads(response.body)["data"]
+
+
+async def test_cached_reads_never_query_for_the_viewer(db, blog):
+    assert (await fetch(db, 7))["my_reaction"] == "like"
+    assert "my_reaction" not in await fetch(db, 8)
+    assert await cached_reaction(1, 7) == (True, "like")
+    assert await cached_reaction(1, 8) == (True, None)
+    assert (await fetch(NoQueries(), 7))["my_reaction"] == "like"
+    assert "my_reaction" not in await fetch(NoQueries(), 8)
+    assert "my_reaction" not in await fetch(NoQueries())
+
+
+async def test_reaction_writes_update_the_viewers_hash(db, blog):
+    await fetch(db, 7)
+    await fetch(db, 8)
+    await react_type("wow", blog=1, db=db, payload={"user_id": 8})
+    await delete_one(blog=1, db=db, payload={"user_id": 7, "sub": "u"})
+    assert await cached_reaction(1, 7) == (True, None)
+    assert await cached_reaction(1, 8) == (True, "wow")
+    await fetch(db)
+    assert "my_reaction" not in await fetch(NoQueries(), 7)
+    assert (await fetch(NoQueries(), 8))["my_reaction"] == "wow"